@@ -0,0 +1,207 @@
+"""
+batcher.py — Cross-market batching of order posts and cancels
+==============================================================
+A refresh wave (one WS move fanning out to many markets) used to cost one
+REST request per order and per cancel. OrderBatcher collects the intents
+every MarketLoop submits within BATCH_WINDOW_MS and sends them through the
+CLOB batch endpoints:
+
+  - cancels: one DELETE /orders per BATCH_MAX_CANCEL IDs
+  - posts:   one POST /orders per BATCH_MAX_POST signed orders (exchange limit 15)
+
+Each caller awaits a future that resolves to its own slice of the response,
+so a wave of N markets costs ceil(cancels / BATCH_MAX_CANCEL) +
+ceil(posts / BATCH_MAX_POST) requests instead of up to 4N.
+
+Signing stays with the caller (OrderManager.sign_order); the batcher only
+moves signed orders and IDs. Requests go through the OrderGateway pool when
+one is given, so they never block the event loop.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from typing import Optional
+
+from py_clob_client.clob_types import OrderType, PostOrdersArgs
+
+from metrics import clob_call
+
+logger = logging.getLogger("polymaker.batcher")
+
+BATCH_WINDOW_MS = float(os.getenv("BATCH_WINDOW_MS", "5"))
+BATCH_MAX_POST = int(os.getenv("BATCH_MAX_POST", "15"))
+BATCH_MAX_CANCEL = int(os.getenv("BATCH_MAX_CANCEL", "500"))
+BATCH_KEY = "_batch"  # gateway limiter key prefix
+
+
+class OrderBatcher:
+    """Coalesces post and cancel intents from all markets into batch requests."""
+
+    def __init__(
+        self,
+        client,
+        gateway=None,
+        window_ms: float = BATCH_WINDOW_MS,
+        max_post: int = BATCH_MAX_POST,
+        max_cancel: int = BATCH_MAX_CANCEL,
+        dry_run: bool = False,
+        latency=None,
+    ):
+        self.client = client
+        self.gateway = gateway  # optional gateway.OrderGateway
+        self.window = max(0.0, window_ms) / 1000.0
+        self.max_post = max(1, max_post)
+        self.max_cancel = max(1, max_cancel)
+        self.dry_run = dry_run
+        self._latency = latency  # optional latency.LatencyTracker
+
+        self._posts: list[tuple[str, object, asyncio.Future]] = []   # (token_id, signed, fut)
+        self._cancels: list[tuple[list[str], asyncio.Future]] = []   # (order_ids, fut)
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._inflight: set[asyncio.Task] = set()
+        self._dry_seq = 0
+
+        self.waves = 0
+        self.requests = 0
+        self.intents = 0
+
+    # ── Intents ──────────────────────────────────────────────────────────────
+
+    async def post(self, token_id: str, signed) -> dict:
+        """Queue a signed post-only GTC order. Resolves to its entry of the batch response."""
+        fut = asyncio.get_running_loop().create_future()
+        self._posts.append((token_id, signed, fut))
+        self.intents += 1
+        if len(self._posts) >= self.max_post:
+            self._flush_now()  # a full request is ready; no point waiting
+        else:
+            self._arm()
+        return await fut
+
+    async def cancel(self, order_ids: list[str]) -> dict:
+        """Queue cancels. Resolves to {"canceled": [...], "not_canceled": {...}} for these IDs."""
+        if not order_ids:
+            return {"canceled": [], "not_canceled": {}}
+        fut = asyncio.get_running_loop().create_future()
+        self._cancels.append((list(order_ids), fut))
+        self.intents += 1
+        self._arm()
+        return await fut
+
+    def _arm(self) -> None:
+        if self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.window, self._flush_now)
+
+    def _flush_now(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        posts, self._posts = self._posts, []
+        cancels, self._cancels = self._cancels, []
+        if not posts and not cancels:
+            return
+        self.waves += 1
+        task = asyncio.get_running_loop().create_task(self._flush(posts, cancels))
+        self._inflight.add(task)
+        task.add_done_callback(self._inflight.discard)
+
+    # ── Sending ──────────────────────────────────────────────────────────────
+
+    async def _flush(self, posts, cancels) -> None:
+        await asyncio.gather(
+            self._flush_cancels(cancels),
+            *(
+                self._send_posts(posts[i:i + self.max_post], i // self.max_post)
+                for i in range(0, len(posts), self.max_post)
+            ),
+        )
+
+    async def _flush_cancels(self, cancels) -> None:
+        """Send every queued cancel ID, then hand each caller the part of the answer it asked about."""
+        if not cancels:
+            return
+        ids = list(dict.fromkeys(oid for group, _ in cancels for oid in group))
+        results = await asyncio.gather(
+            *(self._send_cancels(ids[i:i + self.max_cancel]) for i in range(0, len(ids), self.max_cancel)),
+            return_exceptions=True,
+        )
+        canceled: set[str] = set()
+        not_canceled: dict[str, str] = {}
+        failed: Optional[BaseException] = None
+        for r in results:
+            if isinstance(r, BaseException):
+                logger.error(f"Batch cancel failed: {r}")
+                failed = r
+                continue
+            canceled.update(r.get("canceled") or ())
+            not_canceled.update(r.get("not_canceled") or {})
+
+        for group, fut in cancels:
+            if fut.done():
+                continue
+            answered = [oid for oid in group if oid in canceled or oid in not_canceled]
+            if failed is not None and len(answered) < len(group):
+                fut.set_exception(failed)
+            else:
+                fut.set_result({
+                    "canceled": [oid for oid in group if oid in canceled],
+                    "not_canceled": {oid: not_canceled[oid] for oid in group if oid in not_canceled},
+                })
+
+    async def _send_cancels(self, ids: list[str]) -> dict:
+        if self.dry_run:
+            logger.info("[DRY-RUN] Would batch-cancel %d orders", len(ids))
+            return {"canceled": ids, "not_canceled": {}}
+        self.requests += 1
+        return await self._run(BATCH_KEY, clob_call, "cancel_orders", self.client.cancel_orders, ids) or {}
+
+    async def _send_posts(self, chunk, n: int) -> None:
+        """Send one POST /orders and resolve each order's future with its entry."""
+        futs = [fut for _, _, fut in chunk]
+        try:
+            if self.dry_run:
+                resp = []
+                for _ in chunk:
+                    self._dry_seq += 1
+                    resp.append({"success": True, "orderID": f"dry-batch-{self._dry_seq}", "status": "live"})
+            else:
+                self.requests += 1
+                args = [PostOrdersArgs(order=signed, orderType=OrderType.GTC, postOnly=True)
+                        for _, signed, _ in chunk]
+                t0 = time.perf_counter_ns()
+                resp = await self._run(f"{BATCH_KEY}/{n}", clob_call, "post_orders", self.client.post_orders, args)
+                if self._latency is not None:
+                    ns = time.perf_counter_ns() - t0
+                    for token_id, _, _ in chunk:
+                        self._latency.record_token_ns(token_id, "post", ns)
+        except Exception as e:
+            logger.error(f"Batch post of {len(chunk)} orders failed: {e}")
+            for fut in futs:
+                if not fut.done():
+                    fut.set_exception(e)
+            return
+
+        if not isinstance(resp, list) or len(resp) != len(chunk):
+            logger.warning(f"Batch post: {len(chunk)} orders sent, unexpected response {resp!r:.200}")
+            resp = list(resp) if isinstance(resp, list) else []
+        for i, fut in enumerate(futs):
+            if not fut.done():
+                fut.set_result(resp[i] if i < len(resp) else {"success": False, "errorMsg": "no ack"})
+
+    async def _run(self, key: str, fn, *args):
+        if self.gateway is not None:
+            return await self.gateway.submit(key, fn, *args)
+        return await asyncio.to_thread(fn, *args)
+
+    # ── Lifecycle ────────────────────────────────────────────────────────────
+
+    async def drain(self) -> None:
+        """Send whatever is queued and wait for every in-flight batch."""
+        self._flush_now()
+        while self._inflight:
+            await asyncio.gather(*list(self._inflight), return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {"waves": self.waves, "requests": self.requests, "intents": self.intents}
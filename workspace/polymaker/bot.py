@@ -15,10 +15,11 @@ Usage:
 
 import argparse
 import asyncio
+import itertools
 import logging
 import os
 import signal
-import sys
+import threading
 import time
 from datetime import datetime, timezone
 from pathlib import Path
@@ -32,24 +33,31 @@ _secrets = Path(__file__).parent / "../.secrets/wallet.env"
 if _secrets.exists():
     load_dotenv(_secrets, override=True)
 
-from auth import get_client
+from batcher import OrderBatcher
+from fills import ACCOUNT, FillDedup, FillReconciler
+from gateway import OrderGateway
+from latency import LatencyTracker
+from logsetup import LOG_FILE, setup_logging
 from markets import find_maker_markets
+from metrics import METRICS_PORT, REGISTRY, MetricsServer, clob_call, latency_families, monitor_loop_lag
+from orders import CANCELLING, LIVE, SIZE_EPS, QuoteTarget, WorkingOrder, diff_orders
+from recorder import FeedRecorder
+from risk import PortfolioRisk
+from rotation import ROTATION_SEC, MarketRotator
+from scheduler import REQUOTE_BUDGET_PER_SEC, RequoteScheduler, URGENCY_AGE, URGENCY_INVENTORY, URGENCY_MOVE
+from shm_feed import SharedMemoryFeed
+from signcache import SignedOrderCache, SIGN_CACHE_LEVELS
+from store import StateStore, open_store
 from strategy import ASQuoteEngine
-from ws_feed import MarketFeed, FillUpdate
+from ws_feed import FRESH, MarketFeed, FillUpdate
 
-from py_clob_client.clob_types import OrderArgs, OrderType, TradeParams
+from py_clob_client.clob_types import BookParams, OpenOrderParams, OrderArgs, OrderType
 from py_clob_client.order_builder.constants import BUY, SELL
 
 # ── Logging ───────────────────────────────────────────────────────────────────
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
-    handlers=[
-        logging.StreamHandler(sys.stdout),
-        logging.FileHandler(Path(__file__).parent / "bot.log", mode="a"),
-    ],
-)
+# Handlers are installed by main() (logsetup.py): a spawned feed process
+# re-imports this module and must not open the same log file
 logger = logging.getLogger("polymaker")
 
 
@@ -61,112 +69,439 @@ QUOTE_REFRESH_SEC = int(os.getenv("QUOTE_REFRESH_SEC", "30"))
 NUM_MARKETS = int(os.getenv("NUM_MARKETS", "5"))
 MIN_REQUOTE_SEC = float(os.getenv("MIN_REQUOTE_SEC", "2.0"))
 MID_THRESHOLD = float(os.getenv("MID_THRESHOLD", "0.005"))
+FEED_RECORD_DIR = os.getenv("FEED_RECORD_DIR", "")  # e.g. logs/feed — empty disables recording
+LATENCY_REPORT_SEC = float(os.getenv("LATENCY_REPORT_SEC", "60"))  # 0 disables the periodic log
+LATENCY_DUMP_DIR = os.getenv("LATENCY_DUMP_DIR", "logs")
+FEED_PROCESS = os.getenv("FEED_PROCESS", "0") == "1"  # run MarketFeed in its own process (shm_feed.py)
+REST_POLL_SEC = float(os.getenv("REST_POLL_SEC", "5"))  # batched REST mids for tokens whose WS data isn't fresh
+REST_POLL_BATCH = 100
+LIVE_STORE_PATH = "state/polymaker.db"
+STORE_PATH = os.getenv("STORE_PATH", LIVE_STORE_PATH)  # relative to this directory; empty disables
+SIGN_CACHE = os.getenv("SIGN_CACHE", "1") == "1"  # pre-sign orders around each quote (signcache.py)
+SIM_EXCHANGE = os.getenv("SIM_EXCHANGE", "")  # e.g. http://127.0.0.1:8700 — trade against simexchange.py
+ORDER_BATCHING = os.getenv("ORDER_BATCHING", "1") == "1"  # coalesce posts/cancels across markets (batcher.py)
+RETIRE_SETTLE_SEC = 5.0  # second server-side cancel after retiring a market, for posts still in flight
+RETIRED_FLAT_USD = 0.01  # a retired market counts toward portfolio risk until its exposure is below this
+
+
+# ── Metrics ───────────────────────────────────────────────────────────────────
+
+_ORDERS = REGISTRY.counter("polymaker_orders_total", "Order acks by operation and outcome", ["op", "result"])
+_ORDERS_ACCEPTED = _ORDERS.labels("post", "accepted")
+_ORDERS_REJECTED = _ORDERS.labels("post", "rejected")
+_ORDERS_CANCELLED = _ORDERS.labels("cancel", "cancelled")
+_ORDERS_NOT_CANCELLED = _ORDERS.labels("cancel", "not_cancelled")
+_ORDERS_CANCEL_FAILED = _ORDERS.labels("cancel", "failed")
+_REQUOTES = REGISTRY.counter("polymaker_requotes_total", "Requotes per market", ["market", "question"])
+_FILLS = REGISTRY.counter("polymaker_fills_total", "Own fills applied, by source", ["source"])
+_FILLS_WS = _FILLS.labels("ws")
+_FILLS_REST = _FILLS.labels("rest")
+_VPIN = REGISTRY.gauge("polymaker_vpin", "VPIN over the market's trade window", ["market", "question"])
+_EXPOSURE = REGISTRY.gauge("polymaker_exposure_usd", "Net YES exposure per market, USD", ["market", "question"])
 
 
 # ── Inventory Tracker ─────────────────────────────────────────────────────────
 
 class InventoryTracker:
-    """Tracks net USD position per market token and fill P&L."""
+    """
+    Share positions per token with average cost, realized and mark-to-market P&L.
+
+    Marks come from the mids each MarketLoop quotes on (mark_pair). A YES and
+    a NO share together always pay $1, so exposure nets the pair:
+    exposure(token_yes) = (YES shares - NO shares) * YES mark, positive =
+    long YES. That is what the engine's inventory skew sees.
+
+    Totals (realized, unrealized, bought, sold) are updated incrementally on
+    every fill and mark, so reading them is O(1). With a store.StateStore
+    attached, fills and positions are persisted and restore() rebuilds the
+    tracker at startup. A risk.PortfolioRisk attached as `risk` hears every
+    change to a market's exposure.
+    """
 
-    def __init__(self):
-        self._positions: dict[str, float] = {}  # token_id -> net USD
+    def __init__(self, store: Optional[StateStore] = None, risk: Optional[PortfolioRisk] = None):
+        self._cash: dict[str, float] = {}      # token_id -> net USD cash flow
+        self._shares: dict[str, float] = {}    # token_id -> shares held
+        self._avg_cost: dict[str, float] = {}  # token_id -> average entry price
+        self._realized: dict[str, float] = {}  # token_id -> realized P&L (USD)
+        self._marks: dict[str, float] = {}     # token_id -> latest mid
+        self._unreal: dict[str, float] = {}    # token_id -> shares * (mark - avg_cost)
+        self._pair: dict[str, str] = {}        # token_yes -> token_no
+        self._yes_of: dict[str, str] = {}      # token_no -> token_yes
         self._fill_count: int = 0
         self._buy_usd: float = 0.0
         self._sell_usd: float = 0.0
-
-    def get(self, token_id: str) -> float:
-        return self._positions.get(token_id, 0.0)
-
-    def update(self, token_id: str, delta_usd: float) -> None:
-        self._positions[token_id] = self._positions.get(token_id, 0.0) + delta_usd
-
-    def record_fill(self, side: str, usd: float) -> None:
+        self._realized_total: float = 0.0
+        self._unreal_total: float = 0.0
+        self.store = store
+        self.risk = risk
+
+    def register_pair(self, token_yes: str, token_no: str) -> None:
+        if token_no:
+            self._pair[token_yes] = token_no
+            self._yes_of[token_no] = token_yes
+        self._report(token_yes)
+
+    def _report(self, token_id: str) -> None:
+        """Tell the risk engine the new exposure of the market owning token_id."""
+        if self.risk is not None:
+            token_yes = self._yes_of.get(token_id, token_id)
+            self.risk.update(token_yes, self.exposure(token_yes))
+
+    # ── Reads ────────────────────────────────────────────────────────────────
+
+    def shares(self, token_id: str) -> float:
+        return self._shares.get(token_id, 0.0)
+
+    def mark(self, token_id: str) -> float:
+        """Latest mid for the token, falling back to its average cost."""
+        return self._marks.get(token_id, self._avg_cost.get(token_id, 0.0))
+
+    def exposure(self, token_yes: str) -> float:
+        """Net YES exposure of the pair in USD at the current mark (positive = long YES)."""
+        net = self.shares(token_yes)
+        token_no = self._pair.get(token_yes)
+        if token_no:
+            net -= self.shares(token_no)
+        if net == 0.0:
+            return 0.0
+        mark = self._marks.get(token_yes)
+        if mark is None:
+            mark = 1.0 - self._marks[token_no] if token_no in self._marks else 0.5
+        return net * mark
+
+    # ── Updates ──────────────────────────────────────────────────────────────
+
+    def apply_fill(
+        self, token_id: str, side: str, price: float, size: float,
+        trade_id: str = "", source: str = "ws",
+    ) -> float:
+        """Apply one of our fills (side as ours: BUY acquires shares). Returns its USD value."""
+        usd = price * size
         self._fill_count += 1
+        # BUY = we acquired shares (spent USD), SELL = we sold shares (received USD)
         if side == "BUY":
             self._buy_usd += usd
+            self._cash[token_id] = self._cash.get(token_id, 0.0) - usd
         else:
             self._sell_usd += usd
+            self._cash[token_id] = self._cash.get(token_id, 0.0) + usd
+
+        shares = self._shares.get(token_id, 0.0)
+        avg = self._avg_cost.get(token_id, 0.0)
+        signed = size if side == "BUY" else -size
+        if shares == 0.0 or (shares > 0) == (signed > 0):
+            # Opening or adding: blend the cost basis
+            avg = (avg * abs(shares) + price * size) / (abs(shares) + size)
+            shares += signed
+        else:
+            # Reducing: realize against the basis; any excess opens the other way at price
+            closed = min(size, abs(shares))
+            pnl = (price - avg) * closed if shares > 0 else (avg - price) * closed
+            self._realized[token_id] = self._realized.get(token_id, 0.0) + pnl
+            self._realized_total += pnl
+            shares += signed
+            if abs(shares) < 1e-9:
+                shares, avg = 0.0, 0.0
+            elif closed < size:
+                avg = price
+        self._shares[token_id] = shares
+        self._avg_cost[token_id] = avg
+        self._remark(token_id)
+        self._report(token_id)
+
+        if self.store is not None:
+            if trade_id:
+                self.store.record_fill(trade_id, token_id, side, price, size, source)
+            self.store.save_position(
+                token_id, self._cash[token_id], shares, avg, self._realized.get(token_id, 0.0)
+            )
+            self.store.save_totals(
+                {"fills": self._fill_count, "bought_usd": self._buy_usd, "sold_usd": self._sell_usd}
+            )
+        return usd
+
+    def mark_pair(self, token_yes: str, mid_yes: float) -> None:
+        """Mark a market at its YES mid; the NO token is marked at 1 - mid."""
+        self._marks[token_yes] = mid_yes
+        self._remark(token_yes)
+        token_no = self._pair.get(token_yes)
+        if token_no:
+            self._marks[token_no] = 1.0 - mid_yes
+            self._remark(token_no)
+        self._report(token_yes)
+
+    def _remark(self, token_id: str) -> None:
+        shares = self._shares.get(token_id, 0.0)
+        u = shares * (self.mark(token_id) - self._avg_cost.get(token_id, 0.0)) if shares else 0.0
+        self._unreal_total += u - self._unreal.get(token_id, 0.0)
+        self._unreal[token_id] = u
+
+    def restore(self, state: dict) -> None:
+        """Rebuild from store.StateStore.load()."""
+        for tid, p in state.get("positions", {}).items():
+            self._cash[tid] = p["net_usd"]
+            self._shares[tid] = p["shares"]
+            self._avg_cost[tid] = p["avg_cost"]
+            self._realized[tid] = p["realized"]
+            self._remark(tid)
+        self._realized_total = sum(self._realized.values())
+        totals = state.get("totals", {})
+        self._fill_count = int(totals.get("fills", 0))
+        self._buy_usd = totals.get("bought_usd", 0.0)
+        self._sell_usd = totals.get("sold_usd", 0.0)
+
+    # ── Reporting ────────────────────────────────────────────────────────────
 
     @property
     def total_fills(self) -> int:
         return self._fill_count
 
+    @property
+    def realized_pnl(self) -> float:
+        return self._realized_total
+
+    @property
+    def unrealized_pnl(self) -> float:
+        return self._unreal_total
+
     def summary(self) -> dict:
         return {
-            "positions": {k: round(v, 2) for k, v in self._positions.items() if abs(v) > 0.01},
+            "positions": {k: round(v, 1) for k, v in self._shares.items() if abs(v) > 0.05},
             "fills": self._fill_count,
             "bought_usd": round(self._buy_usd, 2),
             "sold_usd": round(self._sell_usd, 2),
-            "net_pnl": round(self._sell_usd - self._buy_usd, 2),
+            "realized_pnl": round(self._realized_total, 2),
+            "unrealized_pnl": round(self._unreal_total, 2),
+            "net_pnl": round(self._realized_total + self._unreal_total, 2),
         }
 
 
 # ── Order Manager ─────────────────────────────────────────────────────────────
 
 class OrderManager:
-    """Wraps py-clob-client for order placement and cancellation."""
+    """
+    Wraps py-clob-client for order placement and cancellation.
+    Tracks every resting order as an orders.WorkingOrder so a requote only
+    touches the orders whose price or size actually moved.
+    """
 
-    def __init__(self, client, dry_run: bool = False):
+    def __init__(
+        self,
+        client,
+        dry_run: bool = False,
+        latency: Optional[LatencyTracker] = None,
+        presign: bool = False,
+    ):
         self.client = client
         self.dry_run = dry_run
-        self._active_orders: dict[str, list[str]] = {}  # token_id -> [order_ids]
-        self._seen_fills: set[str] = set()  # fill/trade IDs already processed
+        self.latency = latency
+        # Pre-signed orders around each leg's quote; nothing to sign in dry-run
+        self.sign_cache = SignedOrderCache(self._create_signed) if presign and not dry_run else None
+        self._working: dict[str, list[WorkingOrder]] = {}  # token_id -> working orders
+        self._lock = threading.Lock()  # gateway threads and the event loop both update _working
+        self.fill_dedup = FillDedup()  # trade IDs already processed + REST watermarks
+        self._dry_ids = itertools.count(1)
+        self.rest_calls = 0  # cancel/post requests sent (dry-run included)
+
+    def working_orders(self, token_id: str) -> list[WorkingOrder]:
+        return list(self._working.get(token_id, ()))
+
+    # ── Sizing ───────────────────────────────────────────────────────────────
+
+    @staticmethod
+    def round_price(price: float, tick_size: float = 0.01) -> float:
+        return round(round(price / tick_size) * tick_size, 4)
+
+    @staticmethod
+    def size_in_shares(side: str, price: float, size_usd: float, min_size: float = 1.0) -> float:
+        # Size in shares = USD / price (for BUY YES) or USD / (1-price) (for SELL YES)
+        if side == BUY:
+            size_shares = size_usd / price if price > 0 else 0
+        else:
+            size_shares = size_usd / (1.0 - price) if price < 1.0 else 0
 
-    def cancel_market_orders(self, token_id: str) -> None:
-        """Cancel all resting orders for a token (batch + server-side fallback)."""
-        order_ids = self._active_orders.get(token_id, [])
-        if not order_ids:
-            return
+        # Cap shares to prevent explosion at extreme prices (e.g. 5.0/0.01 = 500)
+        max_shares = size_usd * 10
+        size_shares = min(size_shares, max_shares)
+        return max(min_size, round(size_shares, 1))
+
+    # ── Requoting ────────────────────────────────────────────────────────────
+
+    def plan_quotes(
+        self,
+        token_id: str,
+        quotes: list[tuple[str, float, float]],  # (side, price, size_usd)
+        tick_size: float = 0.01,
+        min_size: float = 1.0,
+    ) -> tuple[list[WorkingOrder], list[WorkingOrder], list[tuple[QuoteTarget, float]]]:
+        """
+        Diff the token's working orders against `quotes`.
+        Returns (keep, stale, missing) with missing as (target, size_usd).
+        """
+        targets, usd = [], {}
+        for side, price, size_usd in quotes:
+            px = self.round_price(price, tick_size)
+            t = QuoteTarget(side, px, self.size_in_shares(side, px, size_usd, min_size))
+            targets.append(t)
+            usd[id(t)] = size_usd
+        keep, stale, missing = diff_orders(self._working.get(token_id, ()), targets)
+        return keep, stale, [(t, usd[id(t)]) for t in missing]
+
+    def sync_quotes(
+        self,
+        token_id: str,
+        quotes: list[tuple[str, float, float]],  # (side, price, size_usd)
+        tick_size: float = 0.01,
+        min_size: float = 1.0,
+    ) -> dict:
+        """
+        Bring the token's resting orders in line with `quotes`.
+        Orders already at a target's rounded price and size are left alone;
+        the rest are cancelled by ID, then the missing targets are placed.
+        Returns {"kept", "cancelled", "placed"} counts.
+        """
+        keep, stale, missing = self.plan_quotes(token_id, quotes, tick_size, min_size)
+
+        # Cancel before placing so a moved quote never has two orders resting
+        cancelled = self.cancel_orders(token_id, stale) if stale else 0
+        placed = 0
+        for t, size_usd in missing:
+            if self.place_limit_post_only(token_id, t.side, t.price, size_usd, tick_size, min_size):
+                placed += 1
+        return {"kept": len(keep), "cancelled": cancelled, "placed": placed}
+
+    def cancel_orders(self, token_id: str, orders: list[WorkingOrder]) -> int:
+        """Cancel specific working orders by ID. Returns how many are gone."""
+        ids = self.begin_cancel(orders)
+        self.rest_calls += 1
 
         if self.dry_run:
-            logger.info(f"[DRY-RUN] Would cancel {len(order_ids)} orders for {token_id[:16]}...")
-            self._active_orders[token_id] = []
-            return
+            logger.info("[DRY-RUN] Would cancel %d orders for %.16s...", len(ids), token_id)
+            return self.ack_cancel(token_id, orders, {"canceled": ids})
 
         try:
-            # Batch cancel by order IDs
-            self.client.cancel_orders(order_ids)
-            logger.debug(f"Batch-cancelled {len(order_ids)} orders for {token_id[:16]}...")
+            resp = clob_call("cancel_orders", self.client.cancel_orders, ids) or {}
         except Exception as e:
-            logger.warning(f"Batch cancel failed for {token_id[:16]}...: {e}")
+            logger.warning("Batch cancel failed for %.16s...: %s", token_id, e)
+            return self.ack_cancel(token_id, orders, None)
+        logger.debug("Cancelled %d orders by ID for %.16s...", len(ids), token_id)
+        return self.ack_cancel(token_id, orders, resp)
+
+    @staticmethod
+    def begin_cancel(orders: list[WorkingOrder]) -> list[str]:
+        """Mark orders CANCELLING; returns the IDs to send."""
+        for wo in orders:
+            wo.state = CANCELLING
+        return [wo.order_id for wo in orders if wo.order_id]
+
+    def ack_cancel(self, token_id: str, orders: list[WorkingOrder], resp: Optional[dict]) -> int:
+        """
+        Apply a cancel response. None means the outcome is unknown: the orders
+        go back to LIVE so the next diff or reconcile retries them. Anything the
+        exchange refused to cancel is already matched or gone.
+        """
+        if resp is None:
+            for wo in orders:
+                wo.state = LIVE
+            _ORDERS_CANCEL_FAILED.inc(len(orders))
+            return 0
+        not_canceled = resp.get("not_canceled") or {}
+        if not_canceled:
+            logger.debug("Not cancelled for %.16s...: %s", token_id, not_canceled)
+            _ORDERS_NOT_CANCELLED.inc(len(not_canceled))
+        self._drop(token_id, orders)
+        _ORDERS_CANCELLED.inc(len(orders) - len(not_canceled))
+        return len(orders) - len(not_canceled)
+
+    def cancel_market_orders(self, token_id: str) -> None:
+        """Cancel all resting orders for a token (no-quote and shutdown paths)."""
+        orders = self._working.get(token_id)
+        if not orders:
+            return
 
+        if self.dry_run:
+            self.cancel_orders(token_id, list(orders))
+            return
+
+        self.rest_calls += 1
         try:
-            # Belt-and-suspenders: server-side cancel all for this asset
-            self.client.cancel_market_orders(asset_id=token_id)
+            # Server-side cancel for the asset also catches orders we lost track of
+            clob_call("cancel_market_orders", self.client.cancel_market_orders, asset_id=token_id)
+            logger.debug("Cancelled all orders for %.16s...", token_id)
         except Exception as e:
             logger.warning(f"Server-side cancel failed for {token_id[:16]}...: {e}")
+            self.cancel_orders(token_id, list(orders))
+            return
+        _ORDERS_CANCELLED.inc(len(orders))
+        self._drop(token_id, list(orders))
 
-        # Only clear tracking after both attempts
-        self._active_orders[token_id] = []
-
-    def check_fills(self, token_id: str, inventory: 'InventoryTracker') -> list[dict]:
-        """Check for new fills on a token and update inventory."""
+    def retire_token(self, token_id: str) -> None:
+        """
+        Server-side cancel of everything on the token, tracked or not, then
+        forget it: working orders and pre-signed orders. Fill dedup state is
+        account-wide and outlives the token.
+        """
+        orders = self.working_orders(token_id)
+        if self.dry_run:
+            if orders:
+                self.cancel_orders(token_id, orders)
+        else:
+            self.rest_calls += 1
+            try:
+                clob_call("cancel_market_orders", self.client.cancel_market_orders, asset_id=token_id)
+                _ORDERS_CANCELLED.inc(len(orders))
+            except Exception as e:
+                logger.warning(f"Server-side cancel failed for retired {token_id[:16]}...: {e}")
+                if orders:
+                    self.cancel_orders(token_id, orders)
+        with self._lock:
+            self._working.pop(token_id, None)
+        if self.sign_cache is not None:
+            self.sign_cache.invalidate(token_id)
+
+    def reconcile_orders(self, token_id: str) -> None:
+        """
+        Sync working orders with the exchange's open orders for the token:
+        drop ones that are no longer open (filled or cancelled without us
+        seeing it) and cancel open orders we aren't tracking.
+        """
         if self.dry_run:
-            return []
+            return
         try:
-            trades = self.client.get_trades(params=TradeParams(asset_id=token_id))
-            if not trades:
-                return []
-            new_fills = []
-            for t in trades:
-                tid = t.get("id") or t.get("tradeID") or ""
-                if not tid or tid in self._seen_fills:
-                    continue
-                self._seen_fills.add(tid)
-                side = t.get("side", "").upper()
-                price = float(t.get("price", 0))
-                size = float(t.get("size", 0))
-                usd = price * size
-                # BUY = we acquired shares (spent USD), SELL = we sold shares (received USD)
-                delta = -usd if side == "BUY" else usd
-                inventory.update(token_id, delta)
-                inventory.record_fill(side, usd)
-                new_fills.append({"side": side, "price": price, "size": size, "usd": usd})
-                logger.info(f"Fill: {side} {size:.1f}@{price:.3f} (${usd:.2f}) token={token_id[:16]}...")
-            return new_fills
+            open_orders = clob_call("get_orders", self.client.get_orders, OpenOrderParams(asset_id=token_id))
         except Exception as e:
-            logger.warning(f"Fill check failed for {token_id[:16]}...: {e}")
-            return []
+            logger.warning(f"Open-order reconcile failed for {token_id[:16]}...: {e}")
+            return
+        open_ids = {o.get("id") for o in open_orders or ()}
+        working = self._working.get(token_id, [])
+        gone = [wo for wo in working if wo.state == LIVE and wo.order_id not in open_ids]
+        if gone:
+            self._drop(token_id, gone)
+            logger.info(f"Reconcile: {len(gone)} orders no longer open for {token_id[:16]}...")
+        known = {wo.order_id for wo in working}
+        orphans = [oid for oid in open_ids if oid and oid not in known]
+        if orphans:
+            logger.warning(f"Reconcile: cancelling {len(orphans)} untracked orders for {token_id[:16]}...")
+            self.rest_calls += 1
+            try:
+                clob_call("cancel_orders", self.client.cancel_orders, orphans)
+            except Exception as e:
+                logger.warning(f"Orphan cancel failed for {token_id[:16]}...: {e}")
+
+    def on_fill(self, token_id: str, price: float, size: float) -> None:
+        """Apply one of our fills to the working order resting at that price."""
+        for wo in self._working.get(token_id, ()):
+            if abs(wo.price - price) < 1e-9 and wo.remaining > 0:
+                wo.filled += size
+                if wo.remaining <= SIZE_EPS:
+                    self._drop(token_id, [wo])
+                return
+
+    def _drop(self, token_id: str, orders: list[WorkingOrder]) -> None:
+        with self._lock:
+            working = self._working.get(token_id)
+            if working:
+                self._working[token_id] = [wo for wo in working if all(wo is not o for o in orders)]
 
     def place_limit_post_only(
         self,
@@ -181,51 +516,187 @@ class OrderManager:
         Place a post-only GTC limit order.
         Returns order_id or None on failure.
         """
-        # Round price to tick
-        price = round(round(price / tick_size) * tick_size, 4)
-
-        # Size in shares = USD / price (for BUY YES) or USD / (1-price) (for SELL YES)
-        if side == BUY:
-            size_shares = size_usd / price if price > 0 else 0
-        else:
-            size_shares = size_usd / (1.0 - price) if price < 1.0 else 0
-
-        # Cap shares to prevent explosion at extreme prices (e.g. 5.0/0.01 = 500)
-        max_shares = size_usd * 10
-        size_shares = min(size_shares, max_shares)
-        size_shares = max(min_size, round(size_shares, 1))
+        wo, signed = self.sign_order(token_id, side, price, size_usd, tick_size, min_size)
+        if wo is None:
+            return None
+        self.rest_calls += 1
 
         if self.dry_run:
-            logger.info(
-                f"[DRY-RUN] {side} {size_shares:.1f} shares @ {price:.3f} "
-                f"token={token_id[:16]}..."
-            )
-            return f"dry-{token_id[:8]}-{side}-{int(time.time())}"
+            return self.ack_order(wo, {"orderID": f"dry-{token_id[:8]}-{side}-{next(self._dry_ids)}"})
 
         try:
-            order_args = OrderArgs(
-                price=price,
-                size=size_shares,
-                side=side,
-                token_id=token_id,
-            )
-            signed = self.client.create_order(order_args)
-            resp = self.client.post_order(signed, OrderType.GTC, post_only=True)
+            t0 = time.perf_counter_ns()
+            resp = clob_call("post_order", self.client.post_order, signed, OrderType.GTC, post_only=True)
+            if self.latency is not None:
+                self.latency.record_token_ns(token_id, "post", time.perf_counter_ns() - t0)
+        except Exception as e:
+            logger.error("Order placement failed (%s @ %.3f): %s", side, wo.price, e)
+            self._drop(token_id, [wo])
+            return None
+        return self.ack_order(wo, resp)
 
-            order_id = resp.get("orderID") or resp.get("order_id")
-            if order_id:
-                self._active_orders.setdefault(token_id, []).append(order_id)
+    def sign_order(
+        self,
+        token_id: str,
+        side: str,
+        price: float,
+        size_usd: float,
+        tick_size: float = 0.01,
+        min_size: float = 1.0,
+    ) -> tuple[Optional[WorkingOrder], object]:
+        """
+        Round, size and sign an order, and track it as PENDING.
+        Returns (working order, signed order); (None, None) if signing failed.
+        The signed order is None in dry-run.
+        """
+        price = self.round_price(price, tick_size)
+        size_shares = self.size_in_shares(side, price, size_usd, min_size)
+
+        if self.dry_run:
+            logger.info("[DRY-RUN] %s %.1f shares @ %.3f token=%.16s...", side, size_shares, price, token_id)
+            signed = None
+        else:
+            try:
+                t0 = time.perf_counter_ns()
+                signed = None
+                if self.sign_cache is not None:
+                    signed = self.sign_cache.take(token_id, side, price, size_shares)
+                if signed is None:
+                    signed = self._create_signed(token_id, side, price, size_shares)
+                if self.latency is not None:
+                    self.latency.record_token_ns(token_id, "sign", time.perf_counter_ns() - t0)
+            except Exception as e:
+                logger.error(f"Order signing failed ({side} @ {price:.3f}): {e}")
+                return None, None
+
+        wo = WorkingOrder(token_id=token_id, side=side, price=price, size=size_shares)
+        with self._lock:
+            self._working.setdefault(token_id, []).append(wo)
+        return wo, signed
+
+    def _create_signed(self, token_id: str, side: str, price: float, size_shares: float):
+        return self.client.create_order(OrderArgs(
+            price=price,
+            size=size_shares,
+            side=side,
+            token_id=token_id,
+        ))
+
+    def prewarm(
+        self,
+        token_id: str,
+        side: str,
+        ladder: list[tuple[float, float]],  # (price, size_usd) per level
+        tick_size: float = 0.01,
+        min_size: float = 1.0,
+    ) -> int:
+        """Pre-sign the SIGN_CACHE_LEVELS ticks either side of each ladder level at its size. Blocking."""
+        if self.sign_cache is None:
+            return 0
+        levels = set()
+        for price, size_usd in ladder:
+            for k in range(-SIGN_CACHE_LEVELS, SIGN_CACHE_LEVELS + 1):
+                px = self.round_price(price + k * tick_size, tick_size)
+                if tick_size <= px <= 1.0 - tick_size:
+                    levels.add((px, self.size_in_shares(side, px, size_usd, min_size)))
+        return self.sign_cache.refill(token_id, side, list(levels))
+
+    def ack_order(self, wo: WorkingOrder, resp: Optional[dict]) -> Optional[str]:
+        """Apply a post response: PENDING → LIVE, or drop the order if it was rejected."""
+        resp = resp or {}
+        order_id = resp.get("orderID") or resp.get("order_id")
+        if order_id and resp.get("success", True):
+            wo.order_id = order_id
+            wo.state = LIVE
+            _ORDERS_ACCEPTED.inc()
+            if not self.dry_run:
                 logger.info(
-                    f"Order placed: {side} {size_shares:.1f}@{price:.3f} "
-                    f"id={order_id[:12]} token={token_id[:16]}..."
+                    "Order placed: %s %.1f@%.3f id=%.12s token=%.16s...",
+                    wo.side, wo.size, wo.price, order_id, wo.token_id,
                 )
-                return order_id
-            else:
-                logger.warning(f"Order response missing ID: {resp}")
-                return None
-        except Exception as e:
-            logger.error(f"Order placement failed ({side} @ {price:.3f}): {e}")
+            return order_id
+        logger.warning("Order rejected (%s @ %.3f): %s", wo.side, wo.price, resp)
+        _ORDERS_REJECTED.inc()
+        self._drop(wo.token_id, [wo])
+        return None
+
+
+# ── REST Mid Poller ───────────────────────────────────────────────────────────
+
+class RestMidPoller:
+    """
+    Batched REST midpoints for tokens whose WS data isn't FRESH.
+    MarketLoops add their token when the feed goes quiet and discard it when
+    it recovers, so REST is only paid for while the stream is unhealthy.
+    One get_midpoints call per REST_POLL_BATCH tokens per round.
+    """
+
+    def __init__(self, client, interval: float = REST_POLL_SEC):
+        self.client = client
+        self.interval = interval
+        self._tokens: set[str] = set()
+        self._mids: dict[str, float] = {}
+        self._round: Optional[asyncio.Future] = None  # resolved when the next poll lands
+        self._kick = asyncio.Event()
+        self.polls = 0
+
+    def add(self, token_id: str) -> None:
+        if token_id not in self._tokens:
+            self._tokens.add(token_id)
+            self._kick.set()  # don't make a newly failed-over token wait a full interval
+
+    def discard(self, token_id: str) -> None:
+        self._tokens.discard(token_id)
+        self._mids.pop(token_id, None)
+
+    async def wait_mid(self, token_id: str, timeout: float) -> Optional[float]:
+        """Mid from the next poll round, or None on timeout / missing token."""
+        if self._round is None or self._round.done():
+            self._round = asyncio.get_running_loop().create_future()
+        try:
+            await asyncio.wait_for(asyncio.shield(self._round), timeout)
+        except asyncio.TimeoutError:
             return None
+        return self._mids.get(token_id)
+
+    async def run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._kick.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._kick.clear()
+            if not self._tokens:
+                continue
+            tokens = list(self._tokens)
+            for i in range(0, len(tokens), REST_POLL_BATCH):
+                chunk = tokens[i:i + REST_POLL_BATCH]
+                try:
+                    resp = await asyncio.to_thread(
+                        clob_call, "get_midpoints", self.client.get_midpoints,
+                        [BookParams(token_id=t) for t in chunk],
+                    )
+                except Exception as e:
+                    logger.warning(f"Batched midpoint fetch failed for {len(chunk)} tokens: {e}")
+                    continue
+                self._store(resp)
+            self.polls += 1
+            if self._round is not None and not self._round.done():
+                self._round.set_result(None)
+
+    def _store(self, resp) -> None:
+        # {token_id: "0.51", ...}, or a list of {"token_id"/"asset_id", "mid"} entries
+        items = resp.items() if isinstance(resp, dict) else (
+            ((r.get("token_id") or r.get("asset_id"), r.get("mid")) for r in resp or ())
+        )
+        for tid, mid in items:
+            if isinstance(mid, dict):
+                mid = mid.get("mid")
+            try:
+                if tid in self._tokens:
+                    self._mids[tid] = float(mid)
+            except (TypeError, ValueError):
+                continue
 
 
 # ── Market Loop ───────────────────────────────────────────────────────────────
@@ -244,6 +715,13 @@ class MarketLoop:
         order_mgr: OrderManager,
         size_usd: float,
         feed: Optional['MarketFeed'] = None,
+        latency: Optional[LatencyTracker] = None,
+        rest_poller: Optional[RestMidPoller] = None,
+        gateway: Optional[OrderGateway] = None,
+        batcher: Optional[OrderBatcher] = None,
+        scheduler: Optional[RequoteScheduler] = None,
+        fill_reconciler: Optional[FillReconciler] = None,
+        risk: Optional[PortfolioRisk] = None,
     ):
         self.market = market
         self.engine = engine
@@ -255,7 +733,45 @@ class MarketLoop:
         self.token_no = market["token_no"]
         self.cycles = 0
         self._last_requote: float = 0.0
+        self._seen_seq = 0  # feed update sequence consumed by the last requote
         self._running = False
+        self.rest_poller = rest_poller
+        self.gateway = gateway  # None: call the client inline (replay, tests)
+        self.batcher = batcher  # None: each market sends its own cancels/posts
+        self._prewarm_task: Optional[asyncio.Task] = None
+        self.scheduler = scheduler  # None: only MIN_REQUOTE_SEC limits this market
+        self._cost_estimate = 2.0 * engine.levels  # EMA of order operations per requote
+        self.fill_reconciler = fill_reconciler
+        self.risk = risk
+        if risk is not None:
+            # Correlation group: the Gamma event, else just this condition
+            risk.register_market(self.token_yes, market.get("event_id") or market.get("condition_id") or "")
+        inventory.register_pair(self.token_yes, self.token_no)
+        if fill_reconciler is not None:
+            for tid in (self.token_yes, self.token_no):
+                fill_reconciler.register(tid, self._apply_rest_fills)
+        self._rest_mode = False  # quoting off batched REST because the feed isn't FRESH
+        self._last_mid: Optional[float] = None
+        self.started_at = time.time()
+        self.draining = False  # rotation.py: quote only the side that reduces the position
+        self.drain_started = 0.0
+
+        # Market key for the scheduler, gateway, latency and metrics: the YES token,
+        # since questions can share their first 50 characters. The question is display only.
+        self._key = self.token_yes
+        self._label = market["question"][:50]
+
+        # Latency: stamps of the WS update behind the pending requote
+        self.latency = latency
+        self._wake_ns = 0
+        self._trigger_recv_ns = 0
+        if latency is not None:
+            latency.register_market(self._key, (self.token_yes, self.token_no), self._label)
+
+        # Metrics: bind this market's children once
+        self._m_requotes = _REQUOTES.labels(self._key, self._label)
+        _VPIN.labels(self._key, self._label).set_function(engine.vpin.vpin)
+        _EXPOSURE.labels(self._key, self._label).set_function(lambda: inventory.exposure(self.token_yes))
 
     async def run(self) -> None:
         """Event-driven loop: wait for WS mid update or REST fallback on timeout."""
@@ -266,13 +782,24 @@ class MarketLoop:
             try:
                 # Wait for WS mid update, or fall back to REST after timeout
                 ws_update = False
-                if self.feed:
-                    ws_update = await self.feed.wait_for_update(
-                        self.token_yes, timeout=QUOTE_REFRESH_SEC
+                rest_mid = None
+                if self.feed and self._use_rest():
+                    rest_mid = await self.rest_poller.wait_mid(self.token_yes, timeout=QUOTE_REFRESH_SEC)
+                    await self._process_ws_fills()
+                    if rest_mid is not None and not self._rest_requote_due(rest_mid):
+                        continue
+                elif self.feed:
+                    seq = await self.feed.wait_for_update(
+                        self.token_yes, self._seen_seq, timeout=QUOTE_REFRESH_SEC
                     )
+                    ws_update = seq > self._seen_seq
+                    if ws_update and self.latency is not None:
+                        self._stamp_wakeup()
 
                     # Process WS fills before requoting
                     await self._process_ws_fills()
+                    if not ws_update and self._use_rest():
+                        continue  # went quiet while we waited: next round comes from the poller
                 else:
                     await asyncio.sleep(QUOTE_REFRESH_SEC)
 
@@ -282,28 +809,43 @@ class MarketLoop:
                 if elapsed < MIN_REQUOTE_SEC:
                     await asyncio.sleep(MIN_REQUOTE_SEC - elapsed)
 
-                # Get midpoint: prefer WS cached, fall back to REST
+                # Get midpoint: prefer WS cached, then local L2 book, fall back to REST
                 mid = None
-                if self.feed:
+                if rest_mid is not None:
+                    mid, source = rest_mid, "REST-batch"
+                elif self.feed:
+                    # Consume the sequence together with the mid we quote on, so
+                    # anything published after this point wakes the next wait
+                    slot = self.feed.get_slot(self.token_yes)
+                    if slot is not None:
+                        self._seen_seq = slot.seq
                     mid = self.feed.get_mid(self.token_yes)
                     if mid is not None:
                         source = "WS" if ws_update else "WS-cached"
+                    elif self.feed.freshness(self.token_yes) == FRESH:
+                        book = self.feed.get_book(self.token_yes)
+                        mid = book.mid() if book is not None else None
+                        if mid is not None:
+                            source = "WS-book"
 
                 if mid is None:
                     # REST fallback
                     try:
-                        mid_data = self.order_mgr.client.get_midpoint(self.token_yes)
+                        mid_data = await self._call(self.order_mgr.client.get_midpoint, self.token_yes)
                         mid = float(mid_data.get("mid", self.market.get("mid", 0.5)))
                         source = "REST"
                     except Exception as e:
                         logger.warning(f"[{question_short}] midpoint fetch failed: {e}")
                         continue
 
-                await self._requote(mid, source)
+                if self.scheduler is None:
+                    await self._requote(mid, source)
+                else:
+                    await self._requote_scheduled(mid, source)
 
-                # REST fill reconciliation every 5th cycle
+                # REST open-order reconciliation every 5th cycle (fills: FillReconciler)
                 if self.cycles % 5 == 0:
-                    self._reconcile_fills_rest()
+                    await self._reconcile_orders_rest()
 
             except asyncio.CancelledError:
                 return
@@ -313,58 +855,231 @@ class MarketLoop:
 
     def stop(self):
         self._running = False
+        _REQUOTES.remove(self._key, self._label)
+        _VPIN.remove(self._key, self._label)
+        _EXPOSURE.remove(self._key, self._label)
+        if self.fill_reconciler is not None:
+            for tid in (self.token_yes, self.token_no):
+                self.fill_reconciler.unregister(tid)
+        # Stays registered with risk: a retired market's exposure still counts until flat
+        if self._rest_mode:
+            self.rest_poller.discard(self.token_yes)
+
+    def drain(self) -> None:
+        """Stop adding exposure; the market is on its way out (rotation.py)."""
+        if not self.draining:
+            self.draining = True
+            self.drain_started = time.time()
+
+    def _use_rest(self) -> bool:
+        """Fail over to batched REST while the feed isn't FRESH, and back once it is."""
+        if self.rest_poller is None:
+            return False
+        state = self.feed.freshness(self.token_yes)
+        if (state != FRESH) != self._rest_mode:
+            self._rest_mode = not self._rest_mode
+            question_short = self.market["question"][:50]
+            if self._rest_mode:
+                self.rest_poller.add(self.token_yes)
+                logger.warning(f"[{question_short}] feed {state} — quoting from batched REST mids")
+            else:
+                self.rest_poller.discard(self.token_yes)
+                logger.info(f"[{question_short}] feed fresh again — back to WS-driven quoting")
+        return self._rest_mode
+
+    def _rest_requote_due(self, mid: float) -> bool:
+        """In REST mode, requote on a MID_THRESHOLD move or every QUOTE_REFRESH_SEC."""
+        return (
+            self._last_mid is None
+            or abs(mid - self._last_mid) >= MID_THRESHOLD
+            or time.time() - self._last_requote >= QUOTE_REFRESH_SEC
+        )
+
+    async def _call(self, fn, *args, **kwargs):
+        """Run a blocking client/OrderManager call through the gateway, off the event loop."""
+        if self.gateway is None:
+            return fn(*args, **kwargs)
+        return await self.gateway.submit(self._key, fn, *args, **kwargs)
+
+    async def _cancel_both(self) -> None:
+        await asyncio.gather(
+            self._call(self.order_mgr.cancel_market_orders, self.token_yes),
+            self._call(self.order_mgr.cancel_market_orders, self.token_no),
+        )
 
-    async def _requote(self, mid: float, source: str = "REST") -> None:
-        """Generate and place quotes for given midpoint."""
+    async def _sync_leg(self, token_id: str, quotes: list[tuple[str, float, float]]) -> dict:
+        """OrderManager.sync_quotes, with cancels and posts going through the batcher if there is one."""
+        tick = self.market.get("tick_size", 0.01)
+        min_size = self.market.get("min_order_size", 1.0)
+        om = self.order_mgr
+        if self.batcher is None:
+            return await self._call(om.sync_quotes, token_id, quotes, tick, min_size)
+
+        keep, stale, missing = om.plan_quotes(token_id, quotes, tick, min_size)
+        cancelled = 0
+        if stale:
+            ids = om.begin_cancel(stale)
+            try:
+                resp = await self.batcher.cancel(ids)
+            except Exception:
+                resp = None  # already logged by the batcher; orders stay tracked
+            cancelled = om.ack_cancel(token_id, stale, resp)
+
+        async def place(target, size_usd) -> bool:
+            wo, signed = await self._call(
+                om.sign_order, token_id, target.side, target.price, size_usd, tick, min_size
+            )
+            if wo is None:
+                return False
+            try:
+                resp = await self.batcher.post(token_id, signed)
+            except Exception as e:
+                resp = {"success": False, "errorMsg": str(e)}
+            return om.ack_order(wo, resp) is not None
+
+        placed = sum(await asyncio.gather(*(place(t, usd) for t, usd in missing)))
+        return {"kept": len(keep), "cancelled": cancelled, "placed": placed}
+
+    async def _prewarm(self, legs: list[tuple[str, list[tuple[str, float, float]]]]) -> None:
+        """Refill the sign cache around each leg's ladder, off the loop and off the order limiter."""
+        tick = self.market.get("tick_size", 0.01)
+        min_size = self.market.get("min_order_size", 1.0)
+        calls = [
+            (self.order_mgr.prewarm, token_id, BUY, [(p, usd) for _, p, usd in ladder], tick, min_size)
+            for token_id, ladder in legs if ladder
+        ]
+        try:
+            if self.gateway is None:
+                for fn, *args in calls:
+                    fn(*args)
+            else:
+                await asyncio.gather(*(self.gateway.submit(f"{self._key}/sign", *c) for c in calls))
+        except Exception as e:
+            logger.debug("[%s] pre-sign failed: %s", self._label, e)
+
+    def _stamp_wakeup(self) -> None:
+        """Record publish → wakeup and remember the triggering frame for recv → ack."""
+        self._wake_ns = time.perf_counter_ns()
+        slot = self.feed.get_slot(self.token_yes)
+        if slot is not None and slot.pub_ns:
+            self.latency.record_ns(self._key, "pub_to_wake", self._wake_ns - slot.pub_ns)
+            self._trigger_recv_ns = slot.pub_recv_ns
+
+    async def _requote_scheduled(self, mid: float, source: str) -> None:
+        """Requote once the account-wide budget admits this market."""
+        est = self._cost_estimate
+        await self.scheduler.acquire(self._key, lambda: self._urgency(mid), est)
+        # The wait can be long under load: quote the latest WS mid, not the one that queued us
+        if source.startswith("WS"):
+            slot = self.feed.get_slot(self.token_yes)
+            latest = self.feed.get_mid(self.token_yes)
+            if latest is not None:
+                mid = latest
+                if slot is not None:
+                    self._seen_seq = slot.seq
+        ops = await self._requote(mid, source)
+        self.scheduler.settle(est, ops)
+        self._cost_estimate = max(1.0, 0.8 * est + 0.2 * ops)
+
+    def _urgency(self, mid: float) -> float:
+        """How much a stale quote costs here: mid move, inventory pressure, quote age."""
+        now_mid = self.feed.get_mid(self.token_yes) if self.feed else None
+        if now_mid is None:
+            now_mid = mid
+        tick = self.market.get("tick_size", 0.01)
+        move = abs(now_mid - self._last_mid) / tick if self._last_mid is not None else 1.0
+        exposure = self.risk.skew_usd(self.token_yes) if self.risk else self.inventory.exposure(self.token_yes)
+        inv = abs(exposure) / self.engine.max_inventory
+        age = (time.time() - self._last_requote) / QUOTE_REFRESH_SEC
+        return URGENCY_MOVE * move + URGENCY_INVENTORY * inv + URGENCY_AGE * age
+
+    async def _requote(self, mid: float, source: str = "REST") -> int:
+        """Generate and place quotes for given midpoint. Returns order operations sent."""
         self.cycles += 1
+        self._m_requotes.inc()
         self._last_requote = time.time()
+        self._last_mid = mid
         token = self.token_yes
         question_short = self.market["question"][:50]
 
-        inv = self.inventory.get(token)
+        self.inventory.mark_pair(token, mid)
+        exposure = self.inventory.exposure(token)
+        if self.risk is not None:
+            inv = self.risk.skew_usd(token)
+            room = self.risk.room(token)
+        else:
+            inv = exposure
+            room = None
+        if self.draining:
+            # Only the reducing side, sized to the position but at least one order
+            unwind = max(abs(exposure), self.size_usd)
+            room = (unwind, 0.0) if exposure < 0 else (0.0, unwind) if exposure > 0 else (0.0, 0.0)
         days = self.market.get("days_to_close", 30.0)
         T = min(1.0, max(0.01, days / 30.0))
 
-        quote = self.engine.quote(mid=mid, inventory_usd=inv, time_remaining_fraction=T)
+        lat = self.latency
+        if lat is not None:
+            t0 = time.perf_counter_ns()
+            if self._wake_ns:
+                lat.record_ns(self._key, "hold", t0 - self._wake_ns)
+                self._wake_ns = 0
+        quote = self.engine.quote(
+            mid=mid, inventory_usd=inv, time_remaining_fraction=T,
+            size_usd=self.size_usd, tick_size=self.market.get("tick_size", 0.01), room=room,
+            exposure_usd=exposure,
+        )
+        if lat is not None:
+            lat.record_ns(self._key, "quote", time.perf_counter_ns() - t0)
 
         if quote is None:
             vpin_status = self.engine.vpin.status()
             if vpin_status["toxic"]:
-                logger.warning(
-                    f"[{question_short}] VPIN={vpin_status['vpin']:.3f} TOXIC — skipping"
-                )
+                logger.warning("[%s] VPIN=%.3f TOXIC — skipping", question_short, vpin_status["vpin"])
             else:
-                logger.info(f"[{question_short}] No quote (inventory limit or VPIN)")
-            self.order_mgr.cancel_market_orders(token)
-            self.order_mgr.cancel_market_orders(self.token_no)
-            return
-
-        logger.info(
-            f"[{question_short}] "
-            f"mid={mid:.3f}({source}) res={quote.reservation:.3f} "
-            f"bid={quote.bid:.3f} ask={quote.ask:.3f} "
-            f"spread={quote.spread:.3f} inv=${inv:.1f}"
-        )
-
-        self.order_mgr.cancel_market_orders(token)
-        self.order_mgr.cancel_market_orders(self.token_no)
+                logger.info("[%s] No quote (inventory limit or VPIN)", question_short)
+            ops = sum(
+                len(self.order_mgr.working_orders(t)) for t in (token, self.token_no)
+            )
+            await self._cancel_both()
+            return ops
+
+        if logger.isEnabledFor(logging.INFO):
+            # Depth context from the local L2 book (no REST round trip)
+            book_info = ""
+            book = self.feed.get_book(token) if self.feed else None
+            micro = book.microprice() if book is not None else None
+            if micro is not None:
+                top = book.depth(1)
+                book_info = f" micro={micro:.3f} top={top.bids[0][1]:.0f}x{top.asks[0][1]:.0f}"
+            logger.info(
+                "[%s] mid=%.3f(%s) res=%.3f bid=%.3f ask=%.3f spread=%.3f levels=%dx%d inv=$%.1f%s",
+                question_short, mid, source, quote.reservation, quote.bid, quote.ask,
+                quote.spread, len(quote.bids), len(quote.asks), inv, book_info,
+            )
 
-        self.order_mgr.place_limit_post_only(
-            token_id=token,
-            side=BUY,
-            price=quote.bid,
-            size_usd=self.size_usd,
-            tick_size=self.market.get("tick_size", 0.01),
-            min_size=self.market.get("min_order_size", 1.0),
-        )
-        self.order_mgr.place_limit_post_only(
-            token_id=self.token_no,
-            side=BUY,
-            price=round(1.0 - quote.ask, 4),
-            size_usd=self.size_usd,
-            tick_size=self.market.get("tick_size", 0.01),
-            min_size=self.market.get("min_order_size", 1.0),
+        # YES and NO ladders are diffed against what's resting and synced together.
+        # Asks sell YES, which we quote as bids on NO at 1 - price.
+        yes_ladder = [(BUY, lv.price, lv.size_usd) for lv in quote.bids]
+        no_ladder = [(BUY, round(1.0 - lv.price, 4), lv.size_usd) for lv in quote.asks]
+        yes, no = await asyncio.gather(
+            self._sync_leg(token, yes_ladder),
+            self._sync_leg(self.token_no, no_ladder),
         )
+        kept = yes["kept"] + no["kept"]
+        if kept:
+            logger.debug(
+                "[%s] kept %d resting, replaced %d, placed %d", question_short, kept,
+                yes["cancelled"] + no["cancelled"], yes["placed"] + no["placed"],
+            )
+        if lat is not None and self._trigger_recv_ns:
+            lat.record_ns(self._key, "recv_to_ack", time.perf_counter_ns() - self._trigger_recv_ns)
+        self._trigger_recv_ns = 0
+
+        # Sign the neighbouring levels now, so the next move is a lookup plus a POST
+        if self.order_mgr.sign_cache is not None and (self._prewarm_task is None or self._prewarm_task.done()):
+            self._prewarm_task = asyncio.create_task(
+                self._prewarm([(token, yes_ladder), (self.token_no, no_ladder)])
+            )
 
         # Periodic P&L summary (every 10 cycles)
         if self.cycles % 10 == 0:
@@ -374,7 +1089,9 @@ class MarketLoop:
                 logger.info(
                     f"[{question_short}] === P&L Summary (cycle {self.cycles}) === "
                     f"fills={total_fills} positions={pnl}"
+                    + (f" risk={self.risk.summary()}" if self.risk is not None else "")
                 )
+        return yes["cancelled"] + yes["placed"] + no["cancelled"] + no["placed"]
 
     async def _process_ws_fills(self) -> None:
         """Drain WS fill queues for both tokens and update inventory/VPIN."""
@@ -383,39 +1100,47 @@ class MarketLoop:
 
         all_fills: list[FillUpdate] = []
         for tid in (self.token_yes, self.token_no):
-            all_fills.extend(await self.feed.get_fills(tid))
+            # The WS repeats a trade on every status change, and REST may have counted it already
+            all_fills.extend(
+                f for f in await self.feed.get_fills(tid) if self.order_mgr.fill_dedup.add(f.trade_id)
+            )
 
+        _FILLS_WS.inc(len(all_fills))
         for f in all_fills:
-            usd = f.price * f.size
-            delta = -usd if f.side == "BUY" else usd
-            self.inventory.update(f.token_id, delta)
-            self.inventory.record_fill(f.side, usd)
+            self.inventory.apply_fill(f.token_id, f.side, f.price, f.size, f.trade_id, "ws")
+            self.order_mgr.on_fill(f.token_id, f.price, f.size)
             self.engine.vpin.add_trade(f.price, f.size, f.side == "BUY")
-            # Mark as seen for REST dedup
-            self.order_mgr._seen_fills.add(f.trade_id)
 
         if all_fills:
             question_short = self.market["question"][:50]
             vpin_status = self.engine.vpin.status()
             logger.info(
-                f"[{question_short}] VPIN={vpin_status['vpin']:.3f} "
-                f"trades={vpin_status['trades_in_window']} toxic={vpin_status['toxic']}"
+                "[%s] VPIN=%.3f trades=%d toxic=%s", question_short,
+                vpin_status["vpin"], vpin_status["trades_in_window"], vpin_status["toxic"],
             )
 
-    def _reconcile_fills_rest(self) -> None:
-        """REST fill check for reconciliation (catches any WS misses)."""
-        fills = self.order_mgr.check_fills(self.token_yes, self.inventory)
-        fills_no = self.order_mgr.check_fills(self.token_no, self.inventory)
-        all_fills = fills + fills_no
-        for f in all_fills:
+    async def _reconcile_orders_rest(self) -> None:
+        """REST open-order check (drops orders that went away, cancels untracked ones)."""
+        await asyncio.gather(
+            self._call(self.order_mgr.reconcile_orders, self.token_yes),
+            self._call(self.order_mgr.reconcile_orders, self.token_no),
+        )
+
+    def _apply_rest_fills(self, token_id: str, fills: list[dict]) -> None:
+        """FillReconciler callback: fills the WS missed, for one of our tokens."""
+        _FILLS_REST.inc(len(fills))
+        for f in fills:
+            usd = self.inventory.apply_fill(token_id, f["side"], f["price"], f["size"], f["id"], "rest")
+            self.order_mgr.on_fill(token_id, f["price"], f["size"])
             self.engine.vpin.add_trade(f["price"], f["size"], f["side"] == "BUY")
-        if all_fills:
-            question_short = self.market["question"][:50]
-            vpin_status = self.engine.vpin.status()
             logger.info(
-                f"[{question_short}] REST reconciliation: {len(all_fills)} new fills, "
-                f"VPIN={vpin_status['vpin']:.3f}"
+                "Fill: %s %.1f@%.3f ($%.2f) token=%.16s...", f["side"], f["size"], f["price"], usd, token_id
             )
+        question_short = self.market["question"][:50]
+        vpin_status = self.engine.vpin.status()
+        logger.info(
+            "[%s] REST reconciliation: %d new fills, VPIN=%.3f", question_short, len(fills), vpin_status["vpin"]
+        )
 
 
 # ── Main Bot ──────────────────────────────────────────────────────────────────
@@ -431,7 +1156,25 @@ class PolyMakerBot:
         self.num_markets = num_markets
         self._running = False
         self._loops: list[MarketLoop] = []
-        self._feed: Optional[MarketFeed] = None
+        self._feed: Optional[MarketFeed | SharedMemoryFeed] = None
+        self._recorder: Optional[FeedRecorder] = None
+        self._latency = LatencyTracker()
+        self._rest_poller: Optional[RestMidPoller] = None
+        self._gateway: Optional[OrderGateway] = None
+        self._batcher: Optional[OrderBatcher] = None
+        self._scheduler: Optional[RequoteScheduler] = None
+        self._fill_reconciler: Optional[FillReconciler] = None
+        self._order_mgr: Optional[OrderManager] = None
+        self._inventory: Optional[InventoryTracker] = None
+        self._store: Optional[StateStore] = None
+        self._risk: Optional[PortfolioRisk] = None
+        self._metrics_server: Optional[MetricsServer] = None
+        self._rotator: Optional[MarketRotator] = None
+        self._rotation_task: Optional[asyncio.Task] = None
+        self._loop_tasks: dict[str, asyncio.Task] = {}  # token_yes -> MarketLoop.run task
+        self._retired_yes: dict[str, str] = {}  # token of a retired, not yet flat market -> its token_yes
+        self._settle_tasks: set[asyncio.Task] = set()
+        self._aux_tasks: list[asyncio.Task] = []  # background tasks cancelled at shutdown
 
     def _setup(self):
         logger.info("=" * 60)
@@ -441,8 +1184,21 @@ class PolyMakerBot:
         logger.info("=" * 60)
 
         # Auth
-        client = get_client()
-        logger.info("CLOB client authenticated")
+        if SIM_EXCHANGE:
+            if STORE_PATH and os.path.normpath(STORE_PATH) == os.path.normpath(LIVE_STORE_PATH):
+                # Sim fills would become the next live run's warm-start positions
+                raise RuntimeError(
+                    f"SIM_EXCHANGE is set but STORE_PATH is the live store ({LIVE_STORE_PATH}); "
+                    "use simexchange.sim_env() or set STORE_PATH to a separate file (or empty)"
+                )
+            # Local simulator: throwaway key, no wallet (see simexchange.py)
+            from simexchange import sim_client
+            client = sim_client(SIM_EXCHANGE)
+            logger.info(f"CLOB client authenticated against simulator {SIM_EXCHANGE}")
+        else:
+            from auth import get_client
+            client = get_client()
+            logger.info("CLOB client authenticated")
 
         # Discover markets
         markets = find_maker_markets(limit=self.num_markets * 3)
@@ -470,29 +1226,184 @@ class PolyMakerBot:
             "api_secret": client.creds.api_secret,
             "api_passphrase": client.creds.api_passphrase,
         }
-        self._feed = MarketFeed(
-            api_creds=api_creds,
-            token_ids=token_ids,
-            condition_ids=condition_ids,
-            mid_threshold=MID_THRESHOLD,
-        )
+        record_dir = str(Path(__file__).parent / FEED_RECORD_DIR) if FEED_RECORD_DIR else ""
+        if FEED_PROCESS:
+            # Decoding, books and recording move to a child process; quotes read shared memory
+            self._feed = SharedMemoryFeed(
+                api_creds=api_creds,
+                token_ids=token_ids,
+                condition_ids=condition_ids,
+                mid_threshold=MID_THRESHOLD,
+                record_dir=record_dir,
+                record_meta={"markets": selected},
+                latency=self._latency,
+                latency_report_sec=LATENCY_REPORT_SEC,
+                clob_host=client.host,
+                log_file=str(Path(LOG_FILE).with_name("feed.jsonl")) if LOG_FILE else "",
+            )
+        else:
+            if record_dir:
+                self._recorder = FeedRecorder(record_dir)
+                self._recorder.record_meta({"markets": selected})
+            self._feed = MarketFeed(
+                api_creds=api_creds,
+                token_ids=token_ids,
+                condition_ids=condition_ids,
+                mid_threshold=MID_THRESHOLD,
+                recorder=self._recorder,
+                snapshot_fn=lambda ids: client.get_order_books([BookParams(token_id=t) for t in ids]),
+                latency=self._latency,
+            )
 
         # Shared objects
-        inventory = InventoryTracker()
-        order_mgr = OrderManager(client, dry_run=self.dry_run)
+        self._store = open_store(str(Path(__file__).parent / STORE_PATH) if STORE_PATH else "")
+        self._risk = PortfolioRisk()
+        inventory = self._inventory = InventoryTracker(store=self._store, risk=self._risk)
+        order_mgr = self._order_mgr = OrderManager(
+            client, dry_run=self.dry_run, latency=self._latency, presign=SIGN_CACHE
+        )
+        if self._store is not None:
+            self._warm_start(inventory, order_mgr.fill_dedup)
+        self._rest_poller = RestMidPoller(client)
+        self._gateway = OrderGateway(latency=self._latency)
+        if not self.dry_run:
+            self._fill_reconciler = FillReconciler(client, order_mgr.fill_dedup, store=self._store)
+        if REQUOTE_BUDGET_PER_SEC > 0:
+            self._scheduler = RequoteScheduler(latency=self._latency)
+        if ORDER_BATCHING:
+            self._batcher = OrderBatcher(
+                client, gateway=self._gateway, dry_run=self.dry_run, latency=self._latency
+            )
 
         # Build per-market loops with feed reference
-        self._loops = [
-            MarketLoop(
-                market=m,
-                engine=ASQuoteEngine(),
-                inventory=inventory,
-                order_mgr=order_mgr,
-                size_usd=ORDER_SIZE_USD,
-                feed=self._feed,
+        self._loops = [self._make_loop(m) for m in selected]
+        if ROTATION_SEC > 0:
+            self._rotator = MarketRotator(
+                discover=find_maker_markets,
+                loops=lambda: self._loops,
+                start_market=self._start_market,
+                retire_market=self._retire_market,
+                target=self.num_markets,
             )
-            for m in selected
-        ]
+
+    def _make_loop(self, market: dict) -> MarketLoop:
+        return MarketLoop(
+            market=market,
+            engine=ASQuoteEngine(),
+            inventory=self._inventory,
+            order_mgr=self._order_mgr,
+            size_usd=ORDER_SIZE_USD,
+            feed=self._feed,
+            latency=self._latency,
+            rest_poller=self._rest_poller,
+            gateway=self._gateway,
+            batcher=self._batcher,
+            scheduler=self._scheduler,
+            fill_reconciler=self._fill_reconciler,
+            risk=self._risk,
+        )
+
+    # ── Rotation (rotation.py) ───────────────────────────────────────────────
+
+    async def _start_market(self, market: dict) -> None:
+        """Subscribe the feed to a new market and start quoting it."""
+        tokens = [t for t in (market["token_yes"], market.get("token_no")) if t]
+        conds = [market["condition_id"]] if market.get("condition_id") else []
+        await self._feed.subscribe(tokens, conds)
+        if self._recorder:
+            self._recorder.record_meta({"markets": [market]})
+        for t in tokens:
+            self._retired_yes.pop(t, None)  # picked again: the new loop owns its risk
+        ml = self._make_loop(market)
+        self._loops.append(ml)
+        self._loop_tasks[ml.token_yes] = asyncio.create_task(ml.run(), name=f"loop_{ml.token_yes[:8]}")
+
+    async def _retire_market(self, ml: MarketLoop) -> None:
+        """
+        Stop a market for good: stop its loop, cancel everything resting on
+        both tokens, hand late fills to inventory, unsubscribe the feed and
+        drop the per-market state. Its exposure stays with the risk engine
+        until the market is flat.
+        """
+        ml.stop()
+        task = self._loop_tasks.pop(ml.token_yes, None)
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        if self._batcher:
+            await self._batcher.drain()  # nothing of ours still queued or on the wire
+        await ml._process_ws_fills()  # unsubscribe drops undrained fills
+
+        tokens = [ml.token_yes, ml.token_no]
+        await asyncio.gather(*(ml._call(self._order_mgr.retire_token, t) for t in tokens))
+        # A post already running on a gateway thread can land after that cancel
+        settle = asyncio.create_task(self._settle_retired(tokens))
+        self._settle_tasks.add(settle)
+        settle.add_done_callback(self._settle_tasks.discard)
+
+        if self._fill_reconciler is not None:
+            for t in tokens:
+                self._fill_reconciler.register(t, self._apply_retired_fills)
+        cond = ml.market.get("condition_id")
+        await self._feed.unsubscribe(tokens, [cond] if cond else [])
+        if self._gateway:
+            self._gateway.forget(ml._key)
+            self._gateway.forget(f"{ml._key}/sign")
+        self._loops.remove(ml)
+        logger.info(
+            f"Retired {ml.market['question'][:60]} after {(time.time() - ml.started_at) / 60:.0f}min, "
+            f"residual exposure ${self._inventory.exposure(ml.token_yes):.2f}"
+        )
+        if self._risk is not None:
+            for t in tokens:
+                self._retired_yes[t] = ml.token_yes
+            self._release_risk(ml.token_yes)
+
+    def _release_risk(self, token_yes: str) -> None:
+        """Drop a retired market from the risk engine once it is flat."""
+        if abs(self._inventory.exposure(token_yes)) >= RETIRED_FLAT_USD:
+            return
+        self._risk.unregister_market(token_yes)
+        for t in [t for t, y in self._retired_yes.items() if y == token_yes]:
+            del self._retired_yes[t]
+
+    async def _settle_retired(self, tokens: list[str]) -> None:
+        await asyncio.sleep(RETIRE_SETTLE_SEC)
+        active = {t for ml in self._loops for t in (ml.token_yes, ml.token_no)}
+        for t in tokens:
+            if t in active:
+                continue  # picked again since: its orders are live quotes now
+            try:
+                await asyncio.to_thread(self._order_mgr.retire_token, t)
+            except Exception as e:
+                logger.warning(f"Retire sweep failed for {t[:16]}...: {e}")
+
+    def _apply_retired_fills(self, token_id: str, fills: list[dict]) -> None:
+        """FillReconciler callback for retired markets: late fills still count toward inventory."""
+        for f in fills:
+            self._inventory.apply_fill(token_id, f["side"], f["price"], f["size"], f["id"], "rest")
+            logger.warning(
+                f"Late fill on retired market: {f['side']} {f['size']:.1f}@{f['price']:.3f} token={token_id[:16]}..."
+            )
+        token_yes = self._retired_yes.get(token_id)
+        if token_yes is not None:
+            self._release_risk(token_yes)
+
+    def _warm_start(self, inventory: InventoryTracker, dedup: FillDedup) -> None:
+        """Rebuild positions, P&L and the fill watermark from the state store."""
+        t0 = time.perf_counter()
+        state = self._store.load()
+        inventory.restore(state)
+        wm = state["watermarks"].get(ACCOUNT)
+        if wm is not None:
+            dedup.advance(wm)
+        for tid in state["trade_ids"]:
+            dedup.add(tid)
+        logger.info(
+            f"Warm start from {self._store.path.name}: {len(state['positions'])} positions, "
+            f"{inventory.total_fills} fills, watermark {wm} "
+            f"in {(time.perf_counter() - t0) * 1000:.1f}ms"
+        )
 
     async def run(self):
         self._setup()
@@ -508,31 +1419,145 @@ class PolyMakerBot:
 
         # Start WS feed + all market loops
         tasks = [asyncio.create_task(self._feed.run(), name="ws_feed")]
-        tasks += [asyncio.create_task(ml.run(), name=f"loop_{i}") for i, ml in enumerate(self._loops)]
+        for i, ml in enumerate(self._loops):
+            self._loop_tasks[ml.token_yes] = asyncio.create_task(ml.run(), name=f"loop_{i}")
+        tasks += list(self._loop_tasks.values())
+        self._aux_tasks = [asyncio.create_task(self._rest_poller.run(), name="rest_poller")]
+        if self._fill_reconciler:
+            self._aux_tasks.append(asyncio.create_task(self._fill_reconciler.run(), name="fill_reconciler"))
+        if self._scheduler:
+            self._aux_tasks.append(asyncio.create_task(self._scheduler.run(), name="requote_scheduler"))
+        if self._rotator:
+            self._rotation_task = asyncio.create_task(self._rotator.run(), name="market_rotation")
+            self._aux_tasks.append(self._rotation_task)
+        if LATENCY_REPORT_SEC > 0:
+            self._aux_tasks.append(
+                asyncio.create_task(self._latency_report_loop(), name="latency_report")
+            )
+        if METRICS_PORT > 0:
+            await self._start_metrics()
+        tasks += self._aux_tasks
 
         try:
             await asyncio.gather(*tasks, return_exceptions=True)
         finally:
             await self._shutdown()
 
+    async def _start_metrics(self) -> None:
+        """Serve /metrics and export the components' own counters at scrape time."""
+        REGISTRY.collector(lambda: latency_families(self._latency))
+        REGISTRY.collector(self._component_families)
+        self._metrics_server = MetricsServer()
+        try:
+            await self._metrics_server.start()
+        except OSError as e:
+            logger.warning(f"Metrics endpoint disabled: {e}")
+            self._metrics_server = None
+            return
+        self._aux_tasks.append(asyncio.create_task(monitor_loop_lag(), name="loop_lag"))
+
+    def _component_families(self) -> list:
+        """Feed connections, scheduler, batcher, gateway and portfolio state as metric families."""
+        shards = self._feed.shard_stats() if self._feed else []
+        conn = [{"conn": str(s.get("shard", s.get("process")))} for s in shards]
+        fams = [
+            ("polymaker_ws_connected", "gauge", "Market WS connection up",
+             [("polymaker_ws_connected", lb, int(bool(s["connected"]))) for lb, s in zip(conn, shards)]),
+            ("polymaker_ws_tokens", "gauge", "Tokens subscribed per connection",
+             [("polymaker_ws_tokens", lb, s["tokens"]) for lb, s in zip(conn, shards)]),
+        ]
+        if isinstance(self._feed, MarketFeed):
+            msgs = [("polymaker_ws_messages_total", lb, s["msgs"]) for lb, s in zip(conn, shards)]
+            msgs.append(("polymaker_ws_messages_total", {"conn": "user"}, self._feed.user_msgs))
+            fams.append(("polymaker_ws_messages_total", "counter", "WS frames received per connection", msgs))
+            fams.append(("polymaker_ws_gaps_total", "counter", "Book sequence gaps detected",
+                         [("polymaker_ws_gaps_total", {}, self._feed.gaps_detected)]))
+        if self._scheduler is not None:
+            st = self._scheduler.stats()
+            fams.append(("polymaker_scheduler_waiting", "gauge", "Markets waiting for requote budget",
+                         [("polymaker_scheduler_waiting", {}, st["waiting"])]))
+            fams.append(("polymaker_scheduler_tokens", "gauge", "Requote budget left, order operations",
+                         [("polymaker_scheduler_tokens", {}, st["tokens"])]))
+        if self._batcher is not None:
+            st = self._batcher.stats()
+            fams.append(("polymaker_batch_requests_total", "counter", "Batched CLOB requests sent",
+                         [("polymaker_batch_requests_total", {}, st["requests"])]))
+        if self._gateway is not None:
+            fams.append(("polymaker_gateway_in_flight", "gauge", "Order calls running on the gateway pool",
+                         [("polymaker_gateway_in_flight", {}, self._gateway.in_flight)]))
+        if self._risk is not None:
+            fams.append(("polymaker_gross_exposure_usd", "gauge", "Gross exposure over all markets, USD",
+                         [("polymaker_gross_exposure_usd", {}, self._risk.total_gross)]))
+        if self._inventory is not None:
+            fams.append(("polymaker_pnl_usd", "gauge", "Portfolio P&L, USD", [
+                ("polymaker_pnl_usd", {"kind": "realized"}, self._inventory.realized_pnl),
+                ("polymaker_pnl_usd", {"kind": "unrealized"}, self._inventory.unrealized_pnl),
+            ]))
+        return fams
+
+    async def _latency_report_loop(self):
+        while self._running:
+            await asyncio.sleep(LATENCY_REPORT_SEC)
+            self._latency.log_summary()
+
     async def _shutdown(self):
         if not self._running:
             return
         logger.info("Shutdown signal received — cancelling all orders...")
         self._running = False
 
-        # Stop market loops
+        # Stop market loops, and let order calls already on the wire finish
+        # so nothing lands after the cancels below
+        if self._rotation_task:
+            self._rotation_task.cancel()  # no markets starting or retiring from here on
+            await asyncio.gather(self._rotation_task, return_exceptions=True)
         for ml in self._loops:
             ml.stop()
+        if self._scheduler:
+            self._scheduler.close()
+            logger.info(f"Requote scheduler: {self._scheduler.stats()}")
+        # stop() only clears a flag: a loop mid-requote would keep posting, so
+        # cancel the tasks and wait until none of them can submit anything
+        loop_tasks = [*self._loop_tasks.values(), *self._settle_tasks]
+        for t in loop_tasks:
+            t.cancel()
+        await asyncio.gather(*loop_tasks, return_exceptions=True)
+        if self._order_mgr is not None and self._order_mgr.sign_cache is not None:
+            logger.info(f"Sign cache: {self._order_mgr.sign_cache.stats()}")
+        if self._batcher:
+            await self._batcher.drain()
+            logger.info(f"Order batching: {self._batcher.stats()}")
+        if self._gateway:
+            await asyncio.to_thread(self._gateway.shutdown)
+
+        for ml in self._loops:
             try:
                 ml.order_mgr.cancel_market_orders(ml.token_yes)
                 ml.order_mgr.cancel_market_orders(ml.token_no)
             except Exception as e:
                 logger.warning(f"Shutdown cancel error: {e}")
 
+        for t in self._aux_tasks:
+            t.cancel()
+        if self._rotator:
+            logger.info(f"Market rotation: {self._rotator.stats()}")
+        if self._metrics_server:
+            await self._metrics_server.stop()
+
         # Stop WS feed
         if self._feed:
             await self._feed.stop()
+        if self._recorder:
+            self._recorder.close()
+        if self._store:
+            self._store.close()
+
+        self._latency.log_summary()
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S")
+        try:
+            self._latency.dump(Path(__file__).parent / LATENCY_DUMP_DIR / f"latency-{stamp}.json")
+        except OSError as e:
+            logger.warning(f"Latency dump failed: {e}")
 
         logger.info("Shutdown complete")
 
@@ -550,6 +1575,7 @@ def main():
     if args.size != ORDER_SIZE_USD:
         os.environ["ORDER_SIZE_USD"] = str(args.size)
 
+    setup_logging()
     bot = PolyMakerBot(dry_run=args.dry_run, num_markets=args.markets)
     asyncio.run(bot.run())
 
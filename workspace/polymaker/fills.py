@@ -0,0 +1,171 @@
+"""
+fills.py — Fill deduplication with bounded memory
+==================================================
+The same trade reaches us several times: over the user WebSocket (once per
+status change: MATCHED → MINED → CONFIRMED) and again from REST
+reconciliation. FillDedup keeps:
+
+  - an LRU of recently processed trade IDs, capped at max_ids
+  - one account-wide watermark: the newest match time the REST sweep has
+    returned
+
+REST reconciliation asks only for trades after (watermark - overlap). The
+overlap re-reads a short tail so trades that are indexed late are not
+missed; the LRU only has to cover that tail, so memory stays flat however
+long the bot runs and each reconciliation costs O(new trades).
+
+FillReconciler is the REST side: one task per account that pulls every
+trade since the account watermark in a single paginated get_trades call,
+every FILL_RECONCILE_SEC, and hands new ones to whichever market registered
+the trade's asset_id.
+"""
+
+import asyncio
+import logging
+import os
+from collections import OrderedDict, defaultdict
+from typing import Callable, Optional
+
+from py_clob_client.clob_types import TradeParams
+
+from metrics import clob_call
+
+logger = logging.getLogger("polymaker.fills")
+
+DEDUP_MAX_IDS = 20_000
+WATERMARK_OVERLAP_SEC = 300  # re-read this much history on every REST query
+FILL_RECONCILE_SEC = float(os.getenv("FILL_RECONCILE_SEC", "30"))
+ACCOUNT = "_account"  # store scope of the account watermark
+
+
+def trade_time(trade: dict) -> float:
+    """Match time of a REST trade in epoch seconds (0.0 if missing)."""
+    for key in ("match_time", "last_update", "timestamp"):
+        v = trade.get(key)
+        if v:
+            try:
+                ts = float(v)
+            except (TypeError, ValueError):
+                continue
+            return ts / 1000.0 if ts > 1e12 else ts  # tolerate epoch-ms
+    return 0.0
+
+
+class FillDedup:
+    """Bounded record of processed trade IDs plus the account REST watermark."""
+
+    def __init__(self, max_ids: int = DEDUP_MAX_IDS, overlap_sec: float = WATERMARK_OVERLAP_SEC):
+        self.max_ids = max_ids
+        self.overlap_sec = overlap_sec
+        self._ids: OrderedDict[str, None] = OrderedDict()
+        self._watermark: Optional[float] = None  # newest match time of the account sweep
+        self.evicted = 0
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, trade_id: str) -> bool:
+        return trade_id in self._ids
+
+    def add(self, trade_id: str) -> bool:
+        """Record a trade ID. Returns False if it was already processed."""
+        if not trade_id:
+            return False
+        if trade_id in self._ids:
+            self._ids.move_to_end(trade_id)
+            return False
+        self._ids[trade_id] = None
+        if len(self._ids) > self.max_ids:
+            self._ids.popitem(last=False)
+            self.evicted += 1
+        return True
+
+    # ── REST watermarks ──────────────────────────────────────────────────────
+
+    def query_after(self) -> Optional[int]:
+        """`after` bound for the next REST query, or None for full history (first query)."""
+        if self._watermark is None:
+            return None
+        return max(0, int(self._watermark - self.overlap_sec))
+
+    def watermark(self) -> Optional[float]:
+        return self._watermark
+
+    def advance(self, ts: float) -> None:
+        """Move the watermark forward to a match time REST has returned."""
+        if ts > (self._watermark or 0.0):
+            self._watermark = ts
+
+    def stats(self) -> dict:
+        return {"ids": len(self._ids), "evicted": self.evicted, "watermark": self._watermark}
+
+
+class FillReconciler:
+    """Account-wide REST trade sweep, dispatched to markets by asset_id."""
+
+    def __init__(self, client, dedup: FillDedup, interval: float = FILL_RECONCILE_SEC, store=None):
+        self.client = client
+        self.dedup = dedup  # shared with the WS fill path
+        self.store = store  # optional store.StateStore: persists the account watermark
+        self.interval = interval
+        self._handlers: dict[str, Callable[[str, list[dict]], None]] = {}
+        self.sweeps = 0
+        self.dispatched = 0
+
+    def register(self, token_id: str, handler: Callable[[str, list[dict]], None]) -> None:
+        """handler(token_id, fills) runs on the event loop with that token's new fills."""
+        self._handlers[token_id] = handler
+
+    def unregister(self, token_id: str) -> None:
+        self._handlers.pop(token_id, None)
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.reconcile()
+
+    async def reconcile(self) -> int:
+        """One sweep. Returns the number of new fills dispatched."""
+        try:
+            trades = await asyncio.to_thread(
+                clob_call, "get_trades", self.client.get_trades,
+                TradeParams(after=self.dedup.query_after()),
+            )
+        except Exception as e:
+            logger.warning(f"Account trade sweep failed: {e}")
+            return 0
+        self.sweeps += 1
+
+        by_token: dict[str, list[dict]] = defaultdict(list)
+        for t in trades or ():
+            self.dedup.advance(trade_time(t))
+            token_id = t.get("asset_id", "")
+            if token_id not in self._handlers:
+                continue
+            if not self.dedup.add(t.get("id") or t.get("tradeID") or ""):
+                continue
+            try:
+                by_token[token_id].append({
+                    "id": t.get("id") or t.get("tradeID") or "",
+                    "side": t.get("side", "").upper(),
+                    "price": float(t.get("price", 0)),
+                    "size": float(t.get("size", 0)),
+                })
+            except (TypeError, ValueError):
+                logger.warning(f"Malformed trade skipped: {t}")
+
+        n = 0
+        for token_id, fills in by_token.items():
+            handler = self._handlers.get(token_id)
+            if handler is None:
+                continue  # market retired during the sweep
+            try:
+                handler(token_id, fills)
+            except Exception as e:
+                logger.error(f"Fill handler failed for {token_id[:16]}...: {e}")
+            n += len(fills)
+        self.dispatched += n
+        wm = self.dedup.watermark()
+        if self.store is not None and wm is not None:
+            self.store.save_watermark(ACCOUNT, wm)
+        return n
@@ -0,0 +1,72 @@
+"""
+gateway.py — Async order gateway in front of the synchronous CLOB client
+========================================================================
+py_clob_client signs and sends every request synchronously. Called straight
+from a MarketLoop coroutine, each round trip stalls the event loop, so the
+WS feed and every other market wait behind it.
+
+OrderGateway runs those calls on a bounded thread pool:
+  - ORDER_WORKERS threads in total (HTTP releases the GIL while waiting)
+  - at most ORDER_CONCURRENCY_PER_MARKET calls in flight per market, so one
+    market can cancel/place its YES and NO legs together without a busy
+    market starving the rest
+
+Calls for the same market are admitted in arrival order, which keeps
+"cancel, then place" sequences in order when callers await each step.
+"""
+
+import asyncio
+import functools
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+logger = logging.getLogger("polymaker.gateway")
+
+ORDER_WORKERS = int(os.getenv("ORDER_WORKERS", "16"))
+ORDER_CONCURRENCY_PER_MARKET = int(os.getenv("ORDER_CONCURRENCY_PER_MARKET", "2"))
+
+
+class OrderGateway:
+    """Bounded worker pool plus per-market concurrency limits for blocking order calls."""
+
+    def __init__(
+        self,
+        max_workers: int = ORDER_WORKERS,
+        per_market: int = ORDER_CONCURRENCY_PER_MARKET,
+        latency=None,
+    ):
+        self.per_market = max(1, per_market)
+        self._pool = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="order")
+        self._limits: dict[str, asyncio.Semaphore] = {}
+        self._latency = latency  # optional latency.LatencyTracker
+        self.in_flight = 0
+        self.calls = 0
+
+    async def submit(self, market_key: str, fn: Callable, *args, **kwargs) -> Any:
+        """Run fn(*args, **kwargs) on the pool under market_key's concurrency limit."""
+        sem = self._limits.get(market_key)
+        if sem is None:
+            sem = self._limits[market_key] = asyncio.Semaphore(self.per_market)
+        t0 = time.perf_counter_ns()
+        async with sem:
+            if self._latency is not None:
+                self._latency.record_ns(market_key, "gateway_wait", time.perf_counter_ns() - t0)
+            self.in_flight += 1
+            self.calls += 1
+            try:
+                return await asyncio.get_running_loop().run_in_executor(
+                    self._pool, functools.partial(fn, *args, **kwargs)
+                )
+            finally:
+                self.in_flight -= 1
+
+    def forget(self, market_key: str) -> None:
+        """Drop a retired market's limiter."""
+        self._limits.pop(market_key, None)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Drop queued calls; with wait, block until the ones already running return."""
+        self._pool.shutdown(wait=wait, cancel_futures=True)
@@ -0,0 +1,233 @@
+"""
+latency.py — Stage-by-stage latency tracking, exchange event → order ack
+=========================================================================
+Stages (all per market unless noted):
+
+  exch_to_recv     exchange event timestamp → frame received (wall clock, raw)
+  recv_to_decode   frame received → typed events decoded (feed-wide)
+  decode_to_pub    decoded → _update_mid published to the token slot
+  pub_to_wake      slot published → MarketLoop woke up
+  hold             MarketLoop woke → requote started (MIN_REQUOTE_SEC gate, fills)
+  quote            ASQuoteEngine.quote()
+  sign             client.create_order() (EIP-712 signing)
+  post             client.post_order() round trip → ack
+  gateway_wait     order call queued → admitted by the per-market gateway limit
+  sched_wait       requote queued → admitted by the account-wide requote budget
+  recv_to_ack      frame received → that requote's orders acked
+
+Histograms are HDR-style log-linear (64 sub-buckets per power of two, ~1.6%
+relative error) over integer microseconds, stored sparsely so a few
+thousand markets x stages stay small. Recording is a bit_length, a shift
+and a dict increment.
+
+The exchange clock offset is estimated as the windowed minimum of
+(local receive time - exchange timestamp): offset plus the network floor.
+"""
+
+import json
+import logging
+import time
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger("polymaker.latency")
+
+SUB_BITS = 6
+_HALF = 1 << (SUB_BITS - 1)
+_FULL = 1 << SUB_BITS
+OFFSET_WINDOW_SEC = 300.0
+
+FEED = "_feed"  # key for feed-wide stages
+
+
+def _bucket(us: int) -> int:
+    if us < _FULL:
+        return us if us > 0 else 0
+    shift = us.bit_length() - SUB_BITS
+    return (shift + 1) * _HALF + (us >> shift) - _HALF
+
+
+def _bucket_value(idx: int) -> float:
+    """Midpoint of a bucket, in microseconds."""
+    if idx < _FULL:
+        return float(idx)
+    shift = idx // _HALF - 1
+    top = idx - shift * _HALF
+    return ((top << shift) + (top + 1 << shift)) / 2.0
+
+
+class LatencyHistogram:
+    """Sparse log-linear histogram of microsecond samples."""
+
+    __slots__ = ("counts", "count", "total_us", "min_us", "max_us")
+
+    def __init__(self):
+        self.counts: dict[int, int] = {}
+        self.count = 0
+        self.total_us = 0
+        self.min_us = 0
+        self.max_us = 0
+
+    def record_us(self, us: int) -> None:
+        if us < 0:
+            us = 0
+        b = _bucket(us)
+        self.counts[b] = self.counts.get(b, 0) + 1
+        if self.count == 0 or us < self.min_us:
+            self.min_us = us
+        if us > self.max_us:
+            self.max_us = us
+        self.count += 1
+        self.total_us += us
+
+    def percentile(self, p: float) -> float:
+        """Value (µs) at percentile p in [0, 100]."""
+        if self.count == 0:
+            return 0.0
+        rank = max(1, int(round(p / 100.0 * self.count)))
+        seen = 0
+        for b in sorted(self.counts):
+            seen += self.counts[b]
+            if seen >= rank:
+                return min(_bucket_value(b), float(self.max_us))
+        return float(self.max_us)
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        for b, n in other.counts.items():
+            self.counts[b] = self.counts.get(b, 0) + n
+        if other.count:
+            self.min_us = other.min_us if self.count == 0 else min(self.min_us, other.min_us)
+            self.max_us = max(self.max_us, other.max_us)
+        self.count += other.count
+        self.total_us += other.total_us
+
+    def cumulative(self, bounds_us) -> list[int]:
+        """Samples at or below each bound (µs, ascending), by bucket midpoint."""
+        out, seen = [], 0
+        counts = sorted(self.counts.items())
+        i = 0
+        for bound in bounds_us:
+            while i < len(counts) and _bucket_value(counts[i][0]) <= bound:
+                seen += counts[i][1]
+                i += 1
+            out.append(seen)
+        return out
+
+    def summary(self) -> dict:
+        if self.count == 0:
+            return {"n": 0}
+        return {
+            "n": self.count,
+            "mean_ms": round(self.total_us / self.count / 1000.0, 3),
+            "p50_ms": round(self.percentile(50) / 1000.0, 3),
+            "p90_ms": round(self.percentile(90) / 1000.0, 3),
+            "p99_ms": round(self.percentile(99) / 1000.0, 3),
+            "p999_ms": round(self.percentile(99.9) / 1000.0, 3),
+            "max_ms": round(self.max_us / 1000.0, 3),
+        }
+
+
+class ClockOffsetEstimator:
+    """Windowed minimum of (local receive - exchange timestamp), in seconds."""
+
+    def __init__(self, window_sec: float = OFFSET_WINDOW_SEC):
+        self.window_sec = window_sec
+        self._cur: Optional[float] = None
+        self._prev: Optional[float] = None
+        self._rotated_at = time.time()
+
+    def observe(self, exchange_ts: float, recv_wall: float) -> None:
+        if recv_wall - self._rotated_at > self.window_sec:
+            self._prev, self._cur = self._cur, None
+            self._rotated_at = recv_wall
+        d = recv_wall - exchange_ts
+        if self._cur is None or d < self._cur:
+            self._cur = d
+
+    def offset(self) -> Optional[float]:
+        vals = [v for v in (self._cur, self._prev) if v is not None]
+        return min(vals) if vals else None
+
+
+class LatencyTracker:
+    """Per-market, per-stage histograms plus the exchange clock offset."""
+
+    def __init__(self):
+        self._hists: dict[str, dict[str, LatencyHistogram]] = {}
+        self._token_market: dict[str, str] = {}
+        self._labels: dict[str, str] = {}  # market key -> display name
+        self.clock = ClockOffsetEstimator()
+        self.started = time.time()
+
+    def register_market(self, market_key: str, token_ids, label: str = "") -> None:
+        if label:
+            self._labels[market_key] = label
+        for tid in token_ids:
+            if tid:
+                self._token_market[tid] = market_key
+
+    def market_of(self, token_id: str) -> str:
+        return self._token_market.get(token_id, FEED)
+
+    def record_ns(self, market_key: str, stage: str, ns: int) -> None:
+        stages = self._hists.get(market_key)
+        if stages is None:
+            stages = self._hists[market_key] = {}
+        h = stages.get(stage)
+        if h is None:
+            h = stages[stage] = LatencyHistogram()
+        h.record_us(ns // 1000)
+
+    def record_token_ns(self, token_id: str, stage: str, ns: int) -> None:
+        self.record_ns(self._token_market.get(token_id, FEED), stage, ns)
+
+    def observe_exchange(self, token_id: str, exchange_ts: float, recv_wall: float) -> None:
+        """Exchange event time vs local receive time (both epoch seconds)."""
+        if exchange_ts <= 0:
+            return
+        self.clock.observe(exchange_ts, recv_wall)
+        self.record_ns(
+            self._token_market.get(token_id, FEED), "exch_to_recv",
+            int((recv_wall - exchange_ts) * 1e9),
+        )
+
+    # ── Reporting ────────────────────────────────────────────────────────────
+
+    def totals(self) -> dict[str, LatencyHistogram]:
+        """Stage histograms merged across all markets."""
+        merged: dict[str, LatencyHistogram] = {}
+        for stages in self._hists.values():
+            for stage, h in stages.items():
+                merged.setdefault(stage, LatencyHistogram()).merge(h)
+        return merged
+
+    def snapshot(self) -> dict:
+        offset = self.clock.offset()
+        return {
+            "uptime_sec": round(time.time() - self.started, 1),
+            "clock_offset_ms": round(offset * 1000.0, 3) if offset is not None else None,
+            "all": {stage: h.summary() for stage, h in sorted(self.totals().items())},
+            "markets": {
+                mk: {stage: h.summary() for stage, h in sorted(stages.items())}
+                for mk, stages in self._hists.items()
+            },
+            "labels": {mk: self._labels[mk] for mk in self._hists if mk in self._labels},
+        }
+
+    def log_summary(self) -> None:
+        offset = self.clock.offset()
+        parts = []
+        for stage, h in sorted(self.totals().items()):
+            if h.count:
+                parts.append(
+                    f"{stage} p50={h.percentile(50) / 1000:.2f} "
+                    f"p99={h.percentile(99) / 1000:.2f}ms n={h.count}"
+                )
+        off = f"{offset * 1000:.1f}ms" if offset is not None else "n/a"
+        logger.info(f"Latency (clock offset≈{off}): " + " | ".join(parts))
+
+    def dump(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(self.snapshot(), f, indent=2)
+        logger.info(f"Latency histograms written to {path}")
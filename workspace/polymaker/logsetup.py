@@ -0,0 +1,138 @@
+"""
+logsetup.py — Queue-backed JSONL logging off the event loop
+============================================================
+A synchronous FileHandler formats and writes every record on the thread
+that logs it, so each requote paid for string building plus a blocking
+write() on the event loop. Here the root logger only has a QueueHandler:
+logging a record appends it to a SimpleQueue, and a QueueListener thread
+does the rest:
+
+  file     one compact JSON object per line (LOG_FILE), rotated at
+           LOG_MAX_BYTES and gzip-compressed on rotation, LOG_BACKUPS kept
+  console  the familiar "time [LEVEL] name: message" text (LOG_CONSOLE)
+
+Records cross the queue unformatted. With %-style arguments
+(logger.info("mid=%.3f", mid)) nothing is formatted at all when the level
+is off, and when it is on the formatting happens on the writer thread.
+Arguments are formatted later, so pass values (numbers, strings), not
+objects that keep changing.
+
+Extra fields go under "ctx": logger.info("filled", extra={"ctx": {...}}).
+"""
+
+import atexit
+import gzip
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import shutil
+import sys
+from pathlib import Path
+from typing import Optional
+
+LOG_FILE = os.getenv("LOG_FILE", "logs/bot.jsonl")  # relative to this directory; empty disables
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(50 * 1024 * 1024)))
+LOG_BACKUPS = int(os.getenv("LOG_BACKUPS", "10"))
+LOG_CONSOLE = os.getenv("LOG_CONSOLE", "1") == "1"
+TEXT_FORMAT = "%(asctime)s [%(levelname)s] %(name)s: %(message)s"
+
+
+# ── Formatting ────────────────────────────────────────────────────────────────
+
+class JsonFormatter(logging.Formatter):
+    """One record per line: ts, level, logger, msg, plus exc and ctx when present."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        out = {
+            "ts": round(record.created, 6),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        if record.exc_info:
+            out["exc"] = self.formatException(record.exc_info)
+        ctx = getattr(record, "ctx", None)
+        if ctx:
+            out["ctx"] = ctx
+        return json.dumps(out, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+# ── Handlers ──────────────────────────────────────────────────────────────────
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that hands the record over as-is. The stock prepare()
+    formats the message on the calling thread so records can be pickled;
+    ours never leave the process, so the writer thread formats them.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+class GzipRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """RotatingFileHandler whose backups are gzip-compressed (bot.jsonl.1.gz, ...)."""
+
+    def __init__(self, filename, maxBytes: int = 0, backupCount: int = 0):
+        super().__init__(filename, mode="a", maxBytes=maxBytes, backupCount=backupCount, encoding="utf-8")
+        self.namer = lambda name: name + ".gz"
+        self.rotator = self._compress
+
+    @staticmethod
+    def _compress(source: str, dest: str) -> None:
+        with open(source, "rb") as f_in, gzip.open(dest, "wb") as f_out:
+            shutil.copyfileobj(f_in, f_out)
+        os.remove(source)
+
+
+# ── Setup ─────────────────────────────────────────────────────────────────────
+
+def setup_logging(
+    log_file: str = LOG_FILE,
+    level: str = LOG_LEVEL,
+    console: bool = LOG_CONSOLE,
+    max_bytes: int = LOG_MAX_BYTES,
+    backups: int = LOG_BACKUPS,
+) -> Optional[logging.handlers.QueueListener]:
+    """
+    Replace the root handlers with the queue pipeline and start the writer
+    thread. log_file is relative to this directory; empty disables the file.
+    Returns the listener; stop_logging() runs at exit if nothing else stops it.
+    """
+    handlers: list[logging.Handler] = []
+    if console:
+        h = logging.StreamHandler(sys.stdout)
+        h.setFormatter(logging.Formatter(TEXT_FORMAT))
+        handlers.append(h)
+    if log_file:
+        path = Path(__file__).parent / log_file
+        path.parent.mkdir(parents=True, exist_ok=True)
+        h = GzipRotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups)
+        h.setFormatter(JsonFormatter())
+        handlers.append(h)
+
+    root = logging.getLogger()
+    for h in list(root.handlers):
+        root.removeHandler(h)
+    root.setLevel(level)
+    if not handlers:
+        return None
+
+    q: queue.SimpleQueue = queue.SimpleQueue()
+    root.addHandler(_DeferredQueueHandler(q))
+    listener = logging.handlers.QueueListener(q, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(stop_logging, listener)
+    return listener
+
+
+def stop_logging(listener: Optional[logging.handlers.QueueListener]) -> None:
+    """Write everything queued so far, then stop the writer thread and close its handlers."""
+    if listener is None or listener._thread is None:
+        return
+    listener.stop()
+    for h in listener.handlers:
+        h.close()
@@ -23,7 +23,7 @@ load_dotenv(Path(__file__).parent / ".env")
 
 logger = logging.getLogger(__name__)
 
-GAMMA_API = "https://gamma-api.polymarket.com"
+GAMMA_API = os.getenv("GAMMA_API", "https://gamma-api.polymarket.com")
 
 # Slugs/keywords in markets with taker fees — avoid these
 FEE_SLUGS = [
@@ -166,11 +166,18 @@ def find_maker_markets(limit: int = 20) -> list[dict]:
             if mid < 0.15 or mid > 0.85:
                 continue
 
+            # Markets in one Gamma event (e.g. BTC price thresholds) move together
+            events = m.get("events") or []
+            event = events[0] if events and isinstance(events[0], dict) else {}
+
             results.append({
                 "market_id": m.get("id"),
                 "question": m.get("question"),
                 "slug": m.get("slug"),
                 "condition_id": m.get("conditionId"),
+                "event_id": str(event.get("id") or ""),
+                "event_slug": event.get("slug") or "",
+                "neg_risk": bool(m.get("negRisk")),
                 "token_yes": tokens[0]["token_id"],
                 "token_no": tokens[1]["token_id"] if len(tokens) > 1 else None,
                 "mid": mid,
@@ -189,17 +196,25 @@ def find_maker_markets(limit: int = 20) -> list[dict]:
 
         time.sleep(0.25)
 
-    # Composite score: 60% mid-range preference (closer to 0.50 = better) + 40% volume
-    max_vol = max((r["volume_24h"] for r in results), default=1.0)
-    def _score(m):
-        mid_score = 1.0 - 2.0 * abs(m["mid"] - 0.50)  # 1.0 at 0.50, 0.0 at extremes
-        vol_score = m["volume_24h"] / max_vol if max_vol > 0 else 0
-        return 0.35 * mid_score + 0.65 * vol_score
-    results.sort(key=_score, reverse=True)
+    score_markets(results)
+    results.sort(key=lambda m: m["score"], reverse=True)
     logger.info(f"Found {len(results)} maker-suitable markets")
     return results[:limit]
 
 
+def score_markets(markets: list[dict]) -> None:
+    """
+    Set m["score"] in [0, 1]: 35% mid-range preference (closer to 0.50 is
+    better) + 65% volume relative to the busiest market in the same list,
+    so scores compare only within one discovery pass.
+    """
+    max_vol = max((m["volume_24h"] for m in markets), default=1.0)
+    for m in markets:
+        mid_score = 1.0 - 2.0 * abs(m["mid"] - 0.50)  # 1.0 at 0.50, 0.0 at extremes
+        vol_score = m["volume_24h"] / max_vol if max_vol > 0 else 0
+        m["score"] = round(0.35 * mid_score + 0.65 * vol_score, 4)
+
+
 if __name__ == "__main__":
     import logging
     logging.basicConfig(level=logging.INFO)
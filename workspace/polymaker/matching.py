@@ -0,0 +1,339 @@
+"""
+matching.py — Price-time-priority matching engine for the local exchange
+========================================================================
+One central limit order book per token, as the CLOB keeps them:
+
+  - price priority, then time priority: each price level is a FIFO queue
+  - an incoming order matches against the opposite side from the best
+    price inward, filling at each resting (maker) order's price
+  - GTC remainders rest; FAK remainders are dropped; FOK orders fill in
+    full or not at all; post-only orders that would cross are rejected
+
+Prices are held as integer ticks of PRICE_UNIT (1e-4) so levels key exactly.
+Every book remembers which levels changed since drain_changes() was last
+called; simexchange.py turns those into `price_change` messages. The engine
+is synchronous and has no I/O: it is driven by simexchange.py and is easy to
+exercise on its own.
+
+YES and NO tokens are separate books. The real exchange also matches a YES
+bid against a NO bid at complementary prices (minting a pair); this engine
+does not, so the two only stay consistent through the flow that trades them.
+"""
+
+import bisect
+import hashlib
+import itertools
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Optional
+
+PRICE_UNIT = 10_000   # price ticks per 1.0
+SIZE_EPS = 1e-9
+
+BUY = "BUY"
+SELL = "SELL"
+
+GTC = "GTC"
+FAK = "FAK"
+FOK = "FOK"
+
+
+def to_ticks(price: float) -> int:
+    return int(round(price * PRICE_UNIT))
+
+
+def to_price(ticks: int) -> float:
+    return ticks / PRICE_UNIT
+
+
+@dataclass
+class RestingOrder:
+    order_id: str
+    owner: str
+    token_id: str
+    side: str
+    price: int           # ticks
+    size: float          # original shares
+    remaining: float
+    created_at: float = field(default_factory=time.time)
+
+    @property
+    def matched(self) -> float:
+        return self.size - self.remaining
+
+
+@dataclass
+class Fill:
+    trade_id: str
+    token_id: str
+    price: int           # ticks, the maker's price
+    size: float
+    taker_side: str
+    maker: RestingOrder
+    taker_order_id: str
+    taker_owner: str
+    timestamp: float
+
+
+@dataclass
+class SubmitResult:
+    order_id: str
+    status: str          # "live" | "matched" | "unmatched" | "rejected"
+    fills: list[Fill] = field(default_factory=list)
+    error: str = ""
+
+
+class MatchingBook:
+    """One token's book: sorted price levels, FIFO within a level."""
+
+    def __init__(self, token_id: str):
+        self.token_id = token_id
+        self._levels = {BUY: {}, SELL: {}}       # side -> {ticks: deque[RestingOrder]}
+        self._size = {BUY: {}, SELL: {}}         # side -> {ticks: aggregate shares}
+        self._prices = {BUY: [], SELL: []}       # ascending ticks with resting size
+        self._changed: set[tuple[str, int]] = set()
+        self.last_trade: Optional[int] = None
+
+    # ── Read side ────────────────────────────────────────────────────────────
+
+    def best_bid(self) -> Optional[int]:
+        p = self._prices[BUY]
+        return p[-1] if p else None
+
+    def best_ask(self) -> Optional[int]:
+        p = self._prices[SELL]
+        return p[0] if p else None
+
+    def mid(self) -> Optional[float]:
+        bb, ba = self.best_bid(), self.best_ask()
+        if bb is not None and ba is not None:
+            return (bb + ba) / 2 / PRICE_UNIT
+        if self.last_trade is not None:
+            return to_price(self.last_trade)
+        return None
+
+    def levels(self, side: str) -> list[tuple[int, float]]:
+        """(ticks, size) best first."""
+        prices = self._prices[side]
+        sizes = self._size[side]
+        order = reversed(prices) if side == BUY else prices
+        return [(p, sizes[p]) for p in order]
+
+    def drain_changes(self) -> list[tuple[str, int, float]]:
+        """(side, ticks, new aggregate size) for every level touched since the last drain."""
+        out = [(side, p, self._size[side].get(p, 0.0)) for side, p in self._changed]
+        self._changed.clear()
+        return out
+
+    # ── Mutation ─────────────────────────────────────────────────────────────
+
+    def _add(self, o: RestingOrder) -> None:
+        levels = self._levels[o.side]
+        q = levels.get(o.price)
+        if q is None:
+            q = levels[o.price] = deque()
+            self._size[o.side][o.price] = 0.0
+            bisect.insort(self._prices[o.side], o.price)
+        q.append(o)
+        self._size[o.side][o.price] += o.remaining
+        self._changed.add((o.side, o.price))
+
+    def _reduce(self, o: RestingOrder, qty: float) -> None:
+        sizes = self._size[o.side]
+        sizes[o.price] -= qty
+        self._changed.add((o.side, o.price))
+
+    def _drop_level_if_empty(self, side: str, price: int) -> None:
+        q = self._levels[side].get(price)
+        if q:
+            return
+        self._levels[side].pop(price, None)
+        self._size[side].pop(price, None)
+        prices = self._prices[side]
+        i = bisect.bisect_left(prices, price)
+        if i < len(prices) and prices[i] == price:
+            del prices[i]
+        self._changed.add((side, price))
+
+    def remove(self, o: RestingOrder) -> None:
+        q = self._levels[o.side].get(o.price)
+        if q is None:
+            return
+        try:
+            q.remove(o)
+        except ValueError:
+            return
+        self._reduce(o, o.remaining)
+        self._drop_level_if_empty(o.side, o.price)
+
+    def crosses(self, side: str, price: int) -> bool:
+        if side == BUY:
+            ba = self.best_ask()
+            return ba is not None and price >= ba
+        bb = self.best_bid()
+        return bb is not None and price <= bb
+
+    def fillable(self, side: str, price: int, size: float) -> float:
+        """Shares an order could take right now, capped at size."""
+        opp = SELL if side == BUY else BUY
+        total = 0.0
+        for p, s in self.levels(opp):
+            if (side == BUY and p > price) or (side == SELL and p < price):
+                break
+            total += s
+            if total >= size - SIZE_EPS:
+                return size
+        return total
+
+    def match(self, side: str, price: int, size: float) -> list[tuple[RestingOrder, int, float]]:
+        """
+        Take up to `size` shares from the opposite side at `price` or better.
+        Returns (maker, ticks, qty) per maker touched; fully filled makers
+        leave the book.
+        """
+        opp = SELL if side == BUY else BUY
+        prices = self._prices[opp]
+        levels = self._levels[opp]
+        out = []
+        left = size
+        while left > SIZE_EPS and prices:
+            p = prices[0] if side == BUY else prices[-1]
+            if (side == BUY and p > price) or (side == SELL and p < price):
+                break
+            q = levels[p]
+            while left > SIZE_EPS and q:
+                maker = q[0]
+                qty = min(left, maker.remaining)
+                maker.remaining -= qty
+                left -= qty
+                self._reduce(maker, qty)
+                out.append((maker, p, qty))
+                if maker.remaining <= SIZE_EPS:
+                    q.popleft()
+            self._drop_level_if_empty(opp, p)
+        if out:
+            self.last_trade = out[-1][1]
+        return out
+
+
+class MatchingEngine:
+    """All books plus the order index. Order IDs are 0x-hex hashes of a sequence number; trade IDs are sequential."""
+
+    def __init__(self):
+        self.books: dict[str, MatchingBook] = {}
+        self.orders: dict[str, RestingOrder] = {}
+        self._by_owner: dict[str, dict[str, RestingOrder]] = {}
+        self._order_ids = itertools.count(1)
+        self._trade_ids = itertools.count(1)
+        self.submitted = 0
+        self.rejected = 0
+        self.cancelled = 0
+        self.trades = 0
+        self.volume = 0.0
+
+    def add_book(self, token_id: str) -> MatchingBook:
+        book = self.books.get(token_id)
+        if book is None:
+            book = self.books[token_id] = MatchingBook(token_id)
+        return book
+
+    def next_order_id(self) -> str:
+        return "0x" + hashlib.sha256(str(next(self._order_ids)).encode()).hexdigest()
+
+    def submit(
+        self,
+        owner: str,
+        token_id: str,
+        side: str,
+        price: float,
+        size: float,
+        order_type: str = GTC,
+        post_only: bool = False,
+    ) -> SubmitResult:
+        """Match an incoming order, then rest, drop or reject what is left."""
+        self.submitted += 1
+        order_id = self.next_order_id()
+        book = self.books.get(token_id)
+        ticks = to_ticks(price)
+        if book is None:
+            return self._reject(order_id, f"market not found: {token_id}")
+        if side not in (BUY, SELL):
+            return self._reject(order_id, f"invalid side: {side}")
+        if size <= SIZE_EPS or not 0 < ticks < PRICE_UNIT:
+            return self._reject(order_id, f"invalid order: price={price} size={size}")
+        if post_only:
+            if order_type != GTC:
+                return self._reject(order_id, "post-only orders must be GTC")
+            if book.crosses(side, ticks):
+                return self._reject(order_id, "invalid post-only order: order crosses book")
+        if order_type == FOK and book.fillable(side, ticks, size) < size - SIZE_EPS:
+            return SubmitResult(order_id, "unmatched", error="order couldn't be fully filled, FOK orders are fully filled/killed")
+
+        now = time.time()
+        fills = []
+        for maker, p, qty in book.match(side, ticks, size):
+            fills.append(Fill(
+                trade_id=f"{next(self._trade_ids):016x}",
+                token_id=token_id,
+                price=p,
+                size=qty,
+                taker_side=side,
+                maker=maker,
+                taker_order_id=order_id,
+                taker_owner=owner,
+                timestamp=now,
+            ))
+            if maker.remaining <= SIZE_EPS:
+                self._forget(maker)
+        filled = sum(f.size for f in fills)
+        self.trades += len(fills)
+        self.volume += filled
+
+        left = size - filled
+        if left > SIZE_EPS and order_type == GTC:
+            o = RestingOrder(order_id, owner, token_id, side, ticks, size, left, now)
+            book._add(o)
+            self.orders[order_id] = o
+            self._by_owner.setdefault(owner, {})[order_id] = o
+            return SubmitResult(order_id, "live", fills)
+        if fills:
+            return SubmitResult(order_id, "matched", fills)
+        return SubmitResult(order_id, "unmatched", error="no orders found to match with FAK order")
+
+    def _reject(self, order_id: str, error: str) -> SubmitResult:
+        self.rejected += 1
+        return SubmitResult(order_id, "rejected", error=error)
+
+    def cancel(self, order_id: str, owner: Optional[str] = None) -> bool:
+        """Cancel a resting order (only the owner's, when owner is given)."""
+        o = self.orders.get(order_id)
+        if o is None or (owner is not None and o.owner != owner):
+            return False
+        self._forget(o)
+        self.books[o.token_id].remove(o)
+        self.cancelled += 1
+        return True
+
+    def _forget(self, o: RestingOrder) -> None:
+        self.orders.pop(o.order_id, None)
+        mine = self._by_owner.get(o.owner)
+        if mine is not None:
+            mine.pop(o.order_id, None)
+
+    def open_orders(self, owner: str, token_id: str = "") -> list[RestingOrder]:
+        return [
+            o for o in self._by_owner.get(owner, {}).values()
+            if not token_id or o.token_id == token_id
+        ]
+
+    def stats(self) -> dict:
+        return {
+            "books": len(self.books),
+            "resting": len(self.orders),
+            "submitted": self.submitted,
+            "rejected": self.rejected,
+            "cancelled": self.cancelled,
+            "trades": self.trades,
+            "volume": round(self.volume, 2),
+        }
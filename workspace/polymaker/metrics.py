@@ -0,0 +1,358 @@
+"""
+metrics.py — In-process metrics registry and Prometheus text endpoint
+=====================================================================
+Three metric types, kept as cheap as the hot path needs:
+
+  Counter    inc() is one attribute add on a pre-bound child
+  Gauge      set()/inc(), or a callback read only at scrape time
+  Histogram  observe() is a bisect over fixed bucket bounds
+
+Labelled metrics hand out one child per label set; callers bind the child
+once (e.g. per MarketLoop) and increment that, so no dict lookup or string
+work happens per event. Anything that already keeps its own state (latency
+histograms, feed shard stats, inventory) is exported through collectors:
+functions called only when /metrics is scraped.
+
+MetricsServer answers GET /metrics on METRICS_HOST:METRICS_PORT with
+asyncio.start_server (no HTTP framework); METRICS_PORT=0 disables it.
+monitor_loop_lag() measures event-loop lag as the overshoot of a short sleep.
+"""
+
+import asyncio
+import bisect
+import logging
+import os
+import time
+from typing import Callable, Iterable, Optional
+
+logger = logging.getLogger("polymaker.metrics")
+
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9464"))  # 0 disables the endpoint
+LOOP_LAG_INTERVAL_SEC = 0.25
+
+LATENCY_BUCKETS_SEC = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+# A collector returns families: (name, type, help, [(sample_name, labels, value), ...])
+Family = tuple[str, str, str, list[tuple[str, dict, float]]]
+
+
+def _fmt_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    parts = []
+    for k, v in labels.items():
+        v = str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        parts.append(f'{k}="{v}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def _fmt_value(v: float) -> str:
+    if isinstance(v, int):
+        return str(v)
+    if v != v:
+        return "NaN"
+    if v in (float("inf"), float("-inf")):
+        return "+Inf" if v > 0 else "-Inf"
+    return repr(float(v))
+
+
+# ── Metric types ──────────────────────────────────────────────────────────────
+
+class _CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, n: float = 1.0) -> None:
+        self.value += n
+
+
+class _GaugeChild:
+    __slots__ = ("value", "fn")
+
+    def __init__(self):
+        self.value = 0.0
+        self.fn: Optional[Callable[[], float]] = None
+
+    def set(self, v: float) -> None:
+        self.value = v
+
+    def inc(self, n: float = 1.0) -> None:
+        self.value += n
+
+    def set_function(self, fn: Callable[[], float]) -> None:
+        """Read fn() at scrape time instead of a stored value."""
+        self.fn = fn
+
+    def get(self) -> float:
+        if self.fn is not None:
+            try:
+                return float(self.fn())
+            except Exception:
+                return float("nan")
+        return self.value
+
+
+class _HistogramChild:
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: tuple):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, v: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, v)] += 1
+        self.sum += v
+        self.count += 1
+
+
+class _Metric:
+    kind = ""
+    _child_cls: type = _CounterChild
+
+    def __init__(self, name: str, help_text: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._children: dict[tuple, object] = {}
+        if not self.labelnames:
+            self._default = self._children[()] = self._new_child()
+
+    def _new_child(self):
+        return self._child_cls()
+
+    def labels(self, *values, **kw):
+        """Child for one label set. Bind it once and keep it; this call is the slow part."""
+        key = tuple(str(v) for v in values) if values else tuple(str(kw[n]) for n in self.labelnames)
+        child = self._children.get(key)
+        if child is None:
+            child = self._children[key] = self._new_child()
+        return child
+
+    def remove(self, *values) -> None:
+        self._children.pop(tuple(str(v) for v in values), None)
+
+    def _label_dict(self, key: tuple) -> dict:
+        return dict(zip(self.labelnames, key))
+
+
+class Counter(_Metric):
+    kind = "counter"
+    _child_cls = _CounterChild
+
+    def inc(self, n: float = 1.0) -> None:
+        self._default.value += n
+
+    def samples(self):
+        for key, c in self._children.items():
+            yield self.name, self._label_dict(key), c.value
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+    _child_cls = _GaugeChild
+
+    def set(self, v: float) -> None:
+        self._default.value = v
+
+    def inc(self, n: float = 1.0) -> None:
+        self._default.value += n
+
+    def set_function(self, fn: Callable[[], float]) -> None:
+        self._default.fn = fn
+
+    def samples(self):
+        for key, c in self._children.items():
+            yield self.name, self._label_dict(key), c.get()
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets: tuple = LATENCY_BUCKETS_SEC):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, help_text, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, v: float) -> None:
+        self._default.observe(v)
+
+    def samples(self):
+        for key, h in self._children.items():
+            labels = self._label_dict(key)
+            cum = 0
+            for bound, n in zip(self.buckets + (float("inf"),), h.counts):
+                cum += n
+                yield self.name + "_bucket", {**labels, "le": _fmt_value(float(bound))}, cum
+            yield self.name + "_sum", labels, h.sum
+            yield self.name + "_count", labels, h.count
+
+
+# ── Registry ──────────────────────────────────────────────────────────────────
+
+class Registry:
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+        self._collectors: list[Callable[[], Iterable[Family]]] = []
+
+    def _get(self, cls, name, help_text, labelnames, **kw):
+        m = self._metrics.get(name)
+        if m is None:
+            m = self._metrics[name] = cls(name, help_text, labelnames, **kw)
+        elif not isinstance(m, cls):
+            raise ValueError(f"metric {name} already registered as {m.kind}")
+        return m
+
+    def counter(self, name: str, help_text: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self._get(Counter, name, help_text, labelnames)
+
+    def gauge(self, name: str, help_text: str, labelnames: Iterable[str] = ()) -> Gauge:
+        return self._get(Gauge, name, help_text, labelnames)
+
+    def histogram(
+        self, name: str, help_text: str, labelnames: Iterable[str] = (),
+        buckets: tuple = LATENCY_BUCKETS_SEC,
+    ) -> Histogram:
+        return self._get(Histogram, name, help_text, labelnames, buckets=buckets)
+
+    def collector(self, fn: Callable[[], Iterable[Family]]) -> None:
+        """Register fn() -> [Family, ...], called once per scrape."""
+        self._collectors.append(fn)
+
+    def render(self) -> str:
+        out: list[str] = []
+        for m in self._metrics.values():
+            out.append(f"# HELP {m.name} {m.help}")
+            out.append(f"# TYPE {m.name} {m.kind}")
+            for name, labels, value in m.samples():
+                out.append(f"{name}{_fmt_labels(labels)} {_fmt_value(value)}")
+        for fn in self._collectors:
+            try:
+                families = list(fn())
+            except Exception as e:
+                logger.warning(f"Metrics collector {getattr(fn, '__name__', fn)} failed: {e}")
+                continue
+            for name, kind, help_text, samples in families:
+                out.append(f"# HELP {name} {help_text}")
+                out.append(f"# TYPE {name} {kind}")
+                for sample, labels, value in samples:
+                    out.append(f"{sample}{_fmt_labels(labels)} {_fmt_value(value)}")
+        out.append("")
+        return "\n".join(out)
+
+
+REGISTRY = Registry()
+
+
+# ── CLOB requests ───────────────────────────────────────────────────────────
+
+CLOB_REQUEST_SECONDS = REGISTRY.histogram(
+    "polymaker_clob_request_seconds", "CLOB REST round trip by endpoint", ["endpoint"]
+)
+CLOB_RATE_LIMITED = REGISTRY.counter(
+    "polymaker_clob_429_total", "CLOB requests rejected with HTTP 429", ["endpoint"]
+)
+_endpoints: dict[str, tuple] = {}
+
+
+def clob_call(endpoint: str, fn: Callable, *args, **kwargs):
+    """
+    fn(*args, **kwargs), timed into CLOB_REQUEST_SECONDS and counting 429s.
+    Runs on gateway threads as well as the event loop; updates aren't
+    locked, and a rare lost increment is accepted.
+    """
+    children = _endpoints.get(endpoint)
+    if children is None:
+        children = _endpoints[endpoint] = (
+            CLOB_REQUEST_SECONDS.labels(endpoint), CLOB_RATE_LIMITED.labels(endpoint)
+        )
+    t0 = time.perf_counter()
+    try:
+        return fn(*args, **kwargs)
+    except Exception as e:
+        # py_clob_client raises PolyApiException with the HTTP status
+        if getattr(e, "status_code", None) == 429:
+            children[1].inc()
+        raise
+    finally:
+        children[0].observe(time.perf_counter() - t0)
+
+
+# ── Exposition helpers ────────────────────────────────────────────────────────
+
+def latency_families(tracker) -> list[Family]:
+    """latency.LatencyTracker stage histograms (all markets merged) as one Prometheus histogram."""
+    name = "polymaker_stage_latency_seconds"
+    bounds = LATENCY_BUCKETS_SEC + (float("inf"),)
+    samples = []
+    for stage, h in sorted(tracker.totals().items()):
+        if not h.count:
+            continue
+        for bound, n in zip(bounds, h.cumulative([b * 1e6 for b in LATENCY_BUCKETS_SEC]) + [h.count]):
+            samples.append((name + "_bucket", {"stage": stage, "le": _fmt_value(bound)}, n))
+        samples.append((name + "_sum", {"stage": stage}, h.total_us / 1e6))
+        samples.append((name + "_count", {"stage": stage}, h.count))
+    return [(name, "histogram", "Pipeline stage latency, exchange event to order ack", samples)]
+
+
+# ── Event-loop lag ────────────────────────────────────────────────────────────
+
+LOOP_LAG = REGISTRY.histogram(
+    "polymaker_event_loop_lag_seconds", "Overshoot of a short asyncio sleep",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0),
+)
+
+
+async def monitor_loop_lag(interval: float = LOOP_LAG_INTERVAL_SEC) -> None:
+    while True:
+        t0 = time.perf_counter()
+        await asyncio.sleep(interval)
+        LOOP_LAG.observe(max(0.0, time.perf_counter() - t0 - interval))
+
+
+# ── HTTP endpoint ─────────────────────────────────────────────────────────────
+
+class MetricsServer:
+    """Minimal HTTP/1.0 server for GET /metrics."""
+
+    def __init__(self, registry: Registry = REGISTRY, host: str = METRICS_HOST, port: int = METRICS_PORT):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self._server: Optional[asyncio.base_events.Server] = None
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        logger.info(f"Metrics on http://{self.host}:{self.port}/metrics")
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            request = await asyncio.wait_for(reader.readline(), 5.0)
+            while (await asyncio.wait_for(reader.readline(), 5.0)) not in (b"\r\n", b"\n", b""):
+                pass  # skip headers
+            parts = request.decode("latin-1").split()
+            if len(parts) >= 2 and parts[0] == "GET" and parts[1].split("?")[0] == "/metrics":
+                body = self.registry.render().encode()
+                head = "HTTP/1.0 200 OK\r\nContent-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+            else:
+                body = b"not found\n"
+                head = "HTTP/1.0 404 Not Found\r\nContent-Type: text/plain\r\n"
+            writer.write(f"{head}Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body)
+            await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
@@ -0,0 +1,199 @@
+"""
+orderbook.py — Local L2 order book for Polymarket CLOB tokens
+==============================================================
+Rebuilt entirely from market WebSocket traffic:
+  - `book` events replace both sides of the book (snapshot)
+  - `price_change` events set the resting size at one price level (delta)
+
+Each side keeps a dict of price -> size plus a bisect-sorted price array.
+Size changes at an existing level are O(1); inserting or deleting a level
+is an O(log n) search plus a short memmove (books are bounded to ~1000 ticks).
+"""
+
+import time
+from bisect import bisect_left, bisect_right, insort
+from dataclasses import dataclass, field
+from typing import Iterable, Optional
+
+BUY = "BUY"
+SELL = "SELL"
+
+
+@dataclass
+class BookDepth:
+    """Top-N levels per side, best price first: [(price, size), ...]."""
+    bids: list[tuple[float, float]] = field(default_factory=list)
+    asks: list[tuple[float, float]] = field(default_factory=list)
+
+
+class _BookSide:
+    """One side of the book. Prices are stored ascending; `is_bid` picks the best end."""
+
+    __slots__ = ("is_bid", "_sizes", "_prices")
+
+    def __init__(self, is_bid: bool):
+        self.is_bid = is_bid
+        self._sizes: dict[float, float] = {}
+        self._prices: list[float] = []
+
+    def __len__(self) -> int:
+        return len(self._prices)
+
+    def clear(self) -> None:
+        self._sizes.clear()
+        self._prices.clear()
+
+    def load(self, levels: Iterable[tuple[float, float]]) -> None:
+        self._sizes = {p: s for p, s in levels if s > 0}
+        self._prices = sorted(self._sizes)
+
+    def set(self, price: float, size: float) -> None:
+        """Set absolute size at a level; size <= 0 removes the level."""
+        if size <= 0:
+            if self._sizes.pop(price, None) is not None:
+                i = bisect_left(self._prices, price)
+                if i < len(self._prices) and self._prices[i] == price:
+                    del self._prices[i]
+            return
+        if price not in self._sizes:
+            insort(self._prices, price)
+        self._sizes[price] = size
+
+    def best(self) -> Optional[tuple[float, float]]:
+        if not self._prices:
+            return None
+        p = self._prices[-1] if self.is_bid else self._prices[0]
+        return p, self._sizes[p]
+
+    def top(self, n: int) -> list[tuple[float, float]]:
+        if self.is_bid:
+            prices = self._prices[:-n - 1:-1] if n > 0 else []
+        else:
+            prices = self._prices[:n]
+        return [(p, self._sizes[p]) for p in prices]
+
+    def size_through(self, price: float) -> float:
+        """Total size at `price` and every better level on this side."""
+        if self.is_bid:
+            prices = self._prices[bisect_left(self._prices, price):]
+        else:
+            prices = self._prices[:bisect_right(self._prices, price)]
+        return sum(self._sizes[p] for p in prices)
+
+
+class OrderBook:
+    """
+    L2 book for a single token.
+    Prices/sizes arrive as strings on the wire; callers pass floats.
+    """
+
+    def __init__(self, token_id: str):
+        self.token_id = token_id
+        self.bids = _BookSide(is_bid=True)
+        self.asks = _BookSide(is_bid=False)
+        self.updated_at: float = 0.0  # local receive time of last mutation
+        self.has_snapshot = False
+
+    # ── Mutation ─────────────────────────────────────────────────────────────
+
+    def apply_snapshot(
+        self,
+        bids: Iterable[tuple[float, float]],
+        asks: Iterable[tuple[float, float]],
+    ) -> None:
+        """Replace the whole book with a `book` event."""
+        self.bids.load(bids)
+        self.asks.load(asks)
+        self.has_snapshot = True
+        self.updated_at = time.time()
+
+    def apply_change(self, side: str, price: float, size: float) -> None:
+        """Apply a `price_change` delta. BUY updates bids, SELL updates asks."""
+        book_side = self.bids if side.upper() == BUY else self.asks
+        book_side.set(price, size)
+        self.updated_at = time.time()
+
+    def clear(self) -> None:
+        self.bids.clear()
+        self.asks.clear()
+        self.has_snapshot = False
+
+    # ── Accessors ────────────────────────────────────────────────────────────
+
+    def best_bid(self) -> Optional[float]:
+        b = self.bids.best()
+        return b[0] if b else None
+
+    def best_ask(self) -> Optional[float]:
+        a = self.asks.best()
+        return a[0] if a else None
+
+    def mid(self) -> Optional[float]:
+        """Simple mid, or None unless both sides have liquidity."""
+        b, a = self.bids.best(), self.asks.best()
+        if b is None or a is None:
+            return None
+        return (b[0] + a[0]) / 2.0
+
+    def spread(self) -> Optional[float]:
+        b, a = self.bids.best(), self.asks.best()
+        if b is None or a is None:
+            return None
+        return a[0] - b[0]
+
+    def microprice(self) -> Optional[float]:
+        """
+        Size-weighted mid: leans toward the side with less resting size
+        (the side more likely to be consumed next).
+        """
+        b, a = self.bids.best(), self.asks.best()
+        if b is None or a is None:
+            return None
+        (bp, bs), (ap, as_) = b, a
+        total = bs + as_
+        if total <= 0:
+            return (bp + ap) / 2.0
+        return (bp * as_ + ap * bs) / total
+
+    def depth(self, n: int = 5) -> BookDepth:
+        """Top-N levels per side, best first."""
+        return BookDepth(bids=self.bids.top(n), asks=self.asks.top(n))
+
+    def cumulative_size(self, side: str, price: float) -> float:
+        """
+        Shares resting at `price` or better on `side`:
+        BUY  → bids priced >= price
+        SELL → asks priced <= price
+        """
+        book_side = self.bids if side.upper() == BUY else self.asks
+        return book_side.size_through(price)
+
+    def is_crossed(self) -> bool:
+        b, a = self.best_bid(), self.best_ask()
+        return b is not None and a is not None and b >= a
+
+    def __repr__(self) -> str:
+        return (
+            f"OrderBook({self.token_id[:16]}..., bid={self.best_bid()}, "
+            f"ask={self.best_ask()}, levels={len(self.bids)}/{len(self.asks)})"
+        )
+
+
+def parse_levels(raw_levels) -> list[tuple[float, float]]:
+    """
+    Convert levels to floats, skipping junk. Accepts wire dicts
+    [{"price": "0.52", "size": "100"}, ...], (price, size) pairs, or
+    py_clob_client OrderSummary objects from REST.
+    """
+    levels = []
+    for lvl in raw_levels or []:
+        try:
+            if isinstance(lvl, dict):
+                levels.append((float(lvl["price"]), float(lvl["size"])))
+            elif hasattr(lvl, "price"):
+                levels.append((float(lvl.price), float(lvl.size)))
+            else:
+                levels.append((float(lvl[0]), float(lvl[1])))
+        except (KeyError, IndexError, ValueError, TypeError):
+            continue
+    return levels
@@ -0,0 +1,81 @@
+"""
+orders.py — Working-order model and quote diffing
+==================================================
+OrderManager tracks every order it has resting as a WorkingOrder:
+
+    PENDING ──ack──▶ LIVE ──cancel sent──▶ CANCELLING ──ack──▶ (dropped)
+       │               │                       │
+       └─reject─▶ (dropped)  └─fully filled─▶ (dropped)    └─cancel failed─▶ LIVE
+
+A requote becomes a diff between the working orders on a token and the
+target quotes: orders already at a target's price and size are kept (and
+keep their queue priority), everything else is cancelled by ID and the
+missing targets are placed. The CLOB has no amend, so a moved order is
+always cancel + place.
+"""
+
+import time
+from dataclasses import dataclass, field
+from typing import Iterable
+
+PENDING = "pending"        # submitted, waiting for the exchange ack
+LIVE = "live"              # acked and resting
+CANCELLING = "cancelling"  # cancel request in flight
+
+SIZE_EPS = 0.05  # shares; sizes are rounded to 0.1
+
+
+@dataclass
+class WorkingOrder:
+    token_id: str
+    side: str
+    price: float
+    size: float                 # shares
+    order_id: str = ""
+    state: str = PENDING
+    placed_at: float = field(default_factory=time.time)
+    filled: float = 0.0         # shares matched so far
+
+    @property
+    def remaining(self) -> float:
+        return max(0.0, self.size - self.filled)
+
+
+@dataclass
+class QuoteTarget:
+    """One order we want resting: side, tick-rounded price, size in shares."""
+    side: str
+    price: float
+    size: float
+
+
+def diff_orders(
+    working: Iterable[WorkingOrder],
+    targets: Iterable[QuoteTarget],
+    price_eps: float = 1e-9,
+) -> tuple[list[WorkingOrder], list[WorkingOrder], list[QuoteTarget]]:
+    """
+    Match working orders to targets. Returns (keep, cancel, place).
+    A LIVE or PENDING order matches a target on the same side at the same
+    price whose size equals the order's original size; each order and each
+    target is used at most once. Partially filled orders still match, so
+    they keep their place in the queue.
+    """
+    unmatched = list(targets)
+    keep: list[WorkingOrder] = []
+    cancel: list[WorkingOrder] = []
+    for wo in working:
+        if wo.state == CANCELLING:
+            continue
+        for i, t in enumerate(unmatched):
+            if (
+                t.side == wo.side
+                and abs(t.price - wo.price) <= price_eps
+                and abs(t.size - wo.size) <= SIZE_EPS
+            ):
+                keep.append(wo)
+                del unmatched[i]
+                break
+        else:
+            cancel.append(wo)
+    return keep, cancel, unmatched
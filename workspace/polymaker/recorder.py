@@ -0,0 +1,156 @@
+"""
+recorder.py — Raw WebSocket frame recorder
+===========================================
+Appends every frame MarketFeed receives to gzip-compressed JSONL segments:
+
+    {"t": <local receive time>, "ch": "market" | "user" | "meta", "raw": "<frame>"}
+
+Segments are append-only and rotate by size or age:
+    <dir>/feed-20260301-142500-0001.jsonl.gz
+
+The feed thread only enqueues (timestamp, channel, frame); compression and
+file I/O run on a background writer thread. A segment cut short by a crash
+is still readable up to the last flushed block (see iter_frames).
+"""
+
+import gzip
+import json
+import logging
+import queue
+import threading
+import time
+import zlib
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+
+logger = logging.getLogger("polymaker.recorder")
+
+SEGMENT_MAX_BYTES = 64 * 1024 * 1024   # uncompressed bytes per segment
+SEGMENT_MAX_SEC = 3600.0
+FLUSH_SEC = 1.0
+SEGMENT_GLOB = "feed-*.jsonl.gz"
+
+_STOP = object()
+
+
+class FeedRecorder:
+    """Background-threaded, rotating, compressed frame recorder."""
+
+    def __init__(
+        self,
+        directory: str,
+        segment_max_bytes: int = SEGMENT_MAX_BYTES,
+        segment_max_sec: float = SEGMENT_MAX_SEC,
+    ):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.segment_max_bytes = segment_max_bytes
+        self.segment_max_sec = segment_max_sec
+
+        self._q: queue.SimpleQueue = queue.SimpleQueue()
+        self._seq = 0
+        self._fh: Optional[gzip.GzipFile] = None
+        self._seg_bytes = 0
+        self._seg_opened = 0.0
+        self.frames_written = 0
+        self._thread = threading.Thread(target=self._writer, name="feed-recorder", daemon=True)
+        self._thread.start()
+
+    # ── Producer side (event loop thread) ─────────────────────────────────────
+
+    def record(self, channel: str, raw) -> None:
+        """Enqueue one received frame. Cheap enough for the WS read loop."""
+        self._q.put((time.time(), channel, raw))
+
+    def record_meta(self, meta: dict) -> None:
+        """Store run metadata (e.g. selected markets) alongside the frames."""
+        self._q.put((time.time(), "meta", json.dumps(meta)))
+
+    def close(self) -> None:
+        """Flush everything queued so far and close the current segment."""
+        if not self._thread.is_alive():
+            return
+        self._q.put(_STOP)
+        self._thread.join(timeout=10)
+
+    # ── Writer thread ─────────────────────────────────────────────────────────
+
+    def _open_segment(self) -> None:
+        self._seq += 1
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S")
+        path = self.directory / f"feed-{stamp}-{self._seq:04d}.jsonl.gz"
+        self._fh = gzip.open(path, "ab", compresslevel=6)
+        self._seg_bytes = 0
+        self._seg_opened = time.time()
+        logger.info(f"Recording feed to {path}")
+
+    def _close_segment(self) -> None:
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+
+    def _writer(self) -> None:
+        last_flush = time.time()
+        while True:
+            try:
+                item = self._q.get(timeout=FLUSH_SEC)
+            except queue.Empty:
+                item = None
+
+            if item is _STOP:
+                self._close_segment()
+                return
+
+            now = time.time()
+            if item is not None:
+                t, channel, raw = item
+                if isinstance(raw, (bytes, bytearray)):
+                    raw = raw.decode("utf-8", errors="replace")
+                line = json.dumps({"t": t, "ch": channel, "raw": raw}, separators=(",", ":"))
+                data = line.encode() + b"\n"
+
+                if (
+                    self._fh is None
+                    or self._seg_bytes + len(data) > self.segment_max_bytes
+                    or now - self._seg_opened > self.segment_max_sec
+                ):
+                    self._close_segment()
+                    self._open_segment()
+                try:
+                    self._fh.write(data)
+                except OSError as e:
+                    logger.error(f"Recorder write failed: {e}")
+                    continue
+                self._seg_bytes += len(data)
+                self.frames_written += 1
+
+            if self._fh is not None and now - last_flush >= FLUSH_SEC:
+                # Z_SYNC_FLUSH makes everything so far decodable if we crash
+                self._fh.flush(zlib.Z_SYNC_FLUSH)
+                last_flush = now
+
+
+# ── Reader ────────────────────────────────────────────────────────────────────
+
+def segment_paths(path: str) -> list[Path]:
+    """A single segment file, or every segment in a directory in recording order."""
+    p = Path(path)
+    if p.is_dir():
+        return sorted(p.glob(SEGMENT_GLOB))
+    return [p]
+
+
+def iter_frames(paths: Iterable[Path]) -> Iterator[tuple[float, str, str]]:
+    """Yield (receive_time, channel, raw) across segments, tolerating truncated tails."""
+    for path in paths:
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        rec = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # partial last line
+                    yield rec["t"], rec["ch"], rec["raw"]
+        except (EOFError, gzip.BadGzipFile, zlib.error) as e:
+            logger.warning(f"Segment {path.name} truncated: {e}")
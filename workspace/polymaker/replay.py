@@ -0,0 +1,258 @@
+"""
+replay.py — Accelerated offline replay of recorded feed frames
+===============================================================
+Feeds frames captured by recorder.FeedRecorder back through MarketFeed's
+normal decode/book/mid path into MarketLoop + ASQuoteEngine, on a virtual
+clock. No sockets, no sleeps, no REST: orders go to ReplayOrderManager,
+which records every quote decision instead of sending it.
+
+Timing mirrors MarketLoop.run:
+  - a meaningful mid move requotes at once, or at last_requote + MIN_REQUOTE_SEC
+  - with no move, the loop requotes every QUOTE_REFRESH_SEC on the cached mid
+
+Market metadata comes from "meta" frames the bot writes at startup
+(and again whenever the market set changes).
+
+Usage:
+    python replay.py logs/feed/
+    python replay.py logs/feed/feed-20260301-142500-0001.jsonl.gz --out quotes.jsonl --profile
+"""
+
+import argparse
+import asyncio
+import cProfile
+import heapq
+import json
+import logging
+import pstats
+import time
+from typing import Iterable, Optional
+
+from bot import (
+    InventoryTracker,
+    MarketLoop,
+    OrderManager,
+    MID_THRESHOLD,
+    MIN_REQUOTE_SEC,
+    ORDER_SIZE_USD,
+    QUOTE_REFRESH_SEC,
+)
+from logsetup import setup_logging
+from recorder import iter_frames, segment_paths
+from strategy import ASQuoteEngine
+from ws_feed import MarketFeed
+
+logger = logging.getLogger("polymaker.replay")
+
+
+class ReplayFeed(MarketFeed):
+    """MarketFeed that never connects and remembers which tokens moved."""
+
+    def __init__(self, mid_threshold: float):
+        super().__init__(api_creds={}, token_ids=[], condition_ids=[], mid_threshold=mid_threshold)
+        self.touched: set[str] = set()
+
+    def _add_token_state(self, token_ids: list[str]):
+        # A recording can start mid-stream with no `book` dump for a token and
+        # there is nothing to resync from, so trust the deltas until a gap
+        super()._add_token_state(token_ids)
+        for tid in token_ids:
+            self._slots[tid].stale = False
+
+    def _update_mid(self, token_id: str, new_mid: float, force: bool = False):
+        slot = self._slots.get(token_id)
+        before = slot.seq if slot is not None else 0
+        super()._update_mid(token_id, new_mid, force)
+        if slot is not None and slot.seq != before:
+            self.touched.add(token_id)
+
+
+class ReplayOrderManager(OrderManager):
+    """Dry-run OrderManager that keeps every order intent for later inspection."""
+
+    def __init__(self):
+        super().__init__(client=None, dry_run=True)
+        self.clock = 0.0
+        self.intents: list[dict] = []
+
+    def place_limit_post_only(self, token_id, side, price, size_usd, tick_size=0.01, min_size=1.0):
+        self.intents.append({
+            "t": self.clock, "token": token_id, "side": side,
+            "price": round(price, 4), "size_usd": size_usd,
+        })
+        return super().place_limit_post_only(token_id, side, price, size_usd, tick_size, min_size)
+
+
+class ReplayDriver:
+    """Drives MarketLoops from recorded frames on a virtual clock."""
+
+    def __init__(
+        self,
+        size_usd: float = ORDER_SIZE_USD,
+        min_requote_sec: float = MIN_REQUOTE_SEC,
+        refresh_sec: float = QUOTE_REFRESH_SEC,
+        mid_threshold: float = MID_THRESHOLD,
+    ):
+        self.size_usd = size_usd
+        self.min_requote_sec = min_requote_sec
+        self.refresh_sec = refresh_sec
+
+        self.feed = ReplayFeed(mid_threshold)
+        self.inventory = InventoryTracker()
+        self.order_mgr = ReplayOrderManager()
+        self.loops: list[MarketLoop] = []
+        self._by_token: dict[str, int] = {}  # token_yes -> loop index
+
+        self.clock = 0.0
+        self._timers: list[tuple[float, int, int]] = []  # (when, generation, loop index)
+        self._gen: list[int] = []
+        self._pending: list[bool] = []
+        self.frames = 0
+        self.requotes = 0
+
+    # ── Setup ────────────────────────────────────────────────────────────────
+
+    def add_markets(self, markets: list[dict]) -> None:
+        for m in markets:
+            if m["token_yes"] in self._by_token:
+                continue
+            tokens = [t for t in (m["token_yes"], m.get("token_no")) if t]
+            self.feed._add_token_state(tokens)
+            self.loops.append(MarketLoop(
+                market=m,
+                engine=ASQuoteEngine(),
+                inventory=self.inventory,
+                order_mgr=self.order_mgr,
+                size_usd=self.size_usd,
+                feed=self.feed,
+            ))
+            i = len(self.loops) - 1
+            self._by_token[m["token_yes"]] = i
+            self._gen.append(0)
+            self._pending.append(False)
+            self._schedule(i, self.clock + self.refresh_sec)
+
+    # ── Virtual time ─────────────────────────────────────────────────────────
+
+    def _schedule(self, i: int, when: float) -> None:
+        self._gen[i] += 1
+        heapq.heappush(self._timers, (when, self._gen[i], i))
+
+    async def _fire_until(self, t: float) -> None:
+        while self._timers and self._timers[0][0] <= t:
+            when, gen, i = heapq.heappop(self._timers)
+            if gen != self._gen[i]:
+                continue  # superseded
+            self.clock = max(self.clock, when)
+            await self._requote(i)
+
+    async def _requote(self, i: int) -> None:
+        ml = self.loops[i]
+        self._pending[i] = False
+        slot = self.feed.get_slot(ml.token_yes)
+        if slot is not None:
+            ml._seen_seq = slot.seq
+        await ml._process_ws_fills()
+
+        mid = self.feed.get_mid(ml.token_yes)
+        if mid is not None:
+            self.order_mgr.clock = self.clock
+            await ml._requote(mid, "REPLAY")
+            self.requotes += 1
+        ml._last_requote = self.clock
+        self._schedule(i, self.clock + self.refresh_sec)
+
+    # ── Main loop ────────────────────────────────────────────────────────────
+
+    async def run(self, frames: Iterable[tuple[float, str, str]]) -> None:
+        for t, channel, raw in frames:
+            await self._fire_until(t)
+            self.clock = max(self.clock, t)
+            self.frames += 1
+
+            if channel == "market":
+                self.feed._handle_market_msg(raw)
+            elif channel == "user":
+                self.feed._handle_user_msg(raw)
+            elif channel == "meta":
+                self.add_markets(json.loads(raw).get("markets", []))
+                continue
+
+            if not self.feed.touched:
+                continue
+            for tid in self.feed.touched:
+                i = self._by_token.get(tid)
+                if i is None or self._pending[i]:
+                    continue
+                due = self.loops[i]._last_requote + self.min_requote_sec
+                if due <= self.clock:
+                    await self._requote(i)
+                else:
+                    self._pending[i] = True
+                    self._schedule(i, due)
+            self.feed.touched.clear()
+
+    def summary(self, wall_sec: float, first_t: Optional[float]) -> dict:
+        span = (self.clock - first_t) if first_t is not None else 0.0
+        return {
+            "frames": self.frames,
+            "markets": len(self.loops),
+            "requotes": self.requotes,
+            "orders": len(self.order_mgr.intents),
+            "order_calls": self.order_mgr.rest_calls,
+            "virtual_sec": round(span, 1),
+            "wall_sec": round(wall_sec, 3),
+            "speedup": round(span / wall_sec, 1) if wall_sec > 0 else None,
+            "frames_per_sec": round(self.frames / wall_sec) if wall_sec > 0 else None,
+            "inventory": self.inventory.summary(),
+        }
+
+
+def _timed(frames, first: list):
+    for f in frames:
+        if not first:
+            first.append(f[0])
+        yield f
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded feed frames through the quoting stack")
+    parser.add_argument("path", help="Segment file or recording directory")
+    parser.add_argument("--markets", help="JSON file of market dicts (if the recording has no meta frames)")
+    parser.add_argument("--out", help="Write every order intent as JSONL here")
+    parser.add_argument("--profile", action="store_true", help="Run under cProfile and print hotspots")
+    parser.add_argument("--verbose", action="store_true", help="Keep INFO logs from the quoting stack")
+    args = parser.parse_args()
+
+    setup_logging(log_file="")  # console only: replays don't write the bot's log
+    if not args.verbose:
+        logging.getLogger("polymaker").setLevel(logging.WARNING)
+
+    driver = ReplayDriver()
+    if args.markets:
+        with open(args.markets) as f:
+            driver.add_markets(json.load(f))
+
+    first: list[float] = []
+    frames = _timed(iter_frames(segment_paths(args.path)), first)
+
+    profiler = cProfile.Profile() if args.profile else None
+    t0 = time.perf_counter()
+    if profiler:
+        profiler.enable()
+    asyncio.run(driver.run(frames))
+    if profiler:
+        profiler.disable()
+    wall = time.perf_counter() - t0
+
+    print(json.dumps(driver.summary(wall, first[0] if first else None), indent=2))
+    if args.out:
+        with open(args.out, "w") as f:
+            for intent in driver.order_mgr.intents:
+                f.write(json.dumps(intent) + "\n")
+    if profiler:
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(25)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+risk.py — Portfolio exposure limits across correlated markets
+==============================================================
+ASQuoteEngine limits each market on its own. PortfolioRisk adds the limits
+that span markets:
+
+  condition  net YES exposure of one market (YES and NO netted), USD
+  group      sum of condition exposures in a correlation group, USD. A
+             group is the market's Gamma event (e.g. every "BTC above $X
+             on date" threshold), or the condition itself
+  total      gross exposure, the sum of |condition| over all markets, USD
+
+InventoryTracker reports a market's new exposure after every fill and mark.
+update() applies the delta to the group and total sums, so every read is
+O(1) however many markets are running. MarketLoop asks for:
+
+  skew_usd(token)  the inventory the engine skews on: the condition's own
+                   exposure plus RISK_GROUP_SKEW times the rest of its group
+  room(token)      (buy_usd, sell_usd): how much more YES-equivalent
+                   exposure each side may add before the tightest of the
+                   three limits binds. This caps the quote ladders
+"""
+
+import logging
+import os
+from dataclasses import dataclass
+
+logger = logging.getLogger("polymaker.risk")
+
+RISK_MAX_CONDITION_USD = float(os.getenv("MAX_POSITION_USD", "50.0"))
+RISK_MAX_GROUP_USD = float(os.getenv("RISK_MAX_GROUP_USD", "100.0"))
+RISK_MAX_TOTAL_USD = float(os.getenv("RISK_MAX_TOTAL_USD", "500.0"))
+RISK_GROUP_SKEW = float(os.getenv("RISK_GROUP_SKEW", "0.5"))  # weight of correlated exposure in the skew
+
+
+@dataclass
+class _Condition:
+    group: str
+    exposure: float = 0.0
+
+
+class PortfolioRisk:
+    """Incremental condition, group and gross exposure with per-market limit inputs."""
+
+    def __init__(
+        self,
+        max_condition_usd: float = RISK_MAX_CONDITION_USD,
+        max_group_usd: float = RISK_MAX_GROUP_USD,
+        max_total_usd: float = RISK_MAX_TOTAL_USD,
+        group_skew: float = RISK_GROUP_SKEW,
+    ):
+        self.max_condition_usd = max_condition_usd
+        self.max_group_usd = max_group_usd
+        self.max_total_usd = max_total_usd
+        self.group_skew = group_skew
+        self._conditions: dict[str, _Condition] = {}  # token_yes -> condition state
+        self._groups: dict[str, float] = {}           # group -> net exposure
+        self._members: dict[str, int] = {}            # group -> markets registered
+        self.total_gross = 0.0
+
+    def register_market(self, token_yes: str, group: str) -> None:
+        if token_yes in self._conditions:
+            return
+        group = group or token_yes
+        self._conditions[token_yes] = _Condition(group)
+        self._groups.setdefault(group, 0.0)
+        self._members[group] = self._members.get(group, 0) + 1
+
+    def unregister_market(self, token_yes: str) -> None:
+        c = self._conditions.pop(token_yes, None)
+        if c is None:
+            return
+        self._groups[c.group] -= c.exposure
+        self.total_gross -= abs(c.exposure)
+        self._members[c.group] -= 1
+        if self._members[c.group] <= 0:
+            del self._members[c.group]
+            del self._groups[c.group]
+
+    def update(self, token_yes: str, exposure: float) -> None:
+        """A market's net YES exposure changed (fill or mark)."""
+        c = self._conditions.get(token_yes)
+        if c is None:
+            return
+        self._groups[c.group] += exposure - c.exposure
+        self.total_gross += abs(exposure) - abs(c.exposure)
+        c.exposure = exposure
+
+    # ── Per-market inputs ────────────────────────────────────────────────────
+
+    def skew_usd(self, token_yes: str) -> float:
+        c = self._conditions.get(token_yes)
+        if c is None:
+            return 0.0
+        return c.exposure + self.group_skew * (self._groups[c.group] - c.exposure)
+
+    def room(self, token_yes: str) -> tuple[float, float]:
+        """(buy, sell): YES-equivalent USD each side may still add."""
+        c = self._conditions.get(token_yes)
+        if c is None:
+            return self.max_condition_usd, self.max_condition_usd
+        e = c.exposure
+        g = self._groups[c.group]
+        # Largest |exposure| this condition may reach with everyone else unchanged
+        total_cap = self.max_total_usd - (self.total_gross - abs(e))
+        buy = min(self.max_condition_usd - e, self.max_group_usd - g, total_cap - e)
+        sell = min(self.max_condition_usd + e, self.max_group_usd + g, total_cap + e)
+        return max(0.0, buy), max(0.0, sell)
+
+    def summary(self) -> dict:
+        worst = max(self._groups.items(), key=lambda kv: abs(kv[1]), default=(None, 0.0))
+        return {
+            "markets": len(self._conditions),
+            "groups": len(self._groups),
+            "gross_usd": round(self.total_gross, 2),
+            "largest_group": worst[0],
+            "largest_group_usd": round(worst[1], 2),
+        }
@@ -0,0 +1,189 @@
+"""
+rotation.py — Live market rotation
+===================================
+The bot picks its markets once at startup, but markets die, resolve and go
+quiet. Every ROTATION_SEC, MarketRotator re-runs discovery and compares
+the result with what is running:
+
+  refresh   markets still in the universe get their fresh metadata (days to
+            close, tick size, mid, volume, score)
+  drain     markets no longer in the universe (closed, too near resolution,
+            out of the price band, volume gone) and incumbents a challenger
+            outscores by ROTATION_HYSTERESIS once they have been held
+            ROTATION_MIN_HOLD_SEC. A draining MarketLoop only quotes the side
+            that reduces its position
+  retire    draining markets once their exposure is within ROTATION_FLAT_USD,
+            or ROTATION_DRAIN_MAX_SEC after draining began
+  add       the best challengers, into open slots and in place of drained
+            incumbents (at most ROTATION_MAX_SWAPS swaps per round)
+
+New markets start before old ones retire, so quoting capacity never drops
+below NUM_MARKETS. The bot owns the loops: MarketRotator asks it to start
+and retire markets through the two callbacks it is given.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable
+
+from metrics import REGISTRY
+
+logger = logging.getLogger("polymaker.rotation")
+
+ROTATION_SEC = float(os.getenv("ROTATION_SEC", "900"))  # 0 disables rotation
+ROTATION_MIN_HOLD_SEC = float(os.getenv("ROTATION_MIN_HOLD_SEC", "1800"))
+ROTATION_HYSTERESIS = float(os.getenv("ROTATION_HYSTERESIS", "0.10"))  # score margin a challenger needs
+ROTATION_MAX_SWAPS = int(os.getenv("ROTATION_MAX_SWAPS", "2"))
+ROTATION_FLAT_USD = float(os.getenv("ROTATION_FLAT_USD", "5.0"))
+ROTATION_DRAIN_MAX_SEC = float(os.getenv("ROTATION_DRAIN_MAX_SEC", "3600"))
+REFRESH_KEYS = ("days_to_close", "tick_size", "min_order_size", "mid", "volume_24h", "liquidity", "score")
+
+_ROTATIONS = REGISTRY.counter("polymaker_rotation_total", "Market rotation actions", ["action"])
+_ADDED = _ROTATIONS.labels("added")
+_DRAINED = _ROTATIONS.labels("drained")
+_RETIRED = _ROTATIONS.labels("retired")
+
+
+@dataclass
+class RotationPlan:
+    add: list[dict] = field(default_factory=list)   # market dicts to start
+    drain: list = field(default_factory=list)       # MarketLoops to start draining
+    retire: list = field(default_factory=list)      # MarketLoops to stop now
+
+    def __bool__(self) -> bool:
+        return bool(self.add or self.drain or self.retire)
+
+
+def plan_rotation(loops: list, fresh: list[dict], target: int, now: float) -> RotationPlan:
+    """
+    Decide one round. `loops` are the running MarketLoops (token_yes,
+    started_at, draining, drain_started, inventory); `fresh` is discovery
+    output, best first, each with a "score".
+    """
+    plan = RotationPlan()
+    by_token = {m["token_yes"]: m for m in fresh}
+    running = {ml.token_yes for ml in loops}
+
+    def flat(ml) -> bool:
+        return abs(ml.inventory.exposure(ml.token_yes)) <= ROTATION_FLAT_USD
+
+    quoting = []
+    for ml in loops:
+        if ml.draining:
+            if flat(ml) or now - ml.drain_started >= ROTATION_DRAIN_MAX_SEC:
+                plan.retire.append(ml)
+        elif ml.token_yes in by_token:
+            quoting.append(ml)
+        else:
+            plan.drain.append(ml)  # left the universe
+
+    challengers = [m for m in fresh if m["token_yes"] not in running]
+    slots = target - len(quoting)
+    while slots > 0 and challengers:
+        plan.add.append(challengers.pop(0))
+        slots -= 1
+
+    # Weakest incumbents first; both lists are sorted, so stop at the first
+    # incumbent the best remaining challenger can't beat
+    swaps = 0
+    for ml in sorted(quoting, key=lambda ml: by_token[ml.token_yes]["score"]):
+        if swaps >= ROTATION_MAX_SWAPS or not challengers:
+            break
+        if now - ml.started_at < ROTATION_MIN_HOLD_SEC:
+            continue
+        if challengers[0]["score"] <= by_token[ml.token_yes]["score"] + ROTATION_HYSTERESIS:
+            break
+        plan.drain.append(ml)
+        plan.add.append(challengers.pop(0))
+        swaps += 1
+
+    # Nothing to unwind: no need to wait a round before retiring
+    for ml in plan.drain:
+        if flat(ml):
+            plan.retire.append(ml)
+    plan.drain = [ml for ml in plan.drain if ml not in plan.retire]
+    return plan
+
+
+class MarketRotator:
+    """Periodic discovery, then start/drain/retire MarketLoops to keep the best `target` markets."""
+
+    def __init__(
+        self,
+        discover: Callable[[int], list[dict]],
+        loops: Callable[[], list],
+        start_market: Callable[[dict], Awaitable[None]],
+        retire_market: Callable[[object], Awaitable[None]],
+        target: int,
+        interval: float = ROTATION_SEC,
+    ):
+        self.discover = discover            # blocking, e.g. markets.find_maker_markets
+        self.loops = loops                  # the bot's current MarketLoops
+        self.start_market = start_market
+        self.retire_market = retire_market
+        self.target = target
+        self.interval = interval
+        self.rounds = 0
+        self.added = 0
+        self.retired = 0
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.rotate()
+            except Exception as e:
+                logger.error(f"Market rotation failed: {e}")
+
+    async def rotate(self) -> RotationPlan:
+        """One round: discover, plan, then add before retiring."""
+        fresh = await asyncio.to_thread(self.discover, self.target * 3)
+        if len(fresh) < self.target:
+            # Discovery came back short (API trouble, pagination cut off):
+            # don't read missing markets as dead
+            logger.warning(f"Rotation skipped: discovery returned {len(fresh)} markets, need {self.target}")
+            return RotationPlan()
+        self.rounds += 1
+
+        loops = list(self.loops())
+        by_token = {m["token_yes"]: m for m in fresh}
+        for ml in loops:
+            m = by_token.get(ml.token_yes)
+            if m is not None:
+                ml.market.update({k: m[k] for k in REFRESH_KEYS if k in m})
+
+        plan = plan_rotation(loops, fresh, self.target, time.time())
+        for m in plan.add:
+            try:
+                await self.start_market(m)
+            except Exception as e:
+                logger.error(f"Failed to start {m['question'][:50]}: {e}")
+                continue
+            self.added += 1
+            _ADDED.inc()
+            logger.info(f"Rotation: added [{m['score']:.2f}] {m['question'][:60]}")
+        for ml in plan.drain:
+            ml.drain()
+            _DRAINED.inc()
+            score = by_token.get(ml.token_yes, {}).get("score")
+            logger.info(
+                f"Rotation: draining {ml.market['question'][:60]} "
+                f"({'left the universe' if score is None else f'score {score:.2f}'}, "
+                f"exposure ${ml.inventory.exposure(ml.token_yes):.2f})"
+            )
+        for ml in plan.retire:
+            await self.retire_market(ml)
+            self.retired += 1
+            _RETIRED.inc()
+        if plan:
+            logger.info(
+                f"Rotation round {self.rounds}: +{len(plan.add)} draining={len(plan.drain)} "
+                f"retired={len(plan.retire)} running={len(self.loops())}"
+            )
+        return plan
+
+    def stats(self) -> dict:
+        return {"rounds": self.rounds, "added": self.added, "retired": self.retired}
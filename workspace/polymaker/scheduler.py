@@ -0,0 +1,144 @@
+"""
+scheduler.py — Account-wide requote budget shared by every MarketLoop
+======================================================================
+The CLOB rate-limits order placement and cancellation per account, not per
+market. Left alone, each MarketLoop only knows its own MIN_REQUOTE_SEC, so
+a market-wide move makes every loop requote at once and the burst comes
+back as 429s.
+
+RequoteScheduler owns a token bucket in order operations (one placed or
+cancelled order = 1), refilled at REQUOTE_BUDGET_PER_SEC up to
+REQUOTE_BUDGET_BURST. A loop that wants to requote calls acquire() with its
+expected cost and an urgency function, and waits. Whenever the bucket can
+pay, the most urgent waiting loop goes next:
+
+  urgency = URGENCY_MOVE * mid move since last quote (ticks)
+          + URGENCY_INVENTORY * |inventory| / max inventory
+          + URGENCY_AGE * seconds since last quote / QUOTE_REFRESH_SEC
+
+Urgency is evaluated at dispatch time, so a loop that waits keeps ageing up
+the queue. Picking is a linear scan over the waiting loops, which is at most
+one per market. After the requote, settle() charges the actual cost
+against the estimate.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+logger = logging.getLogger("polymaker.scheduler")
+
+REQUOTE_BUDGET_PER_SEC = float(os.getenv("REQUOTE_BUDGET_PER_SEC", "40"))  # 0 disables the scheduler
+REQUOTE_BUDGET_BURST = float(os.getenv("REQUOTE_BUDGET_BURST", "200"))
+URGENCY_MOVE = 1.0
+URGENCY_INVENTORY = 2.0
+URGENCY_AGE = 1.0
+
+
+@dataclass
+class _Waiter:
+    key: str
+    urgency: Callable[[], float]
+    cost: float
+    fut: asyncio.Future
+    since: float = field(default_factory=time.monotonic)
+
+
+class RequoteScheduler:
+    """Token bucket over order operations, dispatched to the most urgent waiting market."""
+
+    def __init__(
+        self,
+        rate_per_sec: float = REQUOTE_BUDGET_PER_SEC,
+        burst: float = REQUOTE_BUDGET_BURST,
+        latency=None,
+    ):
+        self.rate = max(rate_per_sec, 1e-6)
+        self.burst = max(1.0, burst)
+        self._tokens = self.burst
+        self._refilled = time.monotonic()
+        self._waiting: dict[str, _Waiter] = {}
+        self._wake = asyncio.Event()
+        self._latency = latency  # optional latency.LatencyTracker
+        self.dispatched = 0
+        self.spent = 0.0
+
+    # ── Loop side ────────────────────────────────────────────────────────────
+
+    async def acquire(self, key: str, urgency: Callable[[], float], cost: float) -> None:
+        """Wait until the budget can pay `cost` and `key` is the most urgent market waiting."""
+        fut = asyncio.get_running_loop().create_future()
+        w = _Waiter(key, urgency, max(0.0, min(cost, self.burst)), fut)
+        self._waiting[key] = w
+        self._wake.set()
+        try:
+            await fut
+        finally:
+            if self._waiting.get(key) is w:
+                del self._waiting[key]
+        if self._latency is not None:
+            self._latency.record_ns(key, "sched_wait", int((time.monotonic() - w.since) * 1e9))
+
+    def settle(self, estimated: float, actual: float) -> None:
+        """Correct the bucket once the requote's real operation count is known."""
+        self._tokens = min(self.burst, self._tokens + estimated - actual)
+        self.spent += actual - estimated
+
+    # ── Dispatch ─────────────────────────────────────────────────────────────
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._refilled) * self.rate)
+        self._refilled = now
+
+    def _most_urgent(self) -> Optional[_Waiter]:
+        best, best_u = None, float("-inf")
+        for w in self._waiting.values():
+            if w.fut.done():
+                continue
+            try:
+                u = w.urgency()
+            except Exception:
+                u = 0.0
+            if u > best_u:
+                best, best_u = w, u
+        return best
+
+    async def run(self) -> None:
+        while True:
+            w = self._most_urgent()
+            if w is None:
+                self._wake.clear()
+                await self._wake.wait()
+                continue
+            self._refill()
+            if self._tokens < w.cost:
+                # Sleep until the bucket covers the current front-runner; newcomers
+                # wake us so a more urgent market can take its place
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), (w.cost - self._tokens) / self.rate)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            self._tokens -= w.cost
+            self.spent += w.cost
+            self.dispatched += 1
+            w.fut.set_result(None)
+
+    def close(self) -> None:
+        """Cancel every waiting acquire(); their loops see CancelledError and exit."""
+        for w in list(self._waiting.values()):
+            w.fut.cancel()
+
+    def stats(self) -> dict:
+        self._refill()
+        return {
+            "waiting": len(self._waiting),
+            "dispatched": self.dispatched,
+            "spent": round(self.spent, 1),
+            "tokens": round(self._tokens, 1),
+        }
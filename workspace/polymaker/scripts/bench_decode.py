@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Market WS decode benchmark
+===========================
+Measures messages/sec for the old `json.loads` + dict `.get()` path that
+MarketFeed used to run on every frame, versus ws_decode.FrameDecoder on
+each available JSON backend.
+
+Frames come from a recording (one raw frame per line) or, when no file is
+given, from a synthetic mix shaped like live traffic: mostly price_change,
+some book snapshots, plus tick_size_change / best_bid_ask frames we skip.
+
+Usage:
+    python scripts/bench_decode.py
+    python scripts/bench_decode.py --frames logs/market_frames.txt --repeat 20
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from orderbook import parse_levels  # noqa: E402
+from ws_decode import FrameDecoder  # noqa: E402
+
+
+# ---------------------------------------------------------------------------
+# Frames
+# ---------------------------------------------------------------------------
+
+def load_frames(path: str) -> list[str]:
+    with open(path) as f:
+        return [line.rstrip("\n") for line in f if line.strip()]
+
+
+def synth_frames(n: int, n_assets: int = 200, seed: int = 7) -> list[str]:
+    rng = random.Random(seed)
+    assets = [str(rng.getrandbits(250)) for _ in range(n_assets)]
+    frames = []
+    for _ in range(n):
+        a = rng.choice(assets)
+        roll = rng.random()
+        ts = str(int(time.time() * 1000))
+        if roll < 0.70:
+            bid = round(rng.uniform(0.2, 0.7), 2)
+            changes = [
+                {
+                    "asset_id": a,
+                    "price": f"{bid + rng.choice([-0.01, 0, 0.01]):.2f}",
+                    "size": f"{rng.uniform(0, 500):.2f}",
+                    "side": rng.choice(["BUY", "SELL"]),
+                    "hash": f"{rng.getrandbits(160):040x}",
+                    "best_bid": f"{bid:.2f}",
+                    "best_ask": f"{bid + 0.02:.2f}",
+                }
+                for _ in range(rng.randint(1, 3))
+            ]
+            msg = {"market": "0x" + f"{rng.getrandbits(256):064x}", "event_type": "price_change",
+                   "price_changes": changes, "timestamp": ts}
+        elif roll < 0.80:
+            mid = rng.uniform(0.2, 0.8)
+            msg = [{
+                "market": "0x" + f"{rng.getrandbits(256):064x}", "asset_id": a,
+                "event_type": "book", "timestamp": ts, "hash": f"{rng.getrandbits(160):040x}",
+                "bids": [{"price": f"{mid - 0.01 * i:.2f}", "size": f"{rng.uniform(1, 900):.2f}"}
+                         for i in range(1, 15)],
+                "asks": [{"price": f"{mid + 0.01 * i:.2f}", "size": f"{rng.uniform(1, 900):.2f}"}
+                         for i in range(1, 15)],
+            }]
+        elif roll < 0.85:
+            msg = {"asset_id": a, "event_type": "last_trade_price", "price": f"{rng.uniform(0.2, 0.8):.2f}",
+                   "side": "BUY", "size": "10", "timestamp": ts, "fee_rate_bps": "0"}
+        elif roll < 0.95:
+            msg = {"asset_id": a, "event_type": "best_bid_ask", "best_bid": "0.48",
+                   "best_ask": "0.52", "spread": "0.04", "timestamp": ts}
+        else:
+            msg = {"asset_id": a, "event_type": "tick_size_change", "old_tick_size": "0.01",
+                   "new_tick_size": "0.001", "timestamp": ts}
+        frames.append(json.dumps(msg, separators=(",", ":")))
+    return frames
+
+
+# ---------------------------------------------------------------------------
+# Decoders under test
+# ---------------------------------------------------------------------------
+
+def legacy_handle(raw: str) -> int:
+    """The pre-ws_decode MarketFeed._handle_market_msg parse path (no book/mid side effects)."""
+    try:
+        msgs = json.loads(raw)
+    except json.JSONDecodeError:
+        return 0
+    if not isinstance(msgs, list):
+        msgs = [msgs]
+    n = 0
+    for msg in msgs:
+        event_type = msg.get("event_type", "")
+        if event_type == "price_change":
+            changes = msg.get("price_changes") or msg.get("changes") or []
+            if not isinstance(changes, list):
+                changes = [changes]
+            for change in changes:
+                asset_id = change.get("asset_id") or msg.get("asset_id")
+                best_bid = change.get("best_bid") or change.get("price")
+                best_ask = change.get("best_ask")
+                if asset_id and best_bid is not None and best_ask is not None:
+                    (float(best_bid) + float(best_ask)) / 2.0
+                    n += 1
+        elif event_type == "book":
+            parse_levels(msg.get("bids") or msg.get("buys") or [])
+            parse_levels(msg.get("asks") or msg.get("sells") or [])
+            n += 1
+        elif event_type == "last_trade_price":
+            price = msg.get("price") or msg.get("last_trade_price")
+            if price is not None:
+                float(price)
+                n += 1
+    return n
+
+
+def bench(cases: list[tuple[str, object, list]], repeat: int) -> dict[str, float]:
+    """
+    Best pass per case, in messages/sec. Cases run round-robin within each
+    pass, so a noisy neighbour slows them all alike and the ratios hold.
+    """
+    best = {label: float("inf") for label, _, _ in cases}
+    for _ in range(repeat):
+        for label, fn, data in cases:
+            t0 = time.perf_counter()
+            for raw in data:
+                fn(raw)
+            best[label] = min(best[label], time.perf_counter() - t0)
+    return {label: len(data) / best[label] for label, _, data in cases}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark market WS frame decoding")
+    parser.add_argument("--frames", help="File with one raw frame per line (default: synthetic)")
+    parser.add_argument("--count", type=int, default=20_000, help="Synthetic frame count")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    frames = load_frames(args.frames) if args.frames else synth_frames(args.count)
+    encoded = [f.encode() for f in frames]
+    print(f"Frames: {len(frames)} x {args.repeat} ({'recorded' if args.frames else 'synthetic'})")
+
+    legacy = "legacy json.loads + dict.get"
+    cases = [(legacy, legacy_handle, frames)]
+    decoders = []
+    reference = [FrameDecoder("json").decode_market(f) for f in frames]
+    for backend in ("json", "orjson", "msgspec"):
+        dec = FrameDecoder(backend)
+        if any(d.backend == dec.backend for d in decoders):
+            continue  # backend not installed, fell back to one already measured
+        if any(dec.decode_market(f) != ref for f, ref in zip(frames, reference)):
+            print(f"  FrameDecoder[{dec.backend}] events differ from the json backend")
+        dec.frames_decoded = dec.frames_skipped = 0
+        decoders.append(dec)
+        for kind, data in (("str", frames), ("bytes", encoded)):
+            cases.append((f"FrameDecoder[{dec.backend}] {kind}", dec.decode_market, data))
+
+    rates = bench(cases, args.repeat)
+    baseline = rates[legacy]
+    print(f"  {legacy:<34} {baseline:>12,.0f} msg/s")
+    for label, rate in rates.items():
+        if label != legacy:
+            print(f"  {label:<34} {rate:>12,.0f} msg/s  ({rate / baseline:.2f}x)")
+    dec = decoders[0]
+    skipped = dec.frames_skipped / max(1, dec.frames_skipped + dec.frames_decoded)
+    print(f"  prefilter skipped {skipped:.1%} of frames")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Logging cost per requote
+========================
+Runs MarketLoop._requote in dry-run (OrderManager without a client, so
+every order call is local) over a mid that alternates between two
+prices, so each requote cancels and replaces its ladders and logs the way a
+live requote does. The same loop is timed under three logging setups:
+
+    off     no handlers, level WARNING: the requote with logging disabled
+    sync    the old setup, a FileHandler writing text on the event loop
+    queue   logsetup.setup_logging(): QueueHandler + JSONL writer thread
+
+and the report shows what each setup adds per requote over "off".
+
+Requotes are spaced --gap-ms apart, since the live loop spends most of its
+time waiting on the feed and the writer thread formats and writes in that
+idle time. With --gap-ms 0 the loop never idles, the writer can only run by
+taking the GIL from it, and the queue setup's p99 grows to about the
+interpreter's switch interval (sys.getswitchinterval(), 5 ms): there is no
+idle time to move the work into.
+
+Usage:
+    python scripts/bench_logging.py
+    python scripts/bench_logging.py --requotes 20000 --levels 3 --debug
+    python scripts/bench_logging.py --gap-ms 0
+"""
+
+import argparse
+import asyncio
+import logging
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from bot import InventoryTracker, MarketLoop, OrderManager  # noqa: E402
+from logsetup import TEXT_FORMAT, setup_logging, stop_logging  # noqa: E402
+from strategy import ASQuoteEngine  # noqa: E402
+
+MARKET = {
+    "question": "Will the benchmark finish before the coffee gets cold?",
+    "token_yes": "1" * 77,
+    "token_no": "2" * 77,
+    "condition_id": "0xbench",
+    "tick_size": 0.01,
+    "min_order_size": 1.0,
+    "days_to_close": 20.0,
+}
+
+
+# ---------------------------------------------------------------------------
+# Logging setups
+# ---------------------------------------------------------------------------
+
+def _reset_root() -> logging.Logger:
+    root = logging.getLogger()
+    for h in list(root.handlers):
+        root.removeHandler(h)
+        h.close()
+    return root
+
+
+def configure(mode: str, path: Path, level: int):
+    """Install one setup; returns the queue listener (queue mode) or None."""
+    root = _reset_root()
+    if mode == "off":
+        root.setLevel(logging.WARNING)
+        return None
+    if mode == "sync":
+        h = logging.FileHandler(path, mode="w")
+        h.setFormatter(logging.Formatter(TEXT_FORMAT))
+        root.addHandler(h)
+        root.setLevel(level)
+        return None
+    return setup_logging(log_file=str(path), level=logging.getLevelName(level), console=False)
+
+
+# ---------------------------------------------------------------------------
+# Benchmark
+# ---------------------------------------------------------------------------
+
+async def time_requotes(n: int, levels: int, gap_ms: float = 0.0) -> list[int]:
+    om = OrderManager(client=None, dry_run=True)
+    loop = MarketLoop(
+        market=dict(MARKET),
+        engine=ASQuoteEngine(levels=levels),
+        inventory=InventoryTracker(),
+        order_mgr=om,
+        size_usd=5.0,
+    )
+    samples = []
+    for i in range(n):
+        mid = 0.50 if i % 2 == 0 else 0.53
+        t0 = time.perf_counter_ns()
+        await loop._requote(mid, "WS")
+        samples.append(time.perf_counter_ns() - t0)
+        if gap_ms:
+            await asyncio.sleep(gap_ms / 1000.0)
+    loop.stop()
+    return samples
+
+
+def pct(sorted_ns: list[int], p: float) -> float:
+    return sorted_ns[min(len(sorted_ns) - 1, int(p / 100.0 * len(sorted_ns)))] / 1000.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-requote cost of each logging setup")
+    parser.add_argument("--requotes", type=int, default=10_000)
+    parser.add_argument("--levels", type=int, default=3, help="Ladder levels per side")
+    parser.add_argument("--debug", action="store_true", help="Log at DEBUG instead of INFO")
+    parser.add_argument("--gap-ms", type=float, default=1.0,
+                        help="Idle time between requotes (0: back to back, CPU-bound)")
+    args = parser.parse_args()
+    level = logging.DEBUG if args.debug else logging.INFO
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode in ("off", "sync", "queue"):
+            path = Path(tmp) / f"{mode}.log"
+            listener = configure(mode, path, level)
+            asyncio.run(time_requotes(min(500, args.requotes), args.levels))  # warm-up
+            t0 = time.perf_counter()
+            samples = asyncio.run(time_requotes(args.requotes, args.levels, args.gap_ms))
+            loop_sec = time.perf_counter() - t0
+            t1 = time.perf_counter()
+            stop_logging(listener)  # drain: the writer's backlog, timed separately
+            drain_sec = time.perf_counter() - t1
+            _reset_root()
+            lines = sum(1 for _ in open(path)) if path.exists() else 0
+            samples.sort()
+            results[mode] = {
+                "mean_us": sum(samples) / len(samples) / 1000.0,
+                "p50_us": pct(samples, 50),
+                "p99_us": pct(samples, 99),
+                "loop_sec": loop_sec,
+                "drain_sec": drain_sec,
+                "lines_per_requote": lines / (args.requotes + min(500, args.requotes)),
+            }
+
+    base = results["off"]["mean_us"]
+    print(f"{args.requotes} requotes, {args.levels} levels/side, level={logging.getLevelName(level)}")
+    print(f"{'setup':<7} {'mean µs':>9} {'p50 µs':>9} {'p99 µs':>9} {'+µs/requote':>12} "
+          f"{'lines/req':>10} {'drain s':>8}")
+    for mode, r in results.items():
+        print(
+            f"{mode:<7} {r['mean_us']:>9.1f} {r['p50_us']:>9.1f} {r['p99_us']:>9.1f} "
+            f"{r['mean_us'] - base:>12.1f} {r['lines_per_requote']:>10.1f} {r['drain_sec']:>8.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,395 @@
+#!/usr/bin/env python3
+"""
+Bot scaling by market count
+===========================
+Runs the whole PolyMakerBot (discovery, MarketFeed, MarketLoops,
+OrderManager, batcher, fills) against simexchange.py at several market
+counts and reports, per size:
+
+    loop lag    event-loop lag percentiles: overshoot of a LAG_INTERVAL sleep
+    requote     MarketLoop._requote wall time (quote, sign, post/cancel acks)
+                plus the tracker's recv_to_ack and sign stages
+    messages    WS frames handled per second (market shards + user channel)
+    cpu         process CPU over the window: cores used, and % of a core per market
+    memory      RSS growth from the imported-but-idle process, per market
+
+Each size gets a fresh simulator process and a fresh bot process (this
+script re-run with --worker), so memory and CPU are the bot's alone. The
+worker lets the bot start and settle for --warmup seconds, then measures
+for --duration seconds. The simulator's own CPU is reported too; if it is
+near a full core, the sim is the bottleneck and the numbers understate the
+bot's load.
+
+Results go to a JSON baseline (machine, settings and one entry per size).
+--compare checks a run against a stored baseline and exits non-zero when a
+metric is worse by more than --tolerance (and by more than its noise
+floor), so scaling regressions in MarketLoop, MarketFeed or OrderManager
+show up before deploy. Compare baselines from the same machine only.
+
+Usage:
+    python scripts/bench_scaling.py
+    python scripts/bench_scaling.py --sizes 5 50 --duration 30
+    python scripts/bench_scaling.py --compare scripts/baselines/scaling.json --out /tmp/scaling.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from datetime import datetime, timezone
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+DEFAULT_SIZES = (5, 50, 200, 1000)
+DEFAULT_OUT = PROJECT_ROOT / "scripts" / "baselines" / "scaling.json"
+LAG_INTERVAL = 0.02
+RESULT_PREFIX = "RESULT "
+
+# Metrics --compare checks (higher is worse), with the absolute change below
+# which a difference is noise
+REGRESSION_FLOORS = {
+    "loop_lag_ms.p50": 0.5,
+    "loop_lag_ms.p99": 2.0,
+    "requote_ms.p50": 1.0,
+    "requote_ms.p99": 5.0,
+    "cpu_pct_per_market": 0.05,
+    "rss_kb_per_market": 20.0,
+}
+
+
+def pct(sorted_vals: list, p: float):
+    if not sorted_vals:
+        return None
+    return sorted_vals[min(len(sorted_vals) - 1, int(p / 100.0 * len(sorted_vals)))]
+
+
+def summary_ms(samples_ns: list[int]) -> dict:
+    s = sorted(samples_ns)
+    out = {"n": len(s)}
+    for name, p in (("p50", 50), ("p90", 90), ("p99", 99), ("p999", 99.9)):
+        v = pct(s, p)
+        out[name] = round(v / 1e6, 3) if v is not None else None
+    out["max"] = round(s[-1] / 1e6, 3) if s else None
+    return out
+
+
+def rss_kb() -> int:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    return 0
+
+
+def cpu_sec(pid: int) -> float:
+    """utime + stime of another process."""
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+# ---------------------------------------------------------------------------
+# Worker: one bot, one size
+# ---------------------------------------------------------------------------
+
+async def run_bot(n: int, warmup: float, duration: float) -> dict:
+    import bot as bot_module
+    from bot import MarketLoop, PolyMakerBot
+
+    requote_ns: list[int] = []
+    recording = False
+    requote = MarketLoop._requote
+
+    async def timed_requote(self, *args, **kwargs):
+        t0 = time.perf_counter_ns()
+        try:
+            return await requote(self, *args, **kwargs)
+        finally:
+            if recording:
+                requote_ns.append(time.perf_counter_ns() - t0)
+
+    MarketLoop._requote = timed_requote
+
+    lag_ns: list[int] = []
+
+    async def sample_lag():
+        while True:
+            t0 = time.perf_counter_ns()
+            await asyncio.sleep(LAG_INTERVAL)
+            if recording:
+                lag_ns.append(max(0, time.perf_counter_ns() - t0 - int(LAG_INTERVAL * 1e9)))
+
+    def order_acks() -> tuple[float, float]:
+        m = bot_module
+        return (m._ORDERS_ACCEPTED.value + m._ORDERS_REJECTED.value,
+                m._ORDERS_CANCELLED.value + m._ORDERS_NOT_CANCELLED.value)
+
+    def frames(bot) -> int:
+        feed = bot._feed
+        return sum(s.get("msgs", 0) for s in feed.shard_stats()) + getattr(feed, "user_msgs", 0)
+
+    rss0 = rss_kb()
+    bot = PolyMakerBot(num_markets=n)
+    run = asyncio.create_task(bot.run())
+    lag_task = asyncio.create_task(sample_lag())
+    await asyncio.sleep(warmup)
+    if run.done():
+        raise RuntimeError(f"bot exited during warm-up: {run.exception()!r}")
+
+    # Measurement window
+    bot._latency._hists.clear()
+    frames0, acks0, fills0 = frames(bot), order_acks(), bot._inventory._fill_count
+    cpu0, t0 = time.process_time(), time.perf_counter()
+    recording = True
+    await asyncio.sleep(duration)
+    recording = False
+    wall = time.perf_counter() - t0
+    cpu = time.process_time() - cpu0
+    rss1 = rss_kb()
+    acks1 = order_acks()
+
+    stages = bot._latency.totals()
+
+    def stage_ms(name: str) -> dict:
+        h = stages.get(name)
+        if h is None or not h.count:
+            return {"n": 0}
+        return {"n": h.count, "p50": round(h.percentile(50) / 1000, 3), "p99": round(h.percentile(99) / 1000, 3)}
+
+    result = {
+        "markets": n,
+        "markets_running": len(bot._loops),
+        "window_sec": round(wall, 1),
+        "loop_lag_ms": summary_ms(lag_ns),
+        "requote_ms": summary_ms(requote_ns),
+        "requotes_per_sec": round(len(requote_ns) / wall, 2),
+        "stage_ms": {s: stage_ms(s) for s in ("recv_to_ack", "quote", "sign", "post", "sched_wait")},
+        "ws_frames_per_sec": round((frames(bot) - frames0) / wall, 1),
+        "posts_per_sec": round((acks1[0] - acks0[0]) / wall, 2),
+        "cancels_per_sec": round((acks1[1] - acks0[1]) / wall, 2),
+        "fills": bot._inventory._fill_count - fills0,
+        "cpu_cores": round(cpu / wall, 3),
+        "cpu_pct_per_market": round(100.0 * cpu / wall / n, 4),
+        "rss_mb": round(rss1 / 1024, 1),
+        "rss_kb_per_market": round((rss1 - rss0) / n, 1),
+        "threads": threading.active_count(),
+    }
+
+    lag_task.cancel()
+    await bot._shutdown()
+    run.cancel()
+    await asyncio.gather(run, lag_task, return_exceptions=True)
+    return result
+
+
+def worker(args) -> None:
+    from logsetup import setup_logging, stop_logging
+
+    listener = setup_logging(log_file=args.log_file, console=False)
+    result = asyncio.run(run_bot(args.worker, args.warmup, args.duration))
+    print(RESULT_PREFIX + json.dumps(result), flush=True)
+    stop_logging(listener)
+    os._exit(0)  # don't wait on executor threads still parked in HTTP keep-alive
+
+
+# ---------------------------------------------------------------------------
+# Orchestrator: a simulator and a worker per size
+# ---------------------------------------------------------------------------
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_ready(url: str, proc: subprocess.Popen, timeout: float = 60.0) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"simulator exited with {proc.returncode}")
+        try:
+            urllib.request.urlopen(url + "/time", timeout=1).read()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError("simulator did not come up")
+
+
+def run_size(n: int, args, tmp: Path) -> dict:
+    from simexchange import sim_env
+
+    port, ws_port = free_port(), free_port()
+    sim = subprocess.Popen(
+        [sys.executable, str(PROJECT_ROOT / "simexchange.py"), "--markets", str(n),
+         "--port", str(port), "--ws-port", str(ws_port), "--flow-rate", str(args.flow_rate),
+         "--seed", str(args.seed)],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_ready(f"http://127.0.0.1:{port}", sim)
+        env = {
+            **os.environ,
+            **sim_env("127.0.0.1", port, ws_port),
+            "STORE_PATH": "",
+            "METRICS_PORT": "0",
+            "ROTATION_SEC": "0",
+            "FEED_RECORD_DIR": "",
+            "LATENCY_REPORT_SEC": "0",
+            "LATENCY_DUMP_DIR": str(tmp),
+        }
+        sim_cpu0, t0 = cpu_sec(sim.pid), time.perf_counter()
+        proc = subprocess.run(
+            [sys.executable, __file__, "--worker", str(n), "--warmup", str(args.warmup),
+             "--duration", str(args.duration), "--log-file", str(tmp / f"bot-{n}.jsonl")],
+            env=env, capture_output=True, text=True, timeout=args.warmup + args.duration + 300,
+        )
+        sim_cores = (cpu_sec(sim.pid) - sim_cpu0) / (time.perf_counter() - t0)
+        lines = [l for l in proc.stdout.splitlines() if l.startswith(RESULT_PREFIX)]
+        if proc.returncode != 0 or not lines:
+            raise RuntimeError(f"worker for {n} markets failed ({proc.returncode}):\n{proc.stderr[-2000:]}")
+        result = json.loads(lines[-1][len(RESULT_PREFIX):])
+        stats = json.loads(urllib.request.urlopen(f"http://127.0.0.1:{port}/sim/stats", timeout=5).read())
+        result["sim"] = {
+            "cpu_cores": round(sim_cores, 3),
+            "flow_events": stats["flow_events"],
+            "frames_sent": stats["frames_sent"],
+            "trades": stats["trades"],
+        }
+        return result
+    finally:
+        sim.terminate()
+        sim.wait(10)
+
+
+def add_marginals(results: list[dict]) -> None:
+    """
+    Per-market CPU and memory between consecutive sizes. The absolute
+    per-market figures include the bot's fixed cost (threads, pools,
+    caches), which dominates at small sizes.
+    """
+    prev = None
+    for r in sorted(results, key=lambda r: r["markets"]):
+        if prev is not None and r["markets"] > prev["markets"]:
+            dn = r["markets"] - prev["markets"]
+            r["marginal"] = {
+                "from_markets": prev["markets"],
+                "cpu_pct_per_market": round(100.0 * (r["cpu_cores"] - prev["cpu_cores"]) / dn, 4),
+                "rss_kb_per_market": round((r["rss_mb"] - prev["rss_mb"]) * 1024 / dn, 1),
+            }
+        prev = r
+
+
+def flat(d: dict, prefix: str = "") -> dict:
+    out = {}
+    for k, v in d.items():
+        if isinstance(v, dict):
+            out.update(flat(v, f"{prefix}{k}."))
+        else:
+            out[f"{prefix}{k}"] = v
+    return out
+
+
+def compare(results: list[dict], baseline: dict, tolerance: float) -> list[str]:
+    """Regressions of this run against a baseline, as report lines."""
+    base = {r["markets"]: flat(r) for r in baseline.get("results", [])}
+    bad = []
+    for r in results:
+        old = base.get(r["markets"])
+        if old is None:
+            continue
+        new = flat(r)
+        for key, floor in REGRESSION_FLOORS.items():
+            a, b = old.get(key), new.get(key)
+            if a is None or b is None:
+                continue
+            if b > a * (1 + tolerance) and b - a > floor:
+                bad.append(f"{r['markets']:>5} markets  {key}: {a} -> {b}")
+    return bad
+
+
+def report(results: list[dict]) -> None:
+    print(f"{'markets':>7} {'lag p50':>8} {'lag p99':>8} {'lag max':>8} {'rq p50':>8} {'rq p99':>8} "
+          f"{'rq/s':>7} {'frames/s':>9} {'cores':>6} {'%core/mkt':>9} {'KB/mkt':>8} "
+          f"{'marg %core':>10} {'marg KB':>8} {'sim cores':>9}")
+    for r in results:
+        lag, rq = r["loop_lag_ms"], r["requote_ms"]
+        marg = r.get("marginal", {})
+        print(
+            f"{r['markets']:>7} {lag['p50']:>8} {lag['p99']:>8} {lag['max']:>8} "
+            f"{rq['p50'] if rq['n'] else '-':>8} {rq['p99'] if rq['n'] else '-':>8} "
+            f"{r['requotes_per_sec']:>7} {r['ws_frames_per_sec']:>9} {r['cpu_cores']:>6} "
+            f"{r['cpu_pct_per_market']:>9} {r['rss_kb_per_market']:>8} "
+            f"{marg.get('cpu_pct_per_market', '-'):>10} {marg.get('rss_kb_per_market', '-'):>8} "
+            f"{r['sim']['cpu_cores']:>9}"
+        )
+    print("(latencies in ms; rq = MarketLoop._requote; marg = per market added since the previous size)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PolyMakerBot scaling by market count against simexchange.py")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    parser.add_argument("--warmup", type=float, default=30.0, help="Seconds from start to the measurement window")
+    parser.add_argument("--duration", type=float, default=60.0, help="Measurement window, seconds")
+    parser.add_argument("--flow-rate", type=float, default=2.0, help="Synthetic orders/sec per simulated market")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--out", type=Path, default=DEFAULT_OUT, help="Where to write the JSON results")
+    parser.add_argument("--compare", type=Path, help="Baseline JSON to check this run against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative worsening for --compare")
+    parser.add_argument("--worker", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--log-file", default="", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(args)
+        return
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in args.sizes:
+            print(f"{n} markets: {args.warmup:.0f}s warm-up + {args.duration:.0f}s window ...", flush=True)
+            results.append(run_size(n, args, Path(tmp)))
+
+    add_marginals(results)
+    report(results)
+    doc = {
+        "created": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "machine": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "settings": {
+            "warmup_sec": args.warmup,
+            "duration_sec": args.duration,
+            "flow_rate": args.flow_rate,
+            "seed": args.seed,
+            "lag_interval_sec": LAG_INTERVAL,
+        },
+        "results": results,
+    }
+    args.out.parent.mkdir(parents=True, exist_ok=True)
+    args.out.write_text(json.dumps(doc, indent=2) + "\n")
+    print(f"Results written to {args.out}")
+
+    if args.compare:
+        bad = compare(results, json.loads(args.compare.read_text()), args.tolerance)
+        if bad:
+            print(f"Regressions against {args.compare} (tolerance {args.tolerance:.0%}):")
+            for line in bad:
+                print("  " + line)
+            sys.exit(1)
+        print(f"No regressions against {args.compare}")
+
+
+if __name__ == "__main__":
+    main()
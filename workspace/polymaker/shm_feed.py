@@ -0,0 +1,827 @@
+"""
+shm_feed.py — MarketFeed in a dedicated process, shared-memory state table
+===========================================================================
+Runs the WebSocket feed (decode, books, resync, recording) in a child
+process so a burst of `price_change` frames never competes with quoting
+for the bot's event loop. The child publishes into two shared-memory
+segments that the bot reads without copying or locking:
+
+  state table   one fixed-size row per token, guarded by a seqlock:
+                  ver | seq mid best_bid best_ask bid_size ask_size
+                      updated_at pub_ns pub_recv_ns state gen
+                The child is the only writer. It bumps `ver` to odd, writes
+                the body, bumps it back to even; readers retry on an odd or
+                changed `ver`. `seq` is MarketFeed's TokenSlot.seq.
+                `gen` is bumped whenever a row is reassigned, so a reader
+                never mistakes a previous token's data (or seq) for a new
+                one. A restarted feed process carries each row's seq on
+                rather than restarting it at 0.
+                `state` is the token's freshness (FRESH/SILENT/STALE), which
+                the child re-evaluates every second; the header carries a
+                heartbeat so a hung feed process reads as STALE too.
+
+  fill ring     fixed-size fill records plus a monotonically increasing
+                head counter. The reader keeps its own tail; records
+                overwritten before they were read are counted as lost
+                (REST reconciliation picks those fills up).
+
+Wakeups: the child writes the row index of every published token to a
+pipe (non-blocking; if the pipe is full it raises an overflow flag in the
+table header instead). The bot's loop watches the pipe with add_reader and
+resolves waiters whose row seq has moved.
+
+SharedMemoryFeed exposes the MarketFeed interface MarketLoop uses:
+wait_for_update, get_slot, get_mid, is_stale, freshness, get_book,
+get_fills, subscribe, unsubscribe. get_book() returns a top-of-book view; the full L2
+book stays in the child.
+
+Enable with FEED_PROCESS=1.
+"""
+
+import asyncio
+import logging
+import math
+import multiprocessing as mp
+import os
+import queue
+import signal
+import struct
+import time
+from array import array
+from dataclasses import dataclass
+from multiprocessing.shared_memory import SharedMemory
+from typing import Optional
+
+from logsetup import setup_logging, stop_logging
+from orderbook import BookDepth
+from ws_decode import UserTradeEvent
+from ws_feed import (
+    FEED_STALE_SEC,
+    FRESH,
+    RECONNECT_BASE,
+    RECONNECT_MAX,
+    SILENT,
+    STALE,
+    FillUpdate,
+    MarketFeed,
+    _resolve,
+)
+
+logger = logging.getLogger("polymaker.shm_feed")
+
+SHM_FEED_CAPACITY = int(os.getenv("SHM_FEED_CAPACITY", "4096"))  # token rows
+SHM_FILL_RING = int(os.getenv("SHM_FILL_RING", "4096"))          # fill records
+PIPE_CHUNK = 4096        # <= PIPE_BUF, so each notify write is atomic
+PARENT_CHECK_SEC = 1.0   # child exits if the bot process disappears
+TICK_SEC = 1.0           # child heartbeat + freshness re-evaluation
+
+_MAGIC = 0x504D4B54  # "PMKT"
+_HEADER = struct.Struct("<II")   # magic, capacity
+_HEADER_SIZE = 64
+_OVERFLOW_OFF = 8                # u8: notify pipe overflowed, reader must rescan
+_HEARTBEAT = struct.Struct("<d")
+_HEARTBEAT_OFF = 16              # f64: feed process wall clock, written every TICK_SEC
+
+_VER = struct.Struct("<Q")
+_SEQ = struct.Struct("<Q")
+_BODY = struct.Struct("<QddddddQQB3xI")
+_ROW_SIZE = _VER.size + _BODY.size
+_GEN = struct.Struct("<I")
+_GEN_OFF = _VER.size + _BODY.size - _GEN.size
+
+_RING_HEAD = struct.Struct("<Q")
+_FILL = struct.Struct("<IB3xddd72s")  # row, side (0=BUY, 1=SELL), price, size, ts, trade_id
+
+_NAN = math.nan
+_STATE_CODES = {FRESH: 0, SILENT: 1, STALE: 2}
+_STATE_NAMES = {v: k for k, v in _STATE_CODES.items()}
+
+
+def _opt(x: float) -> Optional[float]:
+    return None if x != x else x
+
+
+def _attach(name: str) -> SharedMemory:
+    """
+    Attach to a segment the bot process owns. Spawned children share the
+    parent's resource tracker, so the duplicate registration on older
+    Pythons is harmless; the bot unlinks the segment on stop().
+    """
+    try:
+        return SharedMemory(name=name, track=False)  # Python 3.13+
+    except TypeError:
+        return SharedMemory(name=name)
+
+
+# ── Shared layouts ────────────────────────────────────────────────────────────
+
+@dataclass
+class SlotView:
+    """Consistent copy of one state-table row (mirrors ws_feed.TokenSlot)."""
+    token_id: str
+    seq: int
+    mid: Optional[float]
+    best_bid: Optional[float]
+    best_ask: Optional[float]
+    bid_size: float
+    ask_size: float
+    updated_at: float
+    pub_ns: int
+    pub_recv_ns: int
+    stale: bool      # not in sync (same meaning as TokenSlot.stale)
+    freshness: str   # FRESH / SILENT / STALE
+
+
+class StateTable:
+    """Seqlock-guarded token rows in a shared-memory segment."""
+
+    def __init__(self, shm: SharedMemory, capacity: int):
+        self.shm = shm
+        self.capacity = capacity
+        self._buf = shm.buf
+        self._vers = [0] * capacity  # writer-side copy of each row's version
+
+    @classmethod
+    def create(cls, capacity: int) -> "StateTable":
+        shm = SharedMemory(create=True, size=_HEADER_SIZE + capacity * _ROW_SIZE)  # zero-filled
+        _HEADER.pack_into(shm.buf, 0, _MAGIC, capacity)
+        return cls(shm, capacity)
+
+    @classmethod
+    def attach(cls, name: str) -> "StateTable":
+        shm = _attach(name)
+        magic, capacity = _HEADER.unpack_from(shm.buf, 0)
+        if magic != _MAGIC:
+            raise RuntimeError(f"shared memory {name} is not a feed state table")
+        table = cls(shm, capacity)
+        # A restarted feed process continues each row's version from where the last one left it
+        table._vers = [
+            (_VER.unpack_from(shm.buf, _HEADER_SIZE + r * _ROW_SIZE)[0] + 1) & ~1 for r in range(capacity)
+        ]
+        return table
+
+    # Writer (feed process)
+
+    def write(
+        self, row: int, gen: int, seq: int, mid, best_bid, best_ask,
+        bid_size: float, ask_size: float, updated_at: float,
+        pub_ns: int, pub_recv_ns: int, state: int,
+    ) -> None:
+        off = _HEADER_SIZE + row * _ROW_SIZE
+        ver = self._vers[row] + 1
+        _VER.pack_into(self._buf, off, ver)  # odd: write in progress
+        _BODY.pack_into(
+            self._buf, off + _VER.size, seq,
+            _NAN if mid is None else mid,
+            _NAN if best_bid is None else best_bid,
+            _NAN if best_ask is None else best_ask,
+            bid_size, ask_size, updated_at, pub_ns, pub_recv_ns, state, gen,
+        )
+        self._vers[row] = ver + 1
+        _VER.pack_into(self._buf, off, ver + 1)
+
+    def set_overflow(self) -> None:
+        self._buf[_OVERFLOW_OFF] = 1
+
+    def beat(self) -> None:
+        _HEARTBEAT.pack_into(self._buf, _HEARTBEAT_OFF, time.time())
+
+    # Reader (bot process)
+
+    def read(self, row: int) -> Optional[tuple]:
+        """Consistent row body, or None if the writer kept it busy."""
+        off = _HEADER_SIZE + row * _ROW_SIZE
+        buf = self._buf
+        for _ in range(64):
+            v1 = _VER.unpack_from(buf, off)[0]
+            if v1 & 1:
+                continue
+            body = _BODY.unpack_from(buf, off + _VER.size)
+            if _VER.unpack_from(buf, off)[0] == v1:
+                return body
+        return None
+
+    def seq(self, row: int, gen: int) -> int:
+        """Publish sequence of the row if `gen` owns it, else 0 (a previous token's data)."""
+        off = _HEADER_SIZE + row * _ROW_SIZE
+        buf = self._buf
+        for _ in range(64):
+            v1 = _VER.unpack_from(buf, off)[0]
+            if v1 & 1:
+                continue
+            seq = _SEQ.unpack_from(buf, off + _VER.size)[0]
+            owner = _GEN.unpack_from(buf, off + _GEN_OFF)[0]
+            if _VER.unpack_from(buf, off)[0] == v1:
+                return seq if owner == gen else 0
+        return 0
+
+    def heartbeat(self) -> float:
+        return _HEARTBEAT.unpack_from(self._buf, _HEARTBEAT_OFF)[0]
+
+    def take_overflow(self) -> bool:
+        if self._buf[_OVERFLOW_OFF]:
+            self._buf[_OVERFLOW_OFF] = 0
+            return True
+        return False
+
+    def close(self) -> None:
+        self._buf = None
+        self.shm.close()
+
+
+class FillRing:
+    """Single-producer ring of fill records in a shared-memory segment."""
+
+    def __init__(self, shm: SharedMemory, capacity: int):
+        self.shm = shm
+        self.capacity = capacity
+        self._buf = shm.buf
+        self._head = _RING_HEAD.unpack_from(self._buf, 0)[0]
+
+    @classmethod
+    def create(cls, capacity: int) -> "FillRing":
+        shm = SharedMemory(create=True, size=_HEADER_SIZE + capacity * _FILL.size)
+        return cls(shm, capacity)
+
+    @classmethod
+    def attach(cls, name: str, capacity: int) -> "FillRing":
+        return cls(_attach(name), capacity)
+
+    def head(self) -> int:
+        return _RING_HEAD.unpack_from(self._buf, 0)[0]
+
+    def push(self, row: int, side: str, price: float, size: float, ts: float, trade_id: str) -> None:
+        off = _HEADER_SIZE + (self._head % self.capacity) * _FILL.size
+        _FILL.pack_into(
+            self._buf, off, row, 0 if side == "BUY" else 1,
+            price, size, ts, trade_id.encode()[:72],
+        )
+        self._head += 1
+        _RING_HEAD.pack_into(self._buf, 0, self._head)
+
+    def read_from(self, tail: int) -> tuple[list[tuple], int, int]:
+        """Records in [tail, head). Returns (records, new_tail, lost)."""
+        head = self.head()
+        lost = 0
+        if head - tail > self.capacity:
+            lost = head - tail - self.capacity
+            tail = head - self.capacity
+        out = []
+        for i in range(tail, head):
+            rec = _FILL.unpack_from(self._buf, _HEADER_SIZE + (i % self.capacity) * _FILL.size)
+            if self.head() - i > self.capacity:
+                lost += 1  # overwritten while we were reading it
+                continue
+            out.append(rec)
+        return out, head, lost
+
+    def close(self) -> None:
+        self._buf = None
+        self.shm.close()
+
+
+class TopOfBook:
+    """Read-through top-of-book view of a state-table row (no copy of the L2 book)."""
+
+    def __init__(self, table: StateTable, row: int):
+        self._table = table
+        self._row = row
+
+    def _top(self):
+        body = self._table.read(self._row)
+        if body is None:
+            return None, None, 0.0, 0.0
+        return _opt(body[2]), _opt(body[3]), body[4], body[5]
+
+    def best_bid(self) -> Optional[float]:
+        return self._top()[0]
+
+    def best_ask(self) -> Optional[float]:
+        return self._top()[1]
+
+    def mid(self) -> Optional[float]:
+        b, a, _, _ = self._top()
+        if b is None or a is None:
+            return None
+        return (b + a) / 2.0
+
+    def spread(self) -> Optional[float]:
+        b, a, _, _ = self._top()
+        if b is None or a is None:
+            return None
+        return a - b
+
+    def microprice(self) -> Optional[float]:
+        b, a, bs, as_ = self._top()
+        if b is None or a is None:
+            return None
+        total = bs + as_
+        if total <= 0:
+            return (b + a) / 2.0
+        return (b * as_ + a * bs) / total
+
+    def depth(self, n: int = 5) -> BookDepth:
+        """Only the best level per side is shared."""
+        b, a, bs, as_ = self._top()
+        return BookDepth(
+            bids=[(b, bs)] if b is not None and n > 0 else [],
+            asks=[(a, as_)] if a is not None and n > 0 else [],
+        )
+
+    def is_crossed(self) -> bool:
+        b, a, _, _ = self._top()
+        return b is not None and a is not None and b >= a
+
+
+# ── Feed process side ─────────────────────────────────────────────────────────
+
+class _TableWriterFeed(MarketFeed):
+    """MarketFeed that mirrors every slot change into the shared state table."""
+
+    def __init__(self, table: StateTable, ring: FillRing, notify_fd: int,
+                 rows: dict[str, tuple[int, int]], **kwargs):
+        self._table = table
+        self._ring = ring
+        self._notify_fd = notify_fd
+        self._rows = rows  # token_id -> (row, gen)
+        self._notify_rows: list[int] = []
+        self._states: dict[str, int] = {}  # freshness code last written per token
+        super().__init__(**kwargs)
+
+    def resume_seq(self, token_id: str) -> None:
+        """Continue a token's seq from its row, so loops holding the old one still wake."""
+        rg = self._rows.get(token_id)
+        slot = self._slots.get(token_id)
+        if rg is not None and slot is not None:
+            slot.seq = max(slot.seq, self._table.seq(rg[0], rg[1]))
+
+    def write_row(self, token_id: str) -> None:
+        rg = self._rows.get(token_id)
+        slot = self._slots.get(token_id)
+        if rg is None or slot is None:
+            return
+        b, a = slot.book.bids.best(), slot.book.asks.best()
+        state = self._states[token_id] = _STATE_CODES[self.freshness(token_id)]
+        self._table.write(
+            rg[0], rg[1], slot.seq, slot.mid,
+            b[0] if b else None, a[0] if a else None,
+            b[1] if b else 0.0, a[1] if a else 0.0,
+            slot.updated_at, slot.pub_ns, slot.pub_recv_ns, state,
+        )
+
+    async def tick(self) -> None:
+        """Heartbeat, and rewrite rows whose freshness changed with the passage of time."""
+        while True:
+            self._table.beat()
+            now = time.time()
+            for tid in list(self._rows):
+                if _STATE_CODES[self.freshness(tid, now)] != self._states.get(tid):
+                    self.write_row(tid)
+            await asyncio.sleep(TICK_SEC)
+
+    def _update_mid(self, token_id: str, new_mid: float, force: bool = False):
+        slot = self._slots.get(token_id)
+        if slot is None:
+            return
+        before = slot.seq
+        super()._update_mid(token_id, new_mid, force)
+        self.write_row(token_id)
+        if slot.seq != before:
+            self._notify(token_id)
+
+    def _mark_stale(self, token_ids):
+        super()._mark_stale(token_ids)
+        for tid in token_ids:
+            self.write_row(tid)
+
+    def _mark_synced(self, token_id: str):
+        super()._mark_synced(token_id)
+        self.write_row(token_id)
+
+    def _process_fill(self, ev: UserTradeEvent):
+        if ev.status not in ("MATCHED", "CONFIRMED", "MINED"):
+            return
+        rg = self._rows.get(ev.asset_id)
+        if rg is None:
+            return
+        self._ring.push(rg[0], ev.side, ev.price, ev.size, ev.timestamp or time.time(), ev.trade_id)
+        logger.info(
+            f"Fill (WS): {ev.side} {ev.size:.1f}@{ev.price:.3f} token={ev.asset_id[:16]}..."
+        )
+
+    def _notify(self, token_id: str) -> None:
+        if not self._notify_rows:
+            asyncio.get_running_loop().call_soon(self._flush_notify)
+        self._notify_rows.append(self._rows[token_id][0])
+
+    def _flush_notify(self) -> None:
+        data = array("I", dict.fromkeys(self._notify_rows)).tobytes()
+        self._notify_rows = []
+        for i in range(0, len(data), PIPE_CHUNK):
+            try:
+                os.write(self._notify_fd, data[i:i + PIPE_CHUNK])
+            except BlockingIOError:
+                self._table.set_overflow()  # reader rescans every waiter
+                return
+            except BrokenPipeError:
+                return  # bot stopped reading; "stop" or the parent check ends us
+
+
+def _feed_process_main(cfg: dict, notify_conn, cmd_q) -> None:
+    """Entry point of the feed process."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # the bot sends "stop"
+    listener = None
+    if not logging.getLogger().handlers:
+        listener = setup_logging(log_file=cfg.get("log_file", ""))
+    try:
+        asyncio.run(_feed_process(cfg, notify_conn, cmd_q))
+    finally:
+        stop_logging(listener)  # multiprocessing skips atexit in the child
+
+
+async def _feed_process(cfg: dict, notify_conn, cmd_q) -> None:
+    table = StateTable.attach(cfg["table"])
+    ring = FillRing.attach(cfg["ring"], cfg["ring_capacity"])
+    notify_fd = notify_conn.fileno()
+    os.set_blocking(notify_fd, False)
+
+    snapshot_fn = None
+    if cfg["clob_host"]:
+        # Book snapshots are public: no login, and the same host the bot trades on (live or sim)
+        from py_clob_client.client import ClobClient
+        from py_clob_client.clob_types import BookParams
+        client = ClobClient(cfg["clob_host"])
+        snapshot_fn = lambda ids: client.get_order_books([BookParams(token_id=t) for t in ids])  # noqa: E731
+
+    recorder = None
+    if cfg["record_dir"]:
+        from recorder import FeedRecorder
+        recorder = FeedRecorder(cfg["record_dir"])
+        if cfg["record_meta"]:
+            recorder.record_meta(cfg["record_meta"])
+
+    latency = None
+    if cfg["latency"]:
+        from latency import LatencyTracker
+        latency = LatencyTracker()
+
+    rows = {tid: (row, gen) for tid, row, gen in cfg["rows"]}
+    feed = _TableWriterFeed(
+        table, ring, notify_fd, rows,
+        api_creds=cfg["api_creds"],
+        token_ids=list(rows),
+        condition_ids=cfg["condition_ids"],
+        mid_threshold=cfg["mid_threshold"],
+        recorder=recorder,
+        snapshot_fn=snapshot_fn,
+        latency=latency,
+    )
+    for tid in rows:
+        feed.resume_seq(tid)  # rows from a previous feed process keep counting up
+        feed.write_row(tid)
+    await feed.run()
+    ticker = asyncio.create_task(feed.tick())
+
+    parent = os.getppid()
+    last_report = time.time()
+    try:
+        while True:
+            try:
+                cmd = await asyncio.to_thread(cmd_q.get, True, PARENT_CHECK_SEC)
+            except queue.Empty:
+                if os.getppid() != parent:
+                    logger.error("Bot process gone — feed process exiting")
+                    return
+                report_sec = cfg["latency_report_sec"]
+                if latency is not None and report_sec > 0 and time.time() - last_report >= report_sec:
+                    latency.log_summary()
+                    last_report = time.time()
+                continue
+
+            op = cmd[0]
+            if op == "stop":
+                return
+            if op == "sub":
+                for tid, row, gen in cmd[1]:
+                    rows[tid] = (row, gen)
+                await feed.subscribe([t for t, _, _ in cmd[1]], cmd[2])
+                for tid, _, _ in cmd[1]:
+                    feed.write_row(tid)
+            elif op == "unsub":
+                await feed.unsubscribe(cmd[1], cmd[2])
+                for tid in cmd[1]:
+                    rows.pop(tid, None)
+                    feed._states.pop(tid, None)
+    finally:
+        ticker.cancel()
+        await feed.stop()
+        if recorder is not None:
+            recorder.close()
+        if latency is not None:
+            latency.log_summary()
+        table.close()
+        ring.close()
+
+
+# ── Bot process side ──────────────────────────────────────────────────────────
+
+class SharedMemoryFeed:
+    """
+    Drop-in for MarketFeed (as MarketLoop uses it) backed by a feed process.
+    The process is restarted with backoff if it dies; until it is back,
+    every token reads as stale and MarketLoop falls back to REST.
+    """
+
+    def __init__(
+        self,
+        api_creds: dict,
+        token_ids: list[str],
+        condition_ids: list[str],
+        mid_threshold: float = 0.005,
+        capacity: int = SHM_FEED_CAPACITY,
+        ring_capacity: int = SHM_FILL_RING,
+        record_dir: str = "",
+        record_meta: Optional[dict] = None,
+        latency=None,
+        latency_report_sec: float = 60.0,
+        clob_host: str = "",
+        log_file: str = "",
+    ):
+        self._api_creds = api_creds
+        self._condition_ids = list(dict.fromkeys(condition_ids))
+        self._mid_threshold = mid_threshold
+        self._record_dir = record_dir
+        self._record_meta = record_meta
+        self._latency = latency is not None  # the child stamps publishes for the bot's tracker
+        self._latency_report_sec = latency_report_sec
+        self._clob_host = clob_host  # the bot client's host, for REST resync snapshots; empty disables
+        self._log_file = log_file  # the child's own JSONL log (logsetup.LOG_FILE format)
+
+        self._table = StateTable.create(capacity)
+        self._ring = FillRing.create(ring_capacity)
+        self._ring_tail = 0
+
+        self._rows: dict[str, int] = {}
+        self._row_token: dict[int, str] = {}
+        self._gens = [0] * capacity
+        self._free = list(range(capacity - 1, -1, -1))
+        self._waiters: dict[int, list[tuple[int, asyncio.Future]]] = {}
+        self._fills: dict[str, list[FillUpdate]] = {}
+        self.fills_lost = 0
+
+        self._ctx = mp.get_context("spawn")
+        self._proc = None
+        self._cmd_q = None
+        self._notify_r = None
+        self._alive = False
+        self._running = False
+        self._restart_task: Optional[asyncio.Task] = None
+        self._backoff = RECONNECT_BASE
+
+        self._alloc(list(dict.fromkeys(token_ids)))
+
+    # ── Lifecycle ────────────────────────────────────────────────────────────
+
+    async def run(self):
+        self._running = True
+        self._start_process()
+
+    async def stop(self):
+        self._running = False
+        if self._restart_task:
+            self._restart_task.cancel()
+        self._stop_reader()
+        if self._proc is not None and self._proc.is_alive():
+            self._cmd_q.put(("stop",))
+            await asyncio.to_thread(self._proc.join, 10)
+            if self._proc.is_alive():
+                self._proc.terminate()
+        for futs in self._waiters.values():
+            for _, fut in futs:
+                _resolve(fut)
+        self._waiters.clear()
+        for seg in (self._table, self._ring):
+            shm = seg.shm
+            seg.close()
+            shm.unlink()
+        logger.info("Feed process stopped")
+
+    def _start_process(self):
+        r, w = self._ctx.Pipe(duplex=False)
+        self._cmd_q = self._ctx.Queue()
+        cfg = {
+            "table": self._table.shm.name,
+            "ring": self._ring.shm.name,
+            "ring_capacity": self._ring.capacity,
+            "rows": [(tid, row, self._gens[row]) for tid, row in self._rows.items()],
+            "api_creds": self._api_creds,
+            "condition_ids": list(self._condition_ids),
+            "mid_threshold": self._mid_threshold,
+            "record_dir": self._record_dir,
+            "record_meta": self._record_meta,
+            "latency": self._latency,
+            "latency_report_sec": self._latency_report_sec,
+            "clob_host": self._clob_host,
+            "log_file": self._log_file,
+        }
+        self._proc = self._ctx.Process(
+            target=_feed_process_main, args=(cfg, w, self._cmd_q), name="polymaker-feed", daemon=True,
+        )
+        self._proc.start()
+        w.close()  # the child holds the only write end, so its exit reads as EOF
+        self._notify_r = r
+        os.set_blocking(r.fileno(), False)
+        asyncio.get_running_loop().add_reader(r.fileno(), self._on_notify)
+        self._alive = True
+        self._started_at = time.time()
+        logger.info(
+            f"Feed process started (pid={self._proc.pid}) — {len(self._rows)} tokens, "
+            f"{len(self._condition_ids)} conditions"
+        )
+
+    def _stop_reader(self):
+        if self._notify_r is not None:
+            try:
+                asyncio.get_running_loop().remove_reader(self._notify_r.fileno())
+            except (ValueError, OSError):
+                pass
+            self._notify_r.close()
+            self._notify_r = None
+        self._alive = False
+
+    async def _restart(self, delay: float):
+        await asyncio.sleep(delay)
+        if self._running:
+            self._start_process()
+
+    # ── Wakeups ──────────────────────────────────────────────────────────────
+
+    def _on_notify(self):
+        try:
+            data = os.read(self._notify_r.fileno(), 65536)
+        except BlockingIOError:
+            return
+        if not data:
+            self._on_process_exit()
+            return
+
+        rows = set(memoryview(data[: len(data) - len(data) % 4]).cast("I"))
+        if self._table.take_overflow():
+            rows = set(self._waiters)
+        for row in rows:
+            futs = self._waiters.get(row)
+            if not futs:
+                continue
+            seq = self._table.seq(row, self._gens[row])
+            keep = []
+            for after, fut in futs:
+                if seq > after:
+                    _resolve(fut)
+                else:
+                    keep.append((after, fut))
+            if keep:
+                self._waiters[row] = keep
+            else:
+                del self._waiters[row]
+
+    def _on_process_exit(self):
+        code = self._proc.exitcode if self._proc is not None else None
+        self._stop_reader()
+        if not self._running:
+            return
+        if time.time() - self._started_at > RECONNECT_MAX:
+            self._backoff = RECONNECT_BASE
+        logger.error(f"Feed process exited (code={code}) — restarting in {self._backoff:.0f}s")
+        self._restart_task = asyncio.create_task(self._restart(self._backoff))
+        self._backoff = min(self._backoff * 2, RECONNECT_MAX)
+
+    async def wait_for_update(self, token_id: str, after_seq: int, timeout: float) -> int:
+        row = self._rows.get(token_id)
+        if row is None:
+            await asyncio.sleep(timeout)
+            return after_seq
+        seq = self._table.seq(row, self._gens[row])
+        if seq > after_seq:
+            return seq
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        entry = (after_seq, fut)
+        self._waiters.setdefault(row, []).append(entry)
+        handle = loop.call_later(timeout, _resolve, fut)
+        try:
+            await fut
+        finally:
+            handle.cancel()
+            futs = self._waiters.get(row)
+            if futs and entry in futs:
+                futs.remove(entry)
+                if not futs:
+                    del self._waiters[row]
+        return self._table.seq(row, self._gens[row])
+
+    # ── Accessors ────────────────────────────────────────────────────────────
+
+    def get_slot(self, token_id: str) -> Optional[SlotView]:
+        row = self._rows.get(token_id)
+        if row is None:
+            return None
+        body = self._table.read(row)
+        if body is None or body[10] != self._gens[row]:
+            return None  # row not yet taken over by the feed process
+        seq, mid, bb, ba, bs, as_, upd, pub_ns, pub_recv_ns, state, _ = body
+        if not self._alive or time.time() - self._table.heartbeat() > FEED_STALE_SEC:
+            state = _STATE_CODES[STALE]  # feed process dead or hung
+        return SlotView(
+            token_id, seq, _opt(mid), _opt(bb), _opt(ba), bs, as_, upd,
+            pub_ns, pub_recv_ns, state == _STATE_CODES[STALE], _STATE_NAMES[state],
+        )
+
+    def freshness(self, token_id: str) -> str:
+        slot = self.get_slot(token_id)
+        return slot.freshness if slot is not None else STALE
+
+    def freshness_counts(self) -> dict[str, int]:
+        counts = {FRESH: 0, SILENT: 0, STALE: 0}
+        for tid in self._rows:
+            counts[self.freshness(tid)] += 1
+        return counts
+
+    def get_mid(self, token_id: str) -> Optional[float]:
+        slot = self.get_slot(token_id)
+        if slot is None or slot.freshness != FRESH:
+            return None
+        return slot.mid
+
+    def is_stale(self, token_id: str) -> bool:
+        slot = self.get_slot(token_id)
+        return slot is None or slot.stale
+
+    def get_book(self, token_id: str) -> Optional[TopOfBook]:
+        row = self._rows.get(token_id)
+        return TopOfBook(self._table, row) if row is not None else None
+
+    async def get_fills(self, token_id: str) -> list[FillUpdate]:
+        self._drain_fills()
+        return self._fills.pop(token_id, [])
+
+    def _drain_fills(self):
+        records, self._ring_tail, lost = self._ring.read_from(self._ring_tail)
+        if lost:
+            self.fills_lost += lost
+            logger.warning(f"Fill ring overrun: {lost} fills dropped (REST reconciliation will catch up)")
+        for row, side, price, size, ts, trade_id in records:
+            tid = self._row_token.get(row)
+            if tid is None:
+                continue
+            self._fills.setdefault(tid, []).append(FillUpdate(
+                token_id=tid,
+                trade_id=trade_id.rstrip(b"\0").decode(),
+                side="BUY" if side == 0 else "SELL",
+                price=price,
+                size=size,
+                timestamp=ts,
+            ))
+
+    def shard_stats(self) -> list[dict]:
+        return [{
+            "process": self._proc.pid if self._proc is not None else None,
+            "tokens": len(self._rows),
+            "connected": self._alive,
+            "fills_lost": self.fills_lost,
+        }]
+
+    # ── Live subscription management ─────────────────────────────────────────
+
+    def _alloc(self, token_ids: list[str]) -> list[tuple[str, int, int]]:
+        out = []
+        for tid in token_ids:
+            if tid in self._rows:
+                continue
+            if not self._free:
+                raise RuntimeError(f"shared feed table full ({self._table.capacity} rows)")
+            row = self._free.pop()
+            self._gens[row] += 1
+            self._rows[tid] = row
+            self._row_token[row] = tid
+            out.append((tid, row, self._gens[row]))
+        return out
+
+    async def subscribe(self, token_ids: list[str], condition_ids: list[str] = ()):
+        new = self._alloc(list(dict.fromkeys(token_ids)))
+        new_conds = [c for c in dict.fromkeys(condition_ids) if c not in self._condition_ids]
+        self._condition_ids.extend(new_conds)
+        if (new or new_conds) and self._alive:
+            self._cmd_q.put(("sub", new, new_conds))
+
+    async def unsubscribe(self, token_ids: list[str], condition_ids: list[str] = ()):
+        self._drain_fills()
+        gone = [t for t in dict.fromkeys(token_ids) if t in self._rows]
+        for tid in gone:
+            row = self._rows.pop(tid)
+            self._row_token.pop(row, None)
+            self._fills.pop(tid, None)
+            self._free.append(row)
+        gone_conds = [c for c in condition_ids if c in self._condition_ids]
+        self._condition_ids = [c for c in self._condition_ids if c not in gone_conds]
+        if (gone or gone_conds) and self._alive:
+            self._cmd_q.put(("unsub", gone, gone_conds))
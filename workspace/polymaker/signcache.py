@@ -0,0 +1,112 @@
+"""
+signcache.py — Pre-signed orders for the price levels we're about to quote
+===========================================================================
+client.create_order() does an EIP-712 signature per order, several ms of
+CPU on the quoting path. SignedOrderCache keeps orders signed in advance
+for the SIGN_CACHE_LEVELS ticks either side of each leg's current quote,
+at our standard size, so placing a quote is a lookup plus a POST.
+
+Rules an entry has to follow:
+  - single use: every signed order carries a random salt and the exchange
+    rejects a second post of the same order, so take() removes it
+  - band: when a leg's quote moves, entries outside the new band are dropped
+    (refill() is called after every requote, off the event loop)
+  - age: entries older than SIGN_CACHE_TTL_SEC are dropped, so fee-rate or
+    tick-size changes picked up by the client reach new signatures
+  - nonce: GTC orders are signed with nonce 0 and no expiration; anything
+    that bumps the exchange nonce must call invalidate() with no token
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Callable, Optional
+
+logger = logging.getLogger("polymaker.signcache")
+
+SIGN_CACHE_LEVELS = int(os.getenv("SIGN_CACHE_LEVELS", "3"))  # ticks either side of the quote
+SIGN_CACHE_TTL_SEC = float(os.getenv("SIGN_CACHE_TTL_SEC", "600"))
+
+Key = tuple[str, str, float, float]  # (token_id, side, price, size in shares)
+
+
+class SignedOrderCache:
+    """Single-use pre-signed orders keyed by (token, side, price, size)."""
+
+    def __init__(
+        self,
+        sign_fn: Callable[[str, str, float, float], object],
+        levels: int = SIGN_CACHE_LEVELS,
+        ttl_sec: float = SIGN_CACHE_TTL_SEC,
+    ):
+        self._sign = sign_fn  # (token_id, side, price, size) -> signed order
+        self.levels = max(0, levels)
+        self.ttl_sec = ttl_sec
+        self._entries: dict[Key, tuple[object, float]] = {}  # key -> (signed, signed_at)
+        self._lock = threading.Lock()  # refills run on gateway threads
+        self.hits = 0
+        self.misses = 0
+        self.signed = 0
+
+    def take(self, token_id: str, side: str, price: float, size: float) -> Optional[object]:
+        """Remove and return a pre-signed order for exactly this order, if one is fresh."""
+        with self._lock:
+            entry = self._entries.pop((token_id, side, price, size), None)
+        if entry is not None and time.time() - entry[1] < self.ttl_sec:
+            self.hits += 1
+            return entry[0]
+        self.misses += 1
+        return None
+
+    def refill(self, token_id: str, side: str, levels: list[tuple[float, float]]) -> int:
+        """
+        Make the cache for (token, side) hold exactly `levels` [(price, size)]:
+        drop entries outside them or past their TTL, sign the missing ones.
+        Blocking (signs inline); call from a worker thread. Returns signatures made.
+        """
+        now = time.time()
+        wanted = {(token_id, side, p, s) for p, s in levels}
+        with self._lock:
+            for k in [
+                k for k, (_, at) in self._entries.items()
+                if k[0] == token_id and k[1] == side
+                and (k not in wanted or now - at >= self.ttl_sec)
+            ]:
+                del self._entries[k]
+            missing = [k for k in wanted if k not in self._entries]
+
+        made = 0
+        for key in missing:
+            try:
+                signed = self._sign(*key)
+            except Exception as e:
+                logger.debug("Pre-sign failed for %.16s... @ %s: %s", key[0], key[2], e)
+                continue
+            with self._lock:
+                self._entries[key] = (signed, time.time())
+            made += 1
+        self.signed += made
+        return made
+
+    def invalidate(self, token_id: Optional[str] = None) -> None:
+        """Drop every entry for a token, or everything (e.g. after a nonce change)."""
+        with self._lock:
+            if token_id is None:
+                self._entries.clear()
+            else:
+                for k in [k for k in self._entries if k[0] == token_id]:
+                    del self._entries[k]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+            "signed": self.signed,
+        }
@@ -0,0 +1,867 @@
+"""
+simexchange.py — Local stand-in for the Polymarket CLOB
+========================================================
+A single-process exchange that lets the bot run end to end without money:
+the bot keeps using py_clob_client and `websockets`, only the URLs change.
+
+  REST (SIM_PORT)      the CLOB endpoints the bot calls: POST /order,
+                       POST /orders, DELETE /orders, DELETE /order,
+                       DELETE /cancel-market-orders, DELETE /cancel-all,
+                       GET /data/orders, GET /data/trades, GET /midpoint,
+                       POST /midpoints, GET /book, POST /books, GET
+                       /tick-size, /neg-risk, /fee-rate, /time and the
+                       /auth/api-key + /auth/derive-api-key handshake;
+                       plus a Gamma-style GET /markets for discovery and
+                       GET /sim/stats
+  WS (SIM_WS_PORT)     /ws/market: `book` on subscribe and after each
+                       trade, `price_change` per book update,
+                       `last_trade_price`. /ws/user: `trade` events for
+                       the account's own fills
+  Matching             matching.py, price-time priority per token
+  Synthetic flow       SIM_FLOW_RATE orders per second per market around
+                       a random-walk fair value: passive limit orders,
+                       cancels (SIM_CANCEL_SHARE) and marketable FAK orders
+                       (SIM_TAKER_SHARE) that fill whoever is at the top
+
+Not simulated: signatures (orders are accepted unverified), balances and
+allowances, fees, settlement (trades are final on match), and YES/NO
+complementary matching (see matching.py). Every order is matched on the
+event loop in the order it arrives, so REST latency is the loop's only
+queueing; SIM_LATENCY_MS adds a fixed delay to order entry and cancels.
+
+Usage:
+    python simexchange.py --markets 200
+    # then, in the bot's environment (printed at startup):
+    SIM_EXCHANGE=http://127.0.0.1:8700 GAMMA_API=http://127.0.0.1:8700 \\
+    WS_URL=ws://127.0.0.1:8701/ws/market WS_USER_URL=ws://127.0.0.1:8701/ws/user \\
+    STORE_PATH=state/sim.db python bot.py --markets 200
+
+The bot refuses to run against the simulator with the live STORE_PATH, so
+simulated fills never warm-start a live run.
+"""
+
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import logging
+import math
+import os
+import random
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from urllib.parse import parse_qs, urlsplit
+
+import websockets
+
+from matching import BUY, FAK, FOK, GTC, SELL, MatchingEngine, SubmitResult, to_price
+
+logger = logging.getLogger("polymaker.sim")
+
+SIM_HOST = os.getenv("SIM_HOST", "127.0.0.1")
+SIM_PORT = int(os.getenv("SIM_PORT", "8700"))
+SIM_WS_PORT = int(os.getenv("SIM_WS_PORT", "8701"))
+SIM_MARKETS = int(os.getenv("SIM_MARKETS", "200"))
+SIM_FLOW_RATE = float(os.getenv("SIM_FLOW_RATE", "2.0"))        # synthetic orders/sec per market
+SIM_TAKER_SHARE = float(os.getenv("SIM_TAKER_SHARE", "0.15"))   # of synthetic orders: marketable FAK
+SIM_CANCEL_SHARE = float(os.getenv("SIM_CANCEL_SHARE", "0.35"))  # of synthetic orders: cancel the oldest
+SIM_VOL = float(os.getenv("SIM_VOL", "0.0005"))                  # fair-value stdev per sqrt(second)
+SIM_DEPTH = int(os.getenv("SIM_DEPTH", "5"))                     # starting flow levels per side
+SIM_LATENCY_MS = float(os.getenv("SIM_LATENCY_MS", "0"))         # added to order entry and cancels
+SIM_RATE_LIMIT = float(os.getenv("SIM_RATE_LIMIT", "0"))         # REST requests/sec per API key, 0 = none
+SIM_SEED = int(os.getenv("SIM_SEED", "7"))
+SIM_STORE_PATH = "state/sim.db"  # the bot's STORE_PATH under sim_env(), apart from the live store
+SIM_WS_MAX_QUEUE = 10_000      # frames queued for one socket before it is dropped as a slow consumer
+FLOW_TICK_SEC = 0.05
+FLOW_MAX_RESTING = 40          # synthetic orders resting per token; the oldest is cancelled beyond this
+FLOW = "flow"                  # owner of synthetic orders
+PAGE_SIZE = 500
+END_CURSOR = "LTE="
+
+_REASONS = {200: "OK", 400: "Bad Request", 401: "Unauthorized", 404: "Not Found", 429: "Too Many Requests"}
+
+
+def sim_env(host: str = SIM_HOST, port: int = SIM_PORT, ws_port: int = SIM_WS_PORT) -> dict:
+    """Environment that points bot.py, markets.py and ws_feed.py at a running simulator."""
+    http = f"http://{host}:{port}"
+    return {
+        "SIM_EXCHANGE": http,
+        "GAMMA_API": http,
+        "WS_URL": f"ws://{host}:{ws_port}/ws/market",
+        "WS_USER_URL": f"ws://{host}:{ws_port}/ws/user",
+        "STORE_PATH": SIM_STORE_PATH,
+    }
+
+
+def sim_client(host: str):
+    """A ClobClient for the simulator: throwaway key, API creds from the sim's /auth handshake."""
+    from py_clob_client.client import ClobClient
+
+    client = ClobClient(host, chain_id=137, key="0x" + os.urandom(32).hex())
+    client.set_api_creds(client.create_or_derive_api_creds())
+    return client
+
+
+# ── Markets and accounts ──────────────────────────────────────────────────────
+
+@dataclass
+class SimMarket:
+    index: int
+    question: str
+    condition_id: str
+    token_yes: str
+    token_no: str
+    event_id: str
+    fair: float                  # YES fair value; NO trades around 1 - fair
+    tick: float = 0.01
+    min_size: float = 5.0
+    volume_24h: float = 0.0
+    liquidity: float = 0.0
+    end_date: str = ""
+    moved_at: float = field(default_factory=time.time)
+    flow_orders: dict = field(default_factory=dict)   # token -> deque of synthetic order IDs
+
+
+@dataclass
+class SimAccount:
+    address: str
+    api_key: str
+    secret: str
+    passphrase: str
+    trades: list = field(default_factory=list)
+    user_socks: set = field(default_factory=set)
+    tokens: float = 0.0          # rate-limit bucket
+    refilled_at: float = 0.0
+
+    def creds(self) -> dict:
+        return {"apiKey": self.api_key, "secret": self.secret, "passphrase": self.passphrase}
+
+
+class _Socket:
+    """One WS connection: what it subscribed to and its outgoing queue."""
+
+    def __init__(self, ws, channel: str):
+        self.ws = ws
+        self.channel = channel
+        self.tokens: set[str] = set()
+        self.markets: set[str] = set()       # user channel: condition IDs, empty = all
+        self.account: Optional[SimAccount] = None
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.dropped = False
+
+    def push(self, frame: str) -> None:
+        if self.dropped:
+            return
+        if self.queue.qsize() >= SIM_WS_MAX_QUEUE:
+            self.dropped = True
+            asyncio.get_running_loop().create_task(self.ws.close(1008, "slow consumer"))
+            return
+        self.queue.put_nowait(frame)
+
+
+def _dumps(obj) -> str:
+    return json.dumps(obj, separators=(",", ":"))
+
+
+def _px(ticks: int) -> str:
+    return str(round(to_price(ticks), 4))
+
+
+def _sz(size: float) -> str:
+    return str(round(size, 2))
+
+
+def _ms(ts: float) -> str:
+    return str(int(ts * 1000))
+
+
+def _cursor(offset: int) -> str:
+    return base64.b64encode(str(offset).encode()).decode()
+
+
+def _offset(cursor: str) -> int:
+    try:
+        return max(0, int(base64.b64decode(cursor or "MA==").decode()))
+    except ValueError:
+        return 0
+
+
+# ── Exchange ──────────────────────────────────────────────────────────────────
+
+class SimExchange:
+    """Books, accounts, synthetic flow and the REST/WS front ends around them."""
+
+    def __init__(
+        self,
+        markets: int = SIM_MARKETS,
+        flow_rate: float = SIM_FLOW_RATE,
+        taker_share: float = SIM_TAKER_SHARE,
+        cancel_share: float = SIM_CANCEL_SHARE,
+        vol: float = SIM_VOL,
+        latency_ms: float = SIM_LATENCY_MS,
+        rate_limit: float = SIM_RATE_LIMIT,
+        seed: int = SIM_SEED,
+    ):
+        self.rng = random.Random(seed)
+        self.engine = MatchingEngine()
+        self.flow_rate = flow_rate
+        self.taker_share = taker_share
+        self.cancel_share = cancel_share
+        self.vol = vol
+        self.latency_ms = latency_ms
+        self.rate_limit = rate_limit
+        self.markets: list[SimMarket] = []
+        self._by_token: dict[str, SimMarket] = {}
+        self._accounts: dict[str, SimAccount] = {}        # api_key -> account
+        self._by_address: dict[str, SimAccount] = {}
+        self._market_subs: dict[str, set[_Socket]] = {}   # token -> sockets
+        self._servers: list = []
+        self._flow_task: Optional[asyncio.Task] = None
+        self.http_requests = 0
+        self.rate_limited = 0
+        self.frames_sent = 0
+        self.flow_events = 0
+        for i in range(markets):
+            self._add_market(i)
+
+    def _add_market(self, i: int) -> SimMarket:
+        rng = self.rng
+        m = SimMarket(
+            index=i,
+            question=f"Simulated market #{i}: will it resolve YES?",
+            condition_id="0x" + f"{rng.getrandbits(256):064x}",
+            token_yes=str(rng.getrandbits(252)),
+            token_no=str(rng.getrandbits(252)),
+            event_id=str(1000 + i // 4),      # four markets per event, for the risk engine's grouping
+            fair=rng.uniform(0.2, 0.8),
+            volume_24h=round(rng.lognormvariate(10.5, 1.0), 2) + 5_000,
+            liquidity=round(rng.lognormvariate(9.5, 0.8), 2) + 1_000,
+            end_date=(datetime.now(timezone.utc) + timedelta(days=rng.uniform(5, 120))).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        )
+        self.markets.append(m)
+        for token in (m.token_yes, m.token_no):
+            self.engine.add_book(token)
+            self._by_token[token] = m
+            m.flow_orders[token] = deque()
+        for j in range(SIM_DEPTH):
+            for token in (m.token_yes, m.token_no):
+                self._flow_limit(m, token, BUY, j)
+                self._flow_limit(m, token, SELL, j)
+        for token in (m.token_yes, m.token_no):
+            self.engine.books[token].drain_changes()
+        return m
+
+    # ── Order entry ──────────────────────────────────────────────────────────
+
+    def submit(
+        self, owner: str, token: str, side: str, price: float, size: float,
+        order_type: str = GTC, post_only: bool = False,
+    ) -> SubmitResult:
+        """Match one order and publish what it changed."""
+        res = self.engine.submit(owner, token, side, price, size, order_type, post_only)
+        if res.status != "rejected":
+            self._publish(token, res.fills)
+        return res
+
+    def cancel(self, order_id: str, owner: str) -> bool:
+        o = self.engine.orders.get(order_id)
+        if o is None or not self.engine.cancel(order_id, owner):
+            return False
+        self._publish(o.token_id, ())
+        return True
+
+    # ── Publishing ───────────────────────────────────────────────────────────
+
+    def _book_msg(self, token: str, ts: str) -> dict:
+        book = self.engine.books[token]
+        return {
+            "event_type": "book",
+            "asset_id": token,
+            "market": self._by_token[token].condition_id,
+            "bids": [{"price": _px(p), "size": _sz(s)} for p, s in book.levels(BUY)],
+            "asks": [{"price": _px(p), "size": _sz(s)} for p, s in book.levels(SELL)],
+            "timestamp": ts,
+            "hash": "",
+        }
+
+    def _publish(self, token: str, fills) -> None:
+        book = self.engine.books[token]
+        changes = book.drain_changes()
+        if fills:
+            self._record_fills(token, fills)
+        subs = self._market_subs.get(token)
+        if not subs:
+            return
+        ts = _ms(time.time())
+        m = self._by_token[token]
+        if fills:
+            # A trade: last_trade_price, then the whole book
+            frames = [
+                _dumps({
+                    "event_type": "last_trade_price",
+                    "asset_id": token,
+                    "market": m.condition_id,
+                    "price": _px(fills[-1].price),
+                    "size": _sz(sum(f.size for f in fills)),
+                    "side": fills[-1].taker_side,
+                    "fee_rate_bps": "0",
+                    "timestamp": ts,
+                }),
+                _dumps(self._book_msg(token, ts)),
+            ]
+        elif changes:
+            bb, ba = book.best_bid(), book.best_ask()
+            top = {"best_bid": _px(bb), "best_ask": _px(ba)} if bb is not None and ba is not None else {}
+            frames = [_dumps({
+                "event_type": "price_change",
+                "market": m.condition_id,
+                "price_changes": [
+                    {"asset_id": token, "price": _px(p), "size": _sz(s), "side": side, "hash": "", **top}
+                    for side, p, s in changes
+                ],
+                "timestamp": ts,
+            })]
+        else:
+            return
+        for sock in subs:
+            for f in frames:
+                sock.push(f)
+
+    def _record_fills(self, token: str, fills) -> None:
+        """Book each account's side of its fills and push them on its user sockets."""
+        m = self._by_token[token]
+        outcome = "Yes" if token == m.token_yes else "No"
+        for f in fills:
+            m.volume_24h += f.size * to_price(f.price)
+            for owner, side, role, order_id in (
+                (f.maker.owner, f.maker.side, "MAKER", f.maker.order_id),
+                (f.taker_owner, f.taker_side, "TAKER", f.taker_order_id),
+            ):
+                acct = self._accounts.get(owner)
+                if acct is None:
+                    continue  # synthetic flow
+                trade = {
+                    "id": f.trade_id,
+                    "taker_order_id": f.taker_order_id,
+                    "market": m.condition_id,
+                    "asset_id": token,
+                    "side": side,
+                    "size": _sz(f.size),
+                    "fee_rate_bps": "0",
+                    "price": _px(f.price),
+                    "status": "CONFIRMED",
+                    "match_time": str(int(f.timestamp)),
+                    "last_update": str(int(f.timestamp)),
+                    "outcome": outcome,
+                    "owner": acct.api_key,
+                    "maker_address": acct.address,
+                    "trader_side": role,
+                    "order_id": order_id,
+                    "type": "TRADE",
+                }
+                acct.trades.append(trade)
+                if acct.user_socks:
+                    frame = _dumps({**trade, "event_type": "trade", "status": "MATCHED", "timestamp": _ms(f.timestamp)})
+                    for sock in acct.user_socks:
+                        if not sock.markets or m.condition_id in sock.markets:
+                            sock.push(frame)
+
+    # ── Synthetic flow ───────────────────────────────────────────────────────
+
+    def _move_fair(self, m: SimMarket, now: float) -> None:
+        dt = now - m.moved_at
+        if dt > 0:
+            m.fair = min(0.95, max(0.05, m.fair + self.vol * math.sqrt(dt) * self.rng.gauss(0.0, 1.0)))
+            m.moved_at = now
+
+    def _flow_limit(self, m: SimMarket, token: str, side: str, depth: int) -> None:
+        """A passive synthetic order `depth` ticks behind the tick nearest fair."""
+        fair = m.fair if token == m.token_yes else 1.0 - m.fair
+        t = m.tick
+        if side == BUY:
+            price = t * math.floor((fair - t / 2) / t) - depth * t
+        else:
+            price = t * math.ceil((fair + t / 2) / t) + depth * t
+        price = round(min(1.0 - t, max(t, price)), 4)
+        size = round(self.rng.uniform(m.min_size, 20 * m.min_size), 1)
+        res = self.submit(FLOW, token, side, price, size)
+        if res.status == "live":
+            resting = m.flow_orders[token]
+            resting.append(res.order_id)
+            if len(resting) > FLOW_MAX_RESTING:
+                self.cancel(resting.popleft(), FLOW)
+
+    def flow_event(self, m: SimMarket, now: float) -> None:
+        """One synthetic order on a random side of one of the market's tokens."""
+        rng = self.rng
+        self.flow_events += 1
+        self._move_fair(m, now)
+        token = m.token_yes if rng.random() < 0.5 else m.token_no
+        side = BUY if rng.random() < 0.5 else SELL
+        r = rng.random()
+        if r < self.cancel_share:
+            resting = m.flow_orders[token]
+            while resting and not self.cancel(resting.popleft(), FLOW):
+                pass  # already filled
+        elif r < self.cancel_share + self.taker_share:
+            fair = m.fair if token == m.token_yes else 1.0 - m.fair
+            price = fair + 5 * m.tick if side == BUY else fair - 5 * m.tick
+            price = round(min(1.0 - m.tick, max(m.tick, price)), 4)
+            size = round(rng.uniform(m.min_size, 10 * m.min_size), 1)
+            self.submit(FLOW, token, side, price, size, FAK)
+        else:
+            self._flow_limit(m, token, side, min(int(rng.expovariate(0.7)), 10))
+
+    async def _run_flow(self) -> None:
+        carry = 0.0
+        last = time.monotonic()
+        while True:
+            await asyncio.sleep(FLOW_TICK_SEC)
+            t = time.monotonic()
+            carry += self.flow_rate * len(self.markets) * (t - last)
+            last = t
+            n, carry = int(carry), carry - int(carry)
+            now = time.time()
+            for _ in range(n):
+                self.flow_event(self.rng.choice(self.markets), now)
+
+    # ── Accounts ─────────────────────────────────────────────────────────────
+
+    def _account_for(self, address: str) -> SimAccount:
+        acct = self._by_address.get(address.lower())
+        if acct is None:
+            digest = hashlib.sha256(f"simexchange:{address.lower()}".encode()).digest()
+            acct = SimAccount(
+                address=address,
+                api_key=str(uuid.UUID(bytes=digest[:16])),
+                secret=base64.urlsafe_b64encode(digest).decode(),
+                passphrase=digest[16:].hex(),
+                tokens=self.rate_limit,
+            )
+            self._by_address[address.lower()] = acct
+            self._accounts[acct.api_key] = acct
+        return acct
+
+    def _throttled(self, acct: SimAccount) -> bool:
+        if self.rate_limit <= 0:
+            return False
+        now = time.monotonic()
+        acct.tokens = min(self.rate_limit, acct.tokens + (now - acct.refilled_at) * self.rate_limit)
+        acct.refilled_at = now
+        if acct.tokens < 1.0:
+            self.rate_limited += 1
+            return True
+        acct.tokens -= 1.0
+        return False
+
+    # ── REST ─────────────────────────────────────────────────────────────────
+
+    async def _handle_http(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """HTTP/1.1 with keep-alive: one request at a time per connection."""
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                method, target, _ = line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    h = await reader.readline()
+                    if h in (b"\r\n", b"\n", b""):
+                        break
+                    k, _, v = h.decode("latin-1").partition(":")
+                    headers[k.strip().lower()] = v.strip()
+                n = int(headers.get("content-length") or 0)
+                body = await reader.readexactly(n) if n else b""
+                self.http_requests += 1
+                try:
+                    status, payload = await self._route(method, target, headers, body)
+                except (KeyError, TypeError, ValueError) as e:
+                    status, payload = 400, {"error": f"bad request: {e}"}
+                data = _dumps(payload).encode()
+                writer.write(
+                    f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+                    f"Content-Type: application/json\r\nContent-Length: {len(data)}\r\n\r\n".encode() + data
+                )
+                await writer.drain()
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _route(self, method: str, target: str, headers: dict, body: bytes) -> tuple[int, object]:
+        url = urlsplit(target)
+        path = url.path.rstrip("/") or "/"
+        q = {k: v[0] for k, v in parse_qs(url.query).items()}
+        data = json.loads(body) if body else None
+
+        # Public
+        if method == "GET":
+            if path == "/":
+                return 200, "OK"
+            if path == "/time":
+                return 200, int(time.time())
+            if path == "/markets":
+                return 200, self._gamma_markets(q)
+            if path == "/sim/stats":
+                return 200, self.stats()
+            if path in ("/tick-size", "/neg-risk", "/fee-rate", "/midpoint", "/book"):
+                m = self._by_token.get(q.get("token_id", ""))
+                if m is None:
+                    return 404, {"error": "No orderbook exists for the requested token id"}
+                if path == "/tick-size":
+                    return 200, {"minimum_tick_size": m.tick}
+                if path == "/neg-risk":
+                    return 200, {"neg_risk": False}
+                if path == "/fee-rate":
+                    return 200, {"base_fee": 0}
+                if path == "/book":
+                    return 200, self._book_summary(q["token_id"])
+                mid = self.engine.books[q["token_id"]].mid()
+                if mid is None:
+                    return 404, {"error": "No orderbook exists for the requested token id"}
+                return 200, {"mid": str(round(mid, 4))}
+        if method == "POST" and path == "/midpoints":
+            out = {}
+            for p in data or ():
+                book = self.engine.books.get(p.get("token_id", ""))
+                mid = book.mid() if book is not None else None
+                if mid is not None:
+                    out[p["token_id"]] = str(round(mid, 4))
+            return 200, out
+        if method == "POST" and path == "/books":
+            return 200, [self._book_summary(p["token_id"]) for p in data or () if p.get("token_id") in self._by_token]
+
+        # L1: API key handshake
+        if path in ("/auth/api-key", "/auth/derive-api-key") and method in ("GET", "POST"):
+            address = headers.get("poly_address")
+            if not address:
+                return 401, {"error": "Unauthorized/Invalid api key"}
+            return 200, self._account_for(address).creds()
+
+        # L2: account endpoints
+        acct = self._accounts.get(headers.get("poly_api_key", ""))
+        if acct is None:
+            return 401, {"error": "Unauthorized/Invalid api key"}
+        if self._throttled(acct):
+            return 429, {"error": "Too Many Requests"}
+
+        if path in ("/order", "/orders", "/cancel-market-orders", "/cancel-all") and self.latency_ms > 0:
+            await asyncio.sleep(self.latency_ms / 1000.0)
+
+        if method == "POST" and path == "/order":
+            resp = self._post_order(acct, data)
+            return (200, resp) if resp["success"] else (400, {"error": resp["errorMsg"]})
+        if method == "POST" and path == "/orders":
+            return 200, [self._post_order(acct, o) for o in data or ()]
+        if method == "DELETE" and path == "/order":
+            return 200, self._cancel(acct, [data.get("orderID", "")])
+        if method == "DELETE" and path == "/orders":
+            return 200, self._cancel(acct, list(data or ()))
+        if method == "DELETE" and path == "/cancel-market-orders":
+            token = (data or {}).get("asset_id") or ""
+            market = (data or {}).get("market") or ""
+            ids = [
+                o.order_id for o in self.engine.open_orders(acct.api_key, token)
+                if not market or self._by_token[o.token_id].condition_id == market
+            ]
+            return 200, self._cancel(acct, ids)
+        if method == "DELETE" and path == "/cancel-all":
+            return 200, self._cancel(acct, [o.order_id for o in self.engine.open_orders(acct.api_key)])
+        if method == "GET" and path == "/data/orders":
+            orders = [
+                self._order_json(acct, o) for o in self.engine.open_orders(acct.api_key, q.get("asset_id", ""))
+                if (not q.get("id") or o.order_id == q["id"])
+                and (not q.get("market") or self._by_token[o.token_id].condition_id == q["market"])
+            ]
+            return 200, self._page(orders, q.get("next_cursor", ""))
+        if method == "GET" and path == "/data/trades":
+            after = float(q.get("after") or 0)
+            before = float(q.get("before") or "inf")
+            trades = [
+                t for t in acct.trades
+                if after <= float(t["match_time"]) <= before
+                and (not q.get("asset_id") or t["asset_id"] == q["asset_id"])
+                and (not q.get("market") or t["market"] == q["market"])
+                and (not q.get("id") or t["id"] == q["id"])
+            ]
+            return 200, self._page(trades, q.get("next_cursor", ""))
+        return 404, {"error": f"not found: {method} {path}"}
+
+    def _post_order(self, acct: SimAccount, body: dict) -> dict:
+        order = body["order"]
+        token = str(order["tokenId"])
+        side = str(order["side"]).upper()
+        if side in ("0", "1"):
+            side = BUY if side == "0" else SELL
+        maker_amt, taker_amt = int(order["makerAmount"]), int(order["takerAmount"])
+        m = self._by_token.get(token)
+        if m is None or not maker_amt or not taker_amt:
+            return {"success": False, "errorMsg": "invalid order: unknown token or empty amounts", "orderID": ""}
+        if side == BUY:
+            size, price = taker_amt / 1e6, maker_amt / taker_amt
+        else:
+            size, price = maker_amt / 1e6, taker_amt / maker_amt
+        price = round(round(price / m.tick) * m.tick, 4)
+        if not m.tick <= price <= 1.0 - m.tick:
+            return {"success": False, "errorMsg": f"invalid price ({price}), min: {m.tick} - max: {1 - m.tick}", "orderID": ""}
+        if size < m.min_size:
+            return {"success": False, "errorMsg": f"Size ({size}) lower than the minimum: {m.min_size}", "orderID": ""}
+        order_type = {"GTD": GTC, "FOK": FOK, "FAK": FAK}.get(body.get("orderType", GTC), GTC)
+        res = self.submit(acct.api_key, token, side, price, size, order_type, bool(body.get("postOnly")))
+        if res.status in ("rejected", "unmatched"):
+            return {"success": False, "errorMsg": res.error, "orderID": res.order_id if res.status == "unmatched" else ""}
+        return {
+            "success": True,
+            "errorMsg": "",
+            "orderID": res.order_id,
+            "status": res.status,
+            "transactionsHashes": [],
+            "takingAmount": _sz(sum(f.size for f in res.fills)) if res.fills else "",
+            "makingAmount": "",
+        }
+
+    def _cancel(self, acct: SimAccount, order_ids: list[str]) -> dict:
+        canceled, not_canceled = [], {}
+        for oid in order_ids:
+            if self.cancel(oid, acct.api_key):
+                canceled.append(oid)
+            else:
+                not_canceled[oid] = "order not found or already canceled"
+        return {"canceled": canceled, "not_canceled": not_canceled}
+
+    def _order_json(self, acct: SimAccount, o) -> dict:
+        m = self._by_token[o.token_id]
+        return {
+            "id": o.order_id,
+            "status": "LIVE",
+            "owner": acct.api_key,
+            "maker_address": acct.address,
+            "market": m.condition_id,
+            "asset_id": o.token_id,
+            "side": o.side,
+            "original_size": _sz(o.size),
+            "size_matched": _sz(o.matched),
+            "price": _px(o.price),
+            "outcome": "Yes" if o.token_id == m.token_yes else "No",
+            "expiration": "0",
+            "order_type": GTC,
+            "associate_trades": [],
+            "created_at": int(o.created_at),
+        }
+
+    def _book_summary(self, token: str) -> dict:
+        m = self._by_token[token]
+        book = self.engine.books[token]
+        msg = self._book_msg(token, _ms(time.time()))
+        del msg["event_type"]
+        msg.update({
+            "min_order_size": str(m.min_size),
+            "tick_size": str(m.tick),
+            "neg_risk": False,
+            "last_trade_price": _px(book.last_trade) if book.last_trade is not None else "",
+        })
+        return msg
+
+    @staticmethod
+    def _page(rows: list, cursor: str) -> dict:
+        start = _offset(cursor)
+        page = rows[start:start + PAGE_SIZE]
+        end = start + len(page)
+        return {
+            "data": page,
+            "next_cursor": END_CURSOR if end >= len(rows) else _cursor(end),
+            "limit": PAGE_SIZE,
+            "count": len(page),
+        }
+
+    def _gamma_markets(self, q: dict) -> dict:
+        """Gamma /markets: busiest first, paged by next_cursor (empty on the last page)."""
+        limit = int(q.get("limit") or 100)
+        start = _offset(q.get("next_cursor", ""))
+        ranked = sorted(self.markets, key=lambda m: m.volume_24h, reverse=True)
+        out = []
+        for m in ranked[start:start + limit]:
+            mid = self.engine.books[m.token_yes].mid() or m.fair
+            out.append({
+                "id": str(m.index),
+                "question": m.question,
+                "slug": f"sim-market-{m.index}",
+                "conditionId": m.condition_id,
+                "active": True,
+                "closed": False,
+                "acceptingOrders": True,
+                "liquidityNum": m.liquidity,
+                "volume24hr": round(m.volume_24h, 2),
+                "endDate": m.end_date,
+                "clobTokenIds": json.dumps([m.token_yes, m.token_no]),
+                "outcomes": '["Yes", "No"]',
+                "outcomePrices": json.dumps([str(round(mid, 4)), str(round(1 - mid, 4))]),
+                "events": [{"id": m.event_id, "slug": f"sim-event-{m.event_id}"}],
+                "orderPriceMinTickSize": m.tick,
+                "orderMinSize": m.min_size,
+                "negRisk": False,
+            })
+        end = start + len(out)
+        return {"data": out, "next_cursor": _cursor(end) if end < len(ranked) else ""}
+
+    # ── WebSocket ────────────────────────────────────────────────────────────
+
+    async def _handle_ws(self, ws) -> None:
+        path = ws.request.path.rstrip("/")
+        channel = "user" if path.endswith("/user") else "market"
+        sock = _Socket(ws, channel)
+        sender = asyncio.create_task(self._send_loop(sock))
+        try:
+            async for raw in ws:
+                try:
+                    msg = json.loads(raw)
+                except ValueError:
+                    continue
+                if not isinstance(msg, dict):
+                    continue
+                if channel == "market":
+                    self._on_market_sub(sock, msg)
+                elif not self._on_user_sub(sock, msg):
+                    break
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            sender.cancel()
+            for token in sock.tokens:
+                subs = self._market_subs.get(token)
+                if subs is not None:
+                    subs.discard(sock)
+            if sock.account is not None:
+                sock.account.user_socks.discard(sock)
+
+    async def _send_loop(self, sock: _Socket) -> None:
+        try:
+            while True:
+                frame = await sock.queue.get()
+                await sock.ws.send(frame)
+                self.frames_sent += 1
+        except websockets.ConnectionClosed:
+            pass
+
+    def _on_market_sub(self, sock: _Socket, msg: dict) -> None:
+        tokens = [t for t in msg.get("assets_ids") or () if t in self._by_token]
+        if msg.get("operation") == "unsubscribe":
+            for t in tokens:
+                sock.tokens.discard(t)
+                self._market_subs.get(t, set()).discard(sock)
+            return
+        new = [t for t in tokens if t not in sock.tokens]
+        for t in new:
+            sock.tokens.add(t)
+            self._market_subs.setdefault(t, set()).add(sock)
+        if new:
+            ts = _ms(time.time())
+            sock.push(_dumps([self._book_msg(t, ts) for t in new]))
+
+    def _on_user_sub(self, sock: _Socket, msg: dict) -> bool:
+        if sock.account is None:
+            acct = self._accounts.get((msg.get("auth") or {}).get("apiKey", ""))
+            if acct is None:
+                sock.push(_dumps({"error": "invalid api key"}))
+                return False
+            sock.account = acct
+            acct.user_socks.add(sock)
+        markets = set(msg.get("markets") or ())
+        if msg.get("operation") == "unsubscribe":
+            sock.markets -= markets
+        else:
+            sock.markets |= markets
+        return True
+
+    # ── Lifecycle ────────────────────────────────────────────────────────────
+
+    async def start(self, host: str = SIM_HOST, port: int = SIM_PORT, ws_port: int = SIM_WS_PORT) -> None:
+        self._servers.append(await asyncio.start_server(self._handle_http, host, port))
+        self._servers.append(await websockets.serve(self._handle_ws, host, ws_port, max_queue=None))
+        if self.flow_rate > 0:
+            self._flow_task = asyncio.create_task(self._run_flow())
+        logger.info(
+            f"Simulated exchange: {len(self.markets)} markets, flow {self.flow_rate:g}/s/market, "
+            f"REST http://{host}:{port}, WS ws://{host}:{ws_port}"
+        )
+
+    async def stop(self) -> None:
+        if self._flow_task is not None:
+            self._flow_task.cancel()
+        for s in self._servers:
+            s.close()
+            await s.wait_closed()
+        self._servers.clear()
+
+    def stats(self) -> dict:
+        return {
+            **self.engine.stats(),
+            "markets": len(self.markets),
+            "accounts": len(self._accounts),
+            "flow_events": self.flow_events,
+            "http_requests": self.http_requests,
+            "rate_limited": self.rate_limited,
+            "frames_sent": self.frames_sent,
+            "market_sockets": len({s for subs in self._market_subs.values() for s in subs}),
+        }
+
+
+# ── Entry point ───────────────────────────────────────────────────────────────
+
+async def _serve(args) -> None:
+    sim = SimExchange(
+        markets=args.markets,
+        flow_rate=args.flow_rate,
+        taker_share=args.taker_share,
+        cancel_share=args.cancel_share,
+        vol=args.vol,
+        latency_ms=args.latency_ms,
+        rate_limit=args.rate_limit,
+        seed=args.seed,
+    )
+    await sim.start(args.host, args.port, args.ws_port)
+    print("Point the bot at it with:")
+    for k, v in sim_env(args.host, args.port, args.ws_port).items():
+        print(f"  export {k}={v}")
+    try:
+        while True:
+            await asyncio.sleep(60)
+            logger.info(f"Sim stats: {sim.stats()}")
+    finally:
+        await sim.stop()
+
+
+def main():
+    from logsetup import setup_logging
+
+    parser = argparse.ArgumentParser(description="Local CLOB exchange simulator")
+    parser.add_argument("--markets", type=int, default=SIM_MARKETS)
+    parser.add_argument("--host", default=SIM_HOST)
+    parser.add_argument("--port", type=int, default=SIM_PORT)
+    parser.add_argument("--ws-port", type=int, default=SIM_WS_PORT)
+    parser.add_argument("--flow-rate", type=float, default=SIM_FLOW_RATE, help="Synthetic orders/sec per market")
+    parser.add_argument("--taker-share", type=float, default=SIM_TAKER_SHARE)
+    parser.add_argument("--cancel-share", type=float, default=SIM_CANCEL_SHARE)
+    parser.add_argument("--vol", type=float, default=SIM_VOL, help="Fair-value stdev per sqrt(second)")
+    parser.add_argument("--latency-ms", type=float, default=SIM_LATENCY_MS)
+    parser.add_argument("--rate-limit", type=float, default=SIM_RATE_LIMIT, help="Requests/sec per API key (0: none)")
+    parser.add_argument("--seed", type=int, default=SIM_SEED)
+    args = parser.parse_args()
+
+    setup_logging(log_file="")
+    try:
+        asyncio.run(_serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
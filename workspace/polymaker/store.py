@@ -0,0 +1,194 @@
+"""
+store.py — Durable fills, positions and watermarks (SQLite, WAL)
+=================================================================
+Everything InventoryTracker and the fill reconciler need to resume after a
+restart:
+
+    fills       append-only, one row per trade ID (INSERT OR IGNORE)
+    positions   latest row per token: net USD, shares, average cost, realized P&L
+    totals      fill count and bought/sold USD
+    watermarks  REST reconciliation watermark, keyed by scope (fills.ACCOUNT)
+
+The event loop only enqueues; a writer thread applies the queue in one
+transaction per STORE_FLUSH_SEC (or STORE_BATCH items), so a fill costs a
+queue put on the hot path. WAL with synchronous=NORMAL keeps commits cheap
+and the database consistent across crashes; at most the last flush
+interval is lost, and the REST sweep refills it from the restored
+watermark.
+
+load() reads the whole state back with a handful of SELECTs at startup,
+before the first quote.
+"""
+
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger("polymaker.store")
+
+STORE_FLUSH_SEC = 0.5
+STORE_BATCH = 500
+STORE_RECENT_IDS = 20_000  # trade IDs handed back to FillDedup on load
+
+_STOP = object()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS fills (
+    trade_id  TEXT PRIMARY KEY,
+    token_id  TEXT NOT NULL,
+    side      TEXT NOT NULL,
+    price     REAL NOT NULL,
+    size      REAL NOT NULL,
+    ts        REAL NOT NULL,
+    source    TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS positions (
+    token_id  TEXT PRIMARY KEY,
+    net_usd   REAL NOT NULL,
+    shares    REAL NOT NULL,
+    avg_cost  REAL NOT NULL,
+    realized  REAL NOT NULL,
+    updated   REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS totals (
+    k TEXT PRIMARY KEY,
+    v REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS watermarks (
+    scope TEXT PRIMARY KEY,
+    ts    REAL NOT NULL
+);
+"""
+
+
+def _connect(path: Path) -> sqlite3.Connection:
+    conn = sqlite3.connect(str(path), check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+class StateStore:
+    """SQLite-backed state with a batching background writer."""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = _connect(self.path)
+        self._q: queue.SimpleQueue = queue.SimpleQueue()
+        self.writes = 0
+        self.commits = 0
+        self._thread = threading.Thread(target=self._writer, name="state-store", daemon=True)
+        self._thread.start()
+
+    # ── Startup ──────────────────────────────────────────────────────────────
+
+    def load(self) -> dict:
+        """
+        Read back the persisted state:
+            {"positions": {token: {net_usd, shares, avg_cost, realized}},
+             "totals": {k: v}, "watermarks": {scope: ts}, "trade_ids": [oldest..newest]}
+        """
+        conn = sqlite3.connect(str(self.path))
+        try:
+            positions = {
+                tid: {"net_usd": net, "shares": sh, "avg_cost": avg, "realized": real}
+                for tid, net, sh, avg, real in conn.execute(
+                    "SELECT token_id, net_usd, shares, avg_cost, realized FROM positions"
+                )
+            }
+            totals = dict(conn.execute("SELECT k, v FROM totals"))
+            watermarks = dict(conn.execute("SELECT scope, ts FROM watermarks"))
+            ids = [r[0] for r in conn.execute(
+                "SELECT trade_id FROM fills ORDER BY rowid DESC LIMIT ?", (STORE_RECENT_IDS,)
+            )]
+        finally:
+            conn.close()
+        ids.reverse()
+        return {"positions": positions, "totals": totals, "watermarks": watermarks, "trade_ids": ids}
+
+    # ── Producer side (event loop thread) ────────────────────────────────────
+
+    def record_fill(
+        self, trade_id: str, token_id: str, side: str, price: float, size: float, source: str
+    ) -> None:
+        self._q.put((
+            "INSERT OR IGNORE INTO fills VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (trade_id, token_id, side, price, size, time.time(), source),
+        ))
+
+    def save_position(
+        self, token_id: str, net_usd: float, shares: float, avg_cost: float, realized: float
+    ) -> None:
+        self._q.put((
+            "INSERT OR REPLACE INTO positions VALUES (?, ?, ?, ?, ?, ?)",
+            (token_id, net_usd, shares, avg_cost, realized, time.time()),
+        ))
+
+    def save_totals(self, totals: dict) -> None:
+        for k, v in totals.items():
+            self._q.put(("INSERT OR REPLACE INTO totals VALUES (?, ?)", (k, v)))
+
+    def save_watermark(self, scope: str, ts: float) -> None:
+        self._q.put(("INSERT OR REPLACE INTO watermarks VALUES (?, ?)", (scope, ts)))
+
+    def close(self) -> None:
+        """Write everything queued so far and close the database."""
+        if not self._thread.is_alive():
+            return
+        self._q.put(_STOP)
+        self._thread.join(timeout=10)
+
+    # ── Writer thread ────────────────────────────────────────────────────────
+
+    def _writer(self) -> None:
+        while True:
+            batch = []
+            try:
+                item = self._q.get(timeout=STORE_FLUSH_SEC)
+            except queue.Empty:
+                continue
+            stop = item is _STOP
+            if not stop:
+                batch.append(item)
+                deadline = time.monotonic() + STORE_FLUSH_SEC
+                while len(batch) < STORE_BATCH:
+                    try:
+                        item = self._q.get(timeout=max(0.0, deadline - time.monotonic()))
+                    except queue.Empty:
+                        break
+                    if item is _STOP:
+                        stop = True
+                        break
+                    batch.append(item)
+            if batch:
+                try:
+                    with self._conn:
+                        for sql, args in batch:
+                            self._conn.execute(sql, args)
+                    self.writes += len(batch)
+                    self.commits += 1
+                except sqlite3.Error as e:
+                    logger.error(f"State store write of {len(batch)} rows failed: {e}")
+            if stop:
+                self._conn.close()
+                return
+
+    def stats(self) -> dict:
+        return {"writes": self.writes, "commits": self.commits, "path": str(self.path)}
+
+
+def open_store(path: str) -> Optional[StateStore]:
+    """StateStore at path, or None if path is empty or the database can't be opened."""
+    if not path:
+        return None
+    try:
+        return StateStore(path)
+    except (OSError, sqlite3.Error) as e:
+        logger.error(f"State store disabled, can't open {path}: {e}")
+        return None
@@ -12,6 +12,11 @@ Where:
   T     = time remaining fraction (1.0 = fresh, 0.0 = expiry)
   kappa = order arrival rate estimate
 
+Quote ladders:
+  Each side quotes LADDER_LEVELS orders, LADDER_STEP_TICKS apart, starting at
+  the A-S bid/ask. Level k is sized base * LADDER_SIZE_CURVE**k, and each
+  side's total is capped by the inventory room left on that side.
+
 VPIN Kill Switch:
   Volume-synchronized Probability of Informed trading.
   If VPIN > threshold, halt quoting (informed flow detected).
@@ -27,6 +32,8 @@ from typing import Optional
 from dotenv import load_dotenv
 from pathlib import Path
 
+from metrics import REGISTRY
+
 load_dotenv(Path(__file__).parent / ".env")
 
 # ── Parameters ────────────────────────────────────────────────────────────────
@@ -38,10 +45,24 @@ MAX_SPREAD = float(os.getenv("MAX_SPREAD", "0.15"))
 MAX_INVENTORY = float(os.getenv("MAX_POSITION_USD", "50.0"))
 VPIN_WINDOW = int(os.getenv("VPIN_WINDOW", "50"))
 VPIN_THRESHOLD = float(os.getenv("VPIN_THRESHOLD", "0.7"))
+LADDER_LEVELS = int(os.getenv("LADDER_LEVELS", "3"))            # orders per side
+LADDER_STEP_TICKS = int(os.getenv("LADDER_STEP_TICKS", "1"))    # spacing between levels
+LADDER_SIZE_CURVE = float(os.getenv("LADDER_SIZE_CURVE", "1.0"))  # size multiplier per level deeper
+
+_QUOTES = REGISTRY.counter("polymaker_quotes_total", "Quote attempts by outcome", ["result"])
+_QUOTED = _QUOTES.labels("quoted")
+_SKIP_TOXIC = _QUOTES.labels("vpin_toxic")
+_SKIP_INVENTORY = _QUOTES.labels("inventory_limit")
 
 
 # ── Data Structures ───────────────────────────────────────────────────────────
 
+@dataclass
+class LadderLevel:
+    price: float        # YES price
+    size_usd: float
+
+
 @dataclass
 class Quote:
     bid: float          # Price to buy YES (our bid)
@@ -50,6 +71,8 @@ class Quote:
     reservation: float  # Risk-adjusted mid
     spread: float       # Total spread
     timestamp: float = field(default_factory=time.time)
+    bids: list[LadderLevel] = field(default_factory=list)  # best first; bids[0].price == bid
+    asks: list[LadderLevel] = field(default_factory=list)  # best first; asks[0].price == ask
 
     def is_valid(self) -> bool:
         return (
@@ -156,12 +179,18 @@ class ASQuoteEngine:
         min_spread: float = MIN_SPREAD,
         max_spread: float = MAX_SPREAD,
         max_inventory: float = MAX_INVENTORY,
+        levels: int = LADDER_LEVELS,
+        step_ticks: int = LADDER_STEP_TICKS,
+        size_curve: float = LADDER_SIZE_CURVE,
     ):
         self.gamma = gamma
         self.kappa = kappa
         self.min_spread = min_spread
         self.max_spread = max_spread
         self.max_inventory = max_inventory
+        self.levels = max(1, levels)
+        self.step_ticks = max(1, step_ticks)
+        self.size_curve = size_curve
         self.vol_estimator = VolatilityEstimator()
         self.vpin = VPINCalculator(window=VPIN_WINDOW, threshold=VPIN_THRESHOLD)
 
@@ -170,6 +199,10 @@ class ASQuoteEngine:
         mid: float,
         inventory_usd: float,
         time_remaining_fraction: float = 0.5,
+        size_usd: Optional[float] = None,
+        tick_size: float = 0.01,
+        room: Optional[tuple[float, float]] = None,
+        exposure_usd: Optional[float] = None,
     ) -> Optional[Quote]:
         """
         Generate a quote using fixed-spread model with inventory skew.
@@ -184,23 +217,34 @@ class ASQuoteEngine:
             mid: Current mid price (0-1)
             inventory_usd: Net position in USD (positive = long YES)
             time_remaining_fraction: 1.0 at market open, 0.0 at resolution
+            size_usd: Top-level order size; when given, bids/asks carry the ladder
+            tick_size: Market tick, for ladder spacing
+            room: (buy, sell) USD the ladders may add, from a portfolio risk
+                  engine; replaces the per-market max_inventory room
+            exposure_usd: The market's own net position, when inventory_usd
+                  also carries correlated exposure; the safety valve checks
+                  this one (defaults to inventory_usd)
 
         Returns:
             Quote or None if VPIN is toxic / inventory limit hit
         """
         # VPIN kill switch
         if self.vpin.is_toxic():
+            _SKIP_TOXIC.inc()
             return None
 
-        # Hard safety valve at 120% max inventory
-        if abs(inventory_usd) >= self.max_inventory * 1.2:
+        # Hard safety valve at 120% max inventory, on this market's own position;
+        # group limits are room's job
+        own = inventory_usd if exposure_usd is None else exposure_usd
+        if abs(own) >= self.max_inventory * 1.2:
+            _SKIP_INVENTORY.inc()
             return None
 
         # Feed vol estimator for future use
         self.vol_estimator.add_price(mid)
 
         # Normalized inventory: [-1, 1] (can exceed 1.0 up to 1.2 safety valve)
-        q = inventory_usd / self.max_inventory
+        q = max(-1.2, min(1.2, inventory_usd / self.max_inventory))
 
         # Gradual inventory brake: gamma scales up as inventory grows
         # At q=0.5 → gamma * 3.0, at q=1.0 → gamma * 5.0
@@ -229,10 +273,62 @@ class ASQuoteEngine:
             bid = center - self.min_spread / 2.0
             ask = center + self.min_spread / 2.0
 
-        return Quote(
+        quote = Quote(
             bid=round(bid, 3),
             ask=round(ask, 3),
             mid=mid,
             reservation=round(reservation, 3),
             spread=round(ask - bid, 3),
         )
+        if size_usd is not None:
+            quote.bids, quote.asks = self.ladder(quote, size_usd, inventory_usd, tick_size, room)
+        _QUOTED.inc()
+        return quote
+
+    def ladder(
+        self,
+        quote: Quote,
+        size_usd: float,
+        inventory_usd: float,
+        tick_size: float = 0.01,
+        room: Optional[tuple[float, float]] = None,
+    ) -> tuple[list[LadderLevel], list[LadderLevel]]:
+        """
+        Build the bid and ask ladders from a quote's top of book.
+        Bids buy YES, so they use the room left to go long (max_inventory - inv).
+        Asks sell YES, so they use the room left to go short (max_inventory + inv).
+        Deeper levels are dropped once a side's room is used up. Without an
+        explicit `room` the top level is always kept, so the inventory skew
+        alone decides when quoting stops; with one (portfolio limits) a side
+        with no room gets no levels at all.
+
+        The top is snapped to the tick away from the touch (bids down, asks
+        up) and deeper levels step whole ticks from it, so every level sits
+        on its own tick and OrderManager.round_price leaves it there.
+        """
+        if room is None:
+            rooms = (self.max_inventory - inventory_usd, self.max_inventory + inventory_usd)
+            first = 1
+        else:
+            rooms, first = room, 0
+        sides = []
+        for top, direction, left in (
+            (quote.bid, -1, rooms[0]),
+            (quote.ask, +1, rooms[1]),
+        ):
+            levels: list[LadderLevel] = []
+            ticks = top / tick_size
+            top_ticks = math.floor(ticks + 1e-9) if direction < 0 else math.ceil(ticks - 1e-9)
+            for k in range(self.levels):
+                price = round((top_ticks + direction * k * self.step_ticks) * tick_size, 4)
+                if not tick_size <= price <= 1.0 - tick_size:
+                    break
+                if levels and price == levels[-1].price:
+                    continue
+                size = size_usd * self.size_curve ** k
+                if k >= first and size > left:
+                    break
+                levels.append(LadderLevel(price=price, size_usd=round(size, 2)))
+                left -= size
+            sides.append(levels)
+        return sides[0], sides[1]
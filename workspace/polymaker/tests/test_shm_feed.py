@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Tests for the shared-memory feed process, run against simexchange.
+"""
+
+import asyncio
+import os
+import socket
+import sys
+import time
+from pathlib import Path
+from unittest import IsolatedAsyncioTestCase, main, skipUnless
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+try:
+    import py_clob_client  # noqa: F401
+    import websockets  # noqa: F401
+    HAVE_DEPS = True
+except ImportError:
+    HAVE_DEPS = False
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def wait_until(cond, timeout: float = 20.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if cond():
+            return True
+        await asyncio.sleep(0.1)
+    return False
+
+
+@skipUnless(HAVE_DEPS, "needs py_clob_client and websockets")
+class TestFeedProcessAgainstSim(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        from simexchange import SimExchange, sim_client, sim_env
+
+        port, ws_port = free_port(), free_port()
+        self.sim = SimExchange(markets=2, flow_rate=2.0, seed=11)
+        self.books_requests = 0
+        route = self.sim._route
+
+        async def counting_route(method, target, headers, body):
+            if method == "POST" and target.startswith("/books"):
+                self.books_requests += 1
+            return await route(method, target, headers, body)
+
+        self.sim._route = counting_route
+        await self.sim.start("127.0.0.1", port, ws_port)
+
+        # The child inherits this environment; it must not need (or find) live credentials
+        self._env = dict(os.environ)
+        os.environ.update(sim_env("127.0.0.1", port, ws_port))
+        self.client = await asyncio.to_thread(sim_client, f"http://127.0.0.1:{port}")
+        self.feed = None
+
+    async def asyncTearDown(self):
+        if self.feed is not None:
+            await self.feed.stop()
+        await self.sim.stop()
+        os.environ.clear()
+        os.environ.update(self._env)
+
+    async def test_feed_process_quotes_and_resyncs_from_the_simulator(self):
+        from shm_feed import SharedMemoryFeed
+        from ws_feed import FRESH
+
+        m = self.sim.markets[0]
+        self.feed = SharedMemoryFeed(
+            api_creds={
+                "api_key": self.client.creds.api_key,
+                "api_secret": self.client.creds.api_secret,
+                "api_passphrase": self.client.creds.api_passphrase,
+            },
+            token_ids=[m.token_yes, m.token_no],
+            condition_ids=[m.condition_id],
+            clob_host=self.client.host,
+        )
+        await self.feed.run()
+
+        fresh = await wait_until(
+            lambda: self.feed.freshness(m.token_yes) == FRESH and self.feed.get_mid(m.token_yes) is not None
+        )
+        self.assertTrue(fresh, "token never became FRESH with a mid")
+        sim_mid = self.sim.engine.books[m.token_yes].mid()
+        self.assertAlmostEqual(self.feed.get_mid(m.token_yes), sim_mid, delta=0.05)
+        self.assertTrue(self.feed._proc.is_alive())
+        # Resync snapshots came from the simulator's REST, not a live host
+        self.assertTrue(await wait_until(lambda: self.books_requests > 0, timeout=10.0))
+
+
+if __name__ == "__main__":
+    main()
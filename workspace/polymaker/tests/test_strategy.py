@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Tests for ASQuoteEngine ladder pricing.
+"""
+
+import sys
+from pathlib import Path
+from unittest import TestCase, main
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from strategy import ASQuoteEngine, Quote  # noqa: E402
+
+
+def on_tick(price: float, tick: float) -> float:
+    """OrderManager.round_price: what the order actually goes out at."""
+    return round(round(price / tick) * tick, 4)
+
+
+def make_quote(bid: float, ask: float) -> Quote:
+    mid = (bid + ask) / 2
+    return Quote(bid=bid, ask=ask, mid=mid, reservation=mid, spread=ask - bid)
+
+
+class TestLadder(TestCase):
+    def setUp(self):
+        self.engine = ASQuoteEngine(max_inventory=50.0, levels=3, step_ticks=1, size_curve=1.0)
+
+    def test_off_tick_top_snaps_away_from_touch(self):
+        bids, asks = self.engine.ladder(make_quote(0.895, 0.905), 5.0, 0.0, tick_size=0.01)
+        self.assertEqual([lvl.price for lvl in bids], [0.89, 0.88, 0.87])
+        self.assertEqual([lvl.price for lvl in asks], [0.91, 0.92, 0.93])
+
+    def test_levels_land_on_distinct_ticks(self):
+        for tick in (0.01, 0.001):
+            for i in range(100, 900):
+                top = i / 1000
+                bids, asks = self.engine.ladder(make_quote(top, top + 0.02), 5.0, 0.0, tick_size=tick)
+                for side in (bids, asks):
+                    prices = [on_tick(lvl.price, tick) for lvl in side]
+                    self.assertEqual(prices, [lvl.price for lvl in side], f"top={top} tick={tick}")
+                    self.assertEqual(len(set(prices)), len(prices), f"top={top} tick={tick}")
+                    self.assertTrue(all(p > 0 for p in prices))
+
+    def test_levels_stop_at_price_bounds(self):
+        bids, _ = self.engine.ladder(make_quote(0.025, 0.05), 5.0, 0.0, tick_size=0.01)
+        self.assertEqual([lvl.price for lvl in bids], [0.02, 0.01])
+
+
+if __name__ == "__main__":
+    main()
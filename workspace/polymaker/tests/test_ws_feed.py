@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Tests for MarketFeed live subscription management, against a local WS server.
+"""
+
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+from unittest import IsolatedAsyncioTestCase, main, skipUnless
+from unittest.mock import patch
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+try:
+    import websockets
+    HAVE_DEPS = True
+except ImportError:
+    HAVE_DEPS = False
+
+if HAVE_DEPS:
+    import ws_feed
+    from ws_feed import FRESH, MarketFeed
+
+
+async def wait_until(cond, timeout: float = 10.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if cond():
+            return True
+        await asyncio.sleep(0.05)
+    return False
+
+
+def book(token_id: str, bid: str, ask: str) -> dict:
+    return {
+        "event_type": "book", "asset_id": token_id,
+        "bids": [{"price": bid, "size": "100"}], "asks": [{"price": ask, "size": "100"}],
+        "timestamp": str(int(time.time() * 1000)), "hash": "",
+    }
+
+
+@skipUnless(HAVE_DEPS, "needs websockets")
+class TestSubscribeOnLiveShard(IsolatedAsyncioTestCase):
+    """The initial subscription gets a `book` dump; an operation subscribe gets nothing."""
+
+    async def asyncSetUp(self):
+        self.ops = []
+
+        async def handler(ws):
+            async for raw in ws:
+                msg = json.loads(raw)
+                if msg.get("type") == "market":
+                    await ws.send(json.dumps([book(t, "0.40", "0.42") for t in msg["assets_ids"]]))
+                elif "operation" in msg:
+                    self.ops.append(msg)
+
+        self.server = await websockets.serve(handler, "127.0.0.1", 0)
+        url = f"ws://127.0.0.1:{self.server.sockets[0].getsockname()[1]}"
+        patcher = patch.multiple(ws_feed, WS_URL=url, WS_USER_URL=url)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.snapshot_calls = []
+
+        def snapshot_fn(ids):
+            self.snapshot_calls.append(list(ids))
+            return [{"asset_id": t, "bids": [{"price": "0.60", "size": "50"}],
+                     "asks": [{"price": "0.64", "size": "50"}]} for t in ids]
+
+        creds = {"api_key": "k", "api_secret": "s", "api_passphrase": "p"}
+        self.feed = MarketFeed(creds, ["tok-a"], [], snapshot_fn=snapshot_fn)
+        await self.feed.run()
+
+    async def asyncTearDown(self):
+        await self.feed.stop()
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def test_added_token_resyncs_without_book_frame(self):
+        self.assertTrue(await wait_until(lambda: self.feed.get_mid("tok-a") is not None))
+        await self.feed.subscribe(["tok-b"])
+
+        self.assertTrue(await wait_until(lambda: self.feed.freshness("tok-b") == FRESH))
+        self.assertEqual(self.ops, [{"assets_ids": ["tok-b"], "operation": "subscribe"}])
+        self.assertIn(["tok-b"], self.snapshot_calls)
+        self.assertAlmostEqual(self.feed.get_mid("tok-b"), 0.62)
+        self.assertAlmostEqual(self.feed.get_mid("tok-a"), 0.41)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,379 @@
+"""
+ws_decode.py — Fast-path decoding for Polymarket WebSocket frames
+==================================================================
+Turns raw market/user channel frames into typed events:
+  - BookEvent         (`book` snapshot)
+  - PriceLevelChange  (one entry of a `price_change` event)
+  - LastTradeEvent    (`last_trade_price`)
+  - UserTradeEvent    (user channel `trade`)
+
+JSON backend is picked at import: msgspec > orjson > stdlib json.
+Override with WS_DECODER=json|orjson|msgspec (e.g. for benchmarking).
+With msgspec, market frames decode straight into typed wire Structs
+(prices converted from strings in C, no intermediate dicts); frames that
+don't fit the schema take the generic dict path instead.
+
+Before any JSON parsing, the raw frame is scanned for the quoted event
+type names we consume. Frames carrying only other events (tick_size_change,
+best_bid_ask, PONG, ...) are dropped without a decode.
+"""
+
+import json
+import os
+from dataclasses import dataclass, field
+from typing import Callable, Optional, Union
+
+# ── JSON backend ──────────────────────────────────────────────────────────────
+
+
+def make_loads(backend: str = "") -> tuple[str, Callable, tuple]:
+    """
+    Return (name, loads, decode_errors) for the requested backend,
+    falling back down the chain msgspec -> orjson -> json.
+    """
+    order = ["msgspec", "orjson", "json"]
+    if backend in order:
+        order = order[order.index(backend):]
+    for name in order:
+        if name == "msgspec":
+            try:
+                import msgspec
+            except ImportError:
+                continue
+            return name, msgspec.json.Decoder().decode, (msgspec.DecodeError,)
+        if name == "orjson":
+            try:
+                import orjson
+            except ImportError:
+                continue
+            return name, orjson.loads, (orjson.JSONDecodeError,)
+    return "json", json.loads, (json.JSONDecodeError, UnicodeDecodeError)
+
+
+BACKEND, _loads, _DECODE_ERRORS = make_loads(os.getenv("WS_DECODER", ""))
+
+
+# ── Typed events ──────────────────────────────────────────────────────────────
+
+@dataclass
+class BookEvent:
+    asset_id: str
+    bids: list[tuple[float, float]]
+    asks: list[tuple[float, float]]
+    timestamp: float = 0.0   # exchange time, seconds (0.0 if absent)
+    hash: str = ""
+
+
+@dataclass
+class PriceLevelChange:
+    asset_id: str
+    side: str                    # "BUY" / "SELL" / "" if absent
+    price: Optional[float]
+    size: Optional[float]
+    best_bid: Optional[float] = None
+    best_ask: Optional[float] = None
+    timestamp: float = 0.0
+    hash: str = ""
+
+
+@dataclass
+class LastTradeEvent:
+    asset_id: str
+    price: float
+    size: float = 0.0
+    side: str = ""
+    timestamp: float = 0.0
+
+
+@dataclass
+class UserTradeEvent:
+    asset_id: str
+    trade_id: str
+    status: str
+    side: str
+    price: float
+    size: float
+    timestamp: float = 0.0
+    raw: dict = field(default_factory=dict, repr=False)
+
+
+MarketEvent = Union[BookEvent, PriceLevelChange, LastTradeEvent]
+
+
+# ── Field helpers ─────────────────────────────────────────────────────────────
+
+def _f(v) -> Optional[float]:
+    if v is None:
+        return None
+    try:
+        return float(v)
+    except (ValueError, TypeError):
+        return None
+
+
+def _ts(v) -> float:
+    """Exchange timestamps arrive as epoch-ms strings; normalize to seconds."""
+    t = _f(v)
+    if t is None:
+        return 0.0
+    return t / 1000.0 if t > 1e11 else t
+
+
+def _levels(raw_levels) -> list[tuple[float, float]]:
+    if not raw_levels:
+        return []
+    try:
+        return [(float(lvl["price"]), float(lvl["size"])) for lvl in raw_levels]
+    except (KeyError, ValueError, TypeError):
+        pass
+    # Slow path: skip malformed levels individually
+    out = []
+    for lvl in raw_levels:
+        try:
+            out.append((float(lvl["price"]), float(lvl["size"])))
+        except (KeyError, ValueError, TypeError):
+            continue
+    return out
+
+
+# ── msgspec wire schema ───────────────────────────────────────────────────────
+
+_typed_market = None
+
+
+def _market_decoder():
+    """msgspec Decoder for market frames into wire Structs (built once, on first use)."""
+    global _typed_market
+    if _typed_market is not None:
+        return _typed_market
+    import msgspec
+
+    class Level(msgspec.Struct):
+        price: float
+        size: float
+
+    class Change(msgspec.Struct):
+        asset_id: str = ""
+        side: str = ""
+        price: Optional[float] = None
+        size: Optional[float] = None
+        best_bid: Optional[float] = None
+        best_ask: Optional[float] = None
+        hash: str = ""
+
+    class PriceChange(msgspec.Struct, tag_field="event_type", tag="price_change"):
+        asset_id: str = ""
+        price_changes: Optional[list[Change]] = None
+        changes: Optional[list[Change]] = None
+        timestamp: Optional[float] = None
+        hash: str = ""
+
+    class Book(msgspec.Struct, tag_field="event_type", tag="book"):
+        asset_id: str = ""
+        bids: Optional[list[Level]] = None
+        buys: Optional[list[Level]] = None
+        asks: Optional[list[Level]] = None
+        sells: Optional[list[Level]] = None
+        timestamp: Optional[float] = None
+        hash: str = ""
+
+    class LastTrade(msgspec.Struct, tag_field="event_type", tag="last_trade_price"):
+        asset_id: str = ""
+        price: Optional[float] = None
+        last_trade_price: Optional[float] = None
+        size: Optional[float] = None
+        side: str = ""
+        timestamp: Optional[float] = None
+
+    msg = Union[PriceChange, Book, LastTrade]
+    # strict=False: numeric strings ("0.45", "1700000000000") decode as floats
+    decoder = msgspec.json.Decoder(Union[list[msg], msg], strict=False)
+    _typed_market = (decoder.decode, msgspec.DecodeError, PriceChange, Book)
+    return _typed_market
+
+
+def _wire_ts(t: Optional[float]) -> float:
+    if t is None:
+        return 0.0
+    return t / 1000.0 if t > 1e11 else t
+
+
+# ── Decoder ───────────────────────────────────────────────────────────────────
+
+_MARKET_MARKERS_STR = ('"book"', '"price_change"', '"last_trade_price"')
+_MARKET_MARKERS_BYTES = tuple(m.encode() for m in _MARKET_MARKERS_STR)
+_USER_MARKERS_STR = ('"trade"',)
+_USER_MARKERS_BYTES = tuple(m.encode() for m in _USER_MARKERS_STR)
+
+
+def _wanted(raw, str_markers, byte_markers) -> bool:
+    markers = byte_markers if isinstance(raw, (bytes, bytearray, memoryview)) else str_markers
+    for m in markers:
+        if m in raw:
+            return True
+    return False
+
+
+class FrameDecoder:
+    """
+    Stateless frame -> typed event decoder.
+    Keeps skip/decode counters so the feed can report how much it filtered.
+    """
+
+    def __init__(self, backend: str = ""):
+        if backend:
+            self.backend, self._loads, self._errors = make_loads(backend)
+        else:
+            self.backend, self._loads, self._errors = BACKEND, _loads, _DECODE_ERRORS
+        self._typed = _market_decoder() if self.backend == "msgspec" else None
+        self.frames_decoded = 0
+        self.frames_skipped = 0
+
+    def _parse(self, raw) -> list:
+        if isinstance(raw, memoryview):
+            raw = bytes(raw)
+        try:
+            msgs = self._loads(raw)
+        except self._errors:
+            return []
+        if isinstance(msgs, list):
+            return msgs
+        return [msgs] if isinstance(msgs, dict) else []
+
+    def decode_market(self, raw) -> list[MarketEvent]:
+        """Decode a market channel frame. Returns [] for frames we don't consume."""
+        if not _wanted(raw, _MARKET_MARKERS_STR, _MARKET_MARKERS_BYTES):
+            self.frames_skipped += 1
+            return []
+        self.frames_decoded += 1
+        if self._typed is not None:
+            events = self._decode_typed(raw)
+            if events is not None:
+                return events
+
+        events: list[MarketEvent] = []
+        for msg in self._parse(raw):
+            if not isinstance(msg, dict):
+                continue
+            et = msg.get("event_type")
+            if et == "price_change":
+                self._price_change(msg, events)
+            elif et == "book":
+                asset_id = msg.get("asset_id")
+                if not asset_id:
+                    continue
+                events.append(BookEvent(
+                    asset_id=asset_id,
+                    bids=_levels(msg.get("bids") or msg.get("buys")),
+                    asks=_levels(msg.get("asks") or msg.get("sells")),
+                    timestamp=_ts(msg.get("timestamp")),
+                    hash=msg.get("hash") or "",
+                ))
+            elif et == "last_trade_price":
+                asset_id = msg.get("asset_id")
+                price = _f(msg.get("price") or msg.get("last_trade_price"))
+                if not asset_id or price is None:
+                    continue
+                events.append(LastTradeEvent(
+                    asset_id=asset_id,
+                    price=price,
+                    size=_f(msg.get("size")) or 0.0,
+                    side=(msg.get("side") or "").upper(),
+                    timestamp=_ts(msg.get("timestamp")),
+                ))
+        return events
+
+    def _decode_typed(self, raw) -> Optional[list[MarketEvent]]:
+        """msgspec fast path; None if the frame doesn't fit the wire schema."""
+        decode, errors, price_change, book = self._typed
+        try:
+            msgs = decode(raw)
+        except errors:
+            return None
+        if not isinstance(msgs, list):
+            msgs = (msgs,)
+        events: list[MarketEvent] = []
+        for m in msgs:
+            kind = type(m)
+            if kind is price_change:
+                ts = _wire_ts(m.timestamp)
+                for ch in m.price_changes or m.changes or ():
+                    asset_id = ch.asset_id or m.asset_id
+                    if not asset_id:
+                        continue
+                    events.append(PriceLevelChange(
+                        asset_id, ch.side.upper(), ch.price, ch.size,
+                        ch.best_bid, ch.best_ask, ts, ch.hash or m.hash,
+                    ))
+            elif kind is book:
+                if not m.asset_id:
+                    continue
+                events.append(BookEvent(
+                    m.asset_id,
+                    [(lvl.price, lvl.size) for lvl in m.bids or m.buys or ()],
+                    [(lvl.price, lvl.size) for lvl in m.asks or m.sells or ()],
+                    _wire_ts(m.timestamp),
+                    m.hash,
+                ))
+            else:
+                price = m.price if m.price is not None else m.last_trade_price
+                if not m.asset_id or price is None:
+                    continue
+                events.append(LastTradeEvent(
+                    m.asset_id, price, m.size or 0.0, m.side.upper(), _wire_ts(m.timestamp),
+                ))
+        return events
+
+    @staticmethod
+    def _price_change(msg: dict, out: list) -> None:
+        # Current schema: price_changes[] each carrying asset_id + best_bid/ask.
+        # Legacy schema: asset_id on the message, changes[] with price/side/size.
+        changes = msg.get("price_changes") or msg.get("changes") or ()
+        if isinstance(changes, dict):
+            changes = (changes,)
+        msg_asset = msg.get("asset_id")
+        ts = _ts(msg.get("timestamp"))
+        for ch in changes:
+            asset_id = ch.get("asset_id") or msg_asset
+            if not asset_id:
+                continue
+            side = ch.get("side")
+            out.append(PriceLevelChange(
+                asset_id,
+                side.upper() if side else "",
+                _f(ch.get("price")),
+                _f(ch.get("size")),
+                _f(ch.get("best_bid")),
+                _f(ch.get("best_ask")),
+                ts,
+                ch.get("hash") or msg.get("hash") or "",
+            ))
+
+    def decode_user(self, raw) -> list[UserTradeEvent]:
+        """Decode a user channel frame into trade events (status filtering is the caller's job)."""
+        if not _wanted(raw, _USER_MARKERS_STR, _USER_MARKERS_BYTES):
+            self.frames_skipped += 1
+            return []
+        self.frames_decoded += 1
+
+        events = []
+        for msg in self._parse(raw):
+            if not isinstance(msg, dict) or msg.get("event_type") != "trade":
+                continue
+            trade_id = msg.get("id") or msg.get("tradeID") or ""
+            asset_id = msg.get("asset_id")
+            price = _f(msg.get("price", 0))
+            size = _f(msg.get("size", 0))
+            if not trade_id or not asset_id or price is None or size is None:
+                continue
+            events.append(UserTradeEvent(
+                asset_id=asset_id,
+                trade_id=trade_id,
+                status=(msg.get("status") or "").upper(),
+                side=(msg.get("side") or "").upper(),
+                price=price,
+                size=size,
+                timestamp=_ts(msg.get("timestamp") or msg.get("match_time")),
+                raw=msg,
+            ))
+        return events
@@ -2,15 +2,37 @@
 ws_feed.py — WebSocket feed for Polymarket market data + user fills
 ====================================================================
 Connects to two WebSocket channels:
-  - Market (public): real-time best_bid/best_ask price changes
+  - Market (public): `book` snapshots + `price_change` deltas
   - User (authenticated): our fill notifications
 
-Provides event-driven midpoint updates to MarketLoop, with automatic
-reconnection and REST fallback on disconnect.
+Maintains a local L2 book per token (see orderbook.py) and provides
+event-driven midpoint updates to MarketLoop, with automatic reconnection
+and REST fallback on disconnect.
+
+Market assets are spread over several connections ("shards") of at most
+WS_MAX_ASSETS_PER_CONN assets each. Assets can be added or removed at
+runtime via subscribe()/unsubscribe() without touching other shards.
+
+Staleness: every token on a shard is marked stale when its connection
+drops, and get_mid() returns None until a fresh book snapshot arrives —
+from the WS `book` dump or a bulk REST fetch issued on reconnect. A
+price_change whose best_bid/best_ask disagrees with the local book (or
+leaves it crossed) means we missed a delta; only that token is resynced.
+
+Freshness: a synced token is FRESH while either it or its connection
+(any frame or keepalive pong) was heard from within FEED_STALE_SEC, so a
+quiet market on a healthy socket stays usable. A synced token whose
+connection has gone silent is SILENT; an unsynced one is STALE. get_mid()
+only answers for FRESH tokens.
+
+With a latency.LatencyTracker attached, each frame is stamped on receive
+and after decode, and each slot publish carries the receive stamp of the
+frame that caused it, so MarketLoop can measure the rest of the path.
 """
 
 import asyncio
 import logging
+import os
 import time
 from dataclasses import dataclass, field
 from typing import Optional
@@ -18,14 +40,34 @@ from typing import Optional
 import websockets
 import json
 
+from latency import FEED
+from orderbook import OrderBook, parse_levels
+from ws_decode import (
+    BookEvent,
+    FrameDecoder,
+    LastTradeEvent,
+    PriceLevelChange,
+    UserTradeEvent,
+)
+
 logger = logging.getLogger("polymaker.ws")
 
-WS_URL = "wss://ws-subscriptions-clob.polymarket.com/ws/market"
-WS_USER_URL = "wss://ws-subscriptions-clob.polymarket.com/ws/user"
+WS_URL = os.getenv("WS_URL", "wss://ws-subscriptions-clob.polymarket.com/ws/market")
+WS_USER_URL = os.getenv("WS_USER_URL", "wss://ws-subscriptions-clob.polymarket.com/ws/user")
 
 KEEPALIVE_SEC = 10
 RECONNECT_BASE = 1.0
 RECONNECT_MAX = 30.0
+MAX_ASSETS_PER_CONN = int(os.getenv("WS_MAX_ASSETS_PER_CONN", "250"))
+SNAPSHOT_BATCH = 100        # tokens per bulk REST /books request
+RESYNC_DEBOUNCE_SEC = 0.25  # coalesce gap-triggered resyncs
+PRICE_EPS = 1e-9
+FEED_STALE_SEC = float(os.getenv("FEED_STALE_SEC", "30"))  # > KEEPALIVE_SEC, so pongs keep quiet tokens fresh
+
+# Token freshness states
+FRESH = "fresh"    # in sync, recently heard from (token or its connection)
+SILENT = "silent"  # in sync when last heard from, but the connection has gone quiet
+STALE = "stale"    # not in sync (disconnected or gap), waiting for a snapshot
 
 
 @dataclass
@@ -45,6 +87,83 @@ class FillUpdate:
     timestamp: float = field(default_factory=time.time)
 
 
+class TokenSlot:
+    """
+    Conflated latest-value slot for one token.
+
+    `seq` increases every time the mid moves at least mid_threshold away from
+    the last mid that woke waiters. A waiter passes the seq it last consumed
+    and returns as soon as `seq` is past it, so an update that lands while
+    the loop is busy requoting is still seen, and a burst of updates
+    collapses into a single wakeup.
+    """
+
+    __slots__ = (
+        "token_id", "seq", "mid", "signalled_mid", "book",
+        "last_trade_price", "last_trade_size", "last_trade_side",
+        "updated_at", "stale", "pub_ns", "pub_recv_ns", "_waiters",
+    )
+
+    def __init__(self, token_id: str, book: OrderBook):
+        self.token_id = token_id
+        self.seq = 0
+        self.mid: Optional[float] = None
+        self.signalled_mid: Optional[float] = None
+        self.book = book
+        self.last_trade_price: Optional[float] = None
+        self.last_trade_size = 0.0
+        self.last_trade_side = ""
+        self.updated_at = 0.0
+        self.stale = True  # no in-sync book yet
+        self.pub_ns = 0       # perf_counter_ns of the last publish (latency tracking only)
+        self.pub_recv_ns = 0  # receive stamp of the frame behind that publish
+        self._waiters: list[asyncio.Future] = []
+
+    def publish(self) -> None:
+        self.seq += 1
+        self.signalled_mid = self.mid
+        if self._waiters:
+            waiters, self._waiters = self._waiters, []
+            for fut in waiters:
+                if not fut.done():
+                    fut.set_result(None)
+
+    async def wait(self, after_seq: int, timeout: float) -> int:
+        """Return the current seq once it exceeds after_seq, or after timeout."""
+        if self.seq > after_seq:
+            return self.seq
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        self._waiters.append(fut)
+        # One TimerHandle instead of wait_for's wrapper task + timer
+        handle = loop.call_later(timeout, _resolve, fut)
+        try:
+            await fut
+        finally:
+            handle.cancel()
+            if fut in self._waiters:  # timed out or cancelled
+                self._waiters.remove(fut)
+        return self.seq
+
+
+def _resolve(fut: asyncio.Future) -> None:
+    if not fut.done():
+        fut.set_result(None)
+
+
+class _MarketShard:
+    """One market-channel connection and the assets it is subscribed to."""
+
+    def __init__(self, shard_id: int):
+        self.shard_id = shard_id
+        self.token_ids: set[str] = set()
+        self.ws = None  # live connection, None while (re)connecting
+        self.task: Optional[asyncio.Task] = None
+        self.connects = 0
+        self.last_msg_at = 0.0  # last frame or keepalive pong
+        self.msgs = 0  # frames received, all connections
+
+
 class MarketFeed:
     """
     Manages market + user WebSocket connections.
@@ -57,64 +176,283 @@ class MarketFeed:
         token_ids: list[str],
         condition_ids: list[str],
         mid_threshold: float = 0.005,
+        max_assets_per_conn: int = MAX_ASSETS_PER_CONN,
+        recorder=None,
+        snapshot_fn=None,
+        latency=None,
     ):
         self._api_creds = api_creds  # {api_key, api_secret, api_passphrase}
-        self._token_ids = set(token_ids)
+        self._token_ids: set[str] = set()
         self._condition_ids = list(set(condition_ids))
         self._mid_threshold = mid_threshold
+        self._max_per_conn = max(1, max_assets_per_conn)
+        self._recorder = recorder  # optional recorder.FeedRecorder
+        # Optional sync callable: list[token_id] -> list of REST book snapshots
+        self._snapshot_fn = snapshot_fn
+        self._latency = latency  # optional latency.LatencyTracker
+        self._frame_recv_ns = 0  # stamps of the frame being handled, 0 outside a frame
+        self._frame_decoded_ns = 0
 
         # State
-        self._mids: dict[str, float] = {}  # token_id -> latest mid
-        self._mid_events: dict[str, asyncio.Event] = {
-            tid: asyncio.Event() for tid in token_ids
-        }
-        self._fill_queues: dict[str, asyncio.Queue] = {
-            tid: asyncio.Queue() for tid in token_ids
-        }
+        self._slots: dict[str, TokenSlot] = {}  # token_id -> latest mid/book/trade + seq
+        self._books: dict[str, OrderBook] = {}
+        self._fill_queues: dict[str, asyncio.Queue] = {}
+        self._decoder = FrameDecoder()
         self._running = False
         self._tasks: list[asyncio.Task] = []
 
+        # Connections
+        self._shards: list[_MarketShard] = []
+        self._next_shard_id = 0
+        self._user_ws = None
+        self._user_connects = 0
+        self.user_msgs = 0
+
+        # Resync
+        self._gap_tokens: set[str] = set()
+        self._resync_tasks: set[asyncio.Task] = set()
+        self._gap_resync_pending = False
+        self.gaps_detected = 0
+        self.snapshots_applied = 0
+
+        tokens = list(dict.fromkeys(token_ids))
+        self._add_token_state(tokens)
+        self._assign(tokens)
+
     async def run(self):
-        """Start market WS, user WS, and keepalive tasks."""
+        """Start one task per market shard plus the user WS."""
         self._running = True
-        self._tasks = [
-            asyncio.create_task(self._market_ws_loop(), name="market_ws"),
-            asyncio.create_task(self._user_ws_loop(), name="user_ws"),
-        ]
+        self._tasks = [asyncio.create_task(self._user_ws_loop(), name="user_ws")]
+        for shard in self._shards:
+            self._start_shard(shard)
         logger.info(
-            f"MarketFeed started: {len(self._token_ids)} tokens, "
-            f"{len(self._condition_ids)} conditions"
+            f"MarketFeed started: {len(self._token_ids)} tokens on {len(self._shards)} "
+            f"connections, {len(self._condition_ids)} conditions, decoder={self._decoder.backend}"
         )
 
     async def stop(self):
         """Clean shutdown."""
         self._running = False
-        for t in self._tasks:
+        tasks = self._tasks + [s.task for s in self._shards if s.task] + list(self._resync_tasks)
+        for t in tasks:
             t.cancel()
-        if self._tasks:
-            await asyncio.gather(*self._tasks, return_exceptions=True)
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
         self._tasks = []
+        for s in self._shards:
+            s.task = None
         logger.info("MarketFeed stopped")
 
-    async def wait_for_update(self, token_id: str, timeout: float) -> bool:
+    # ── Live subscription management ─────────────────────────────────────────
+
+    async def subscribe(self, token_ids: list[str], condition_ids: list[str] = ()):
         """
-        Block until the midpoint for token_id changes meaningfully, or timeout.
-        Returns True if an update arrived, False on timeout.
+        Start following new assets without disturbing existing subscriptions.
+        Tokens go to the least-loaded shard with room; a new connection is
+        opened once every shard is at the per-connection cap.
         """
-        ev = self._mid_events.get(token_id)
-        if ev is None:
-            await asyncio.sleep(timeout)
-            return False
-        ev.clear()
+        new = [t for t in dict.fromkeys(token_ids) if t not in self._token_ids]
+        self._add_token_state(new)
+        for shard, tids in self._assign(new).items():
+            if shard.ws is not None:
+                await self._send_market_op(shard, tids, "subscribe")
+                # A mid-session subscribe isn't guaranteed a `book` dump; don't wait on one
+                self._spawn_resync(tids)
+            elif self._running and shard.task is None:
+                self._start_shard(shard)
+            # Otherwise the shard is (re)connecting and its initial subscription includes tids
+
+        new_conds = [c for c in dict.fromkeys(condition_ids) if c not in self._condition_ids]
+        if new_conds:
+            self._condition_ids.extend(new_conds)
+            await self._send_user_op(new_conds, "subscribe")
+        if new or new_conds:
+            logger.info(
+                f"Subscribed +{len(new)} tokens, +{len(new_conds)} conditions "
+                f"(now {len(self._token_ids)} tokens on {len(self._shards)} connections)"
+            )
+
+    async def unsubscribe(self, token_ids: list[str], condition_ids: list[str] = ()):
+        """
+        Stop following assets. Their cached mid, book and any undrained fills
+        are dropped, so callers should drain get_fills() first.
+        """
+        gone_all = set(token_ids) & self._token_ids
+        for shard in list(self._shards):
+            gone = [t for t in gone_all if t in shard.token_ids]
+            if not gone:
+                continue
+            shard.token_ids.difference_update(gone)
+            if not shard.token_ids:
+                await self._retire_shard(shard)
+            elif shard.ws is not None:
+                await self._send_market_op(shard, gone, "unsubscribe")
+        self._drop_token_state(gone_all)
+
+        gone_conds = [c for c in condition_ids if c in self._condition_ids]
+        if gone_conds:
+            self._condition_ids = [c for c in self._condition_ids if c not in gone_conds]
+            await self._send_user_op(gone_conds, "unsubscribe")
+        if gone_all or gone_conds:
+            logger.info(
+                f"Unsubscribed -{len(gone_all)} tokens, -{len(gone_conds)} conditions "
+                f"(now {len(self._token_ids)} tokens on {len(self._shards)} connections)"
+            )
+
+    def shard_stats(self) -> list[dict]:
+        return [
+            {
+                "shard": s.shard_id,
+                "tokens": len(s.token_ids),
+                "connected": s.ws is not None,
+                "connects": s.connects,
+                "msgs": s.msgs,
+                "silent_sec": round(time.time() - s.last_msg_at, 1) if s.last_msg_at else None,
+            }
+            for s in self._shards
+        ]
+
+    def freshness(self, token_id: str, now: Optional[float] = None) -> str:
+        """FRESH, SILENT or STALE (see module docstring)."""
+        slot = self._slots.get(token_id)
+        if slot is None or slot.stale:
+            return STALE
+        now = now if now is not None else time.time()
+        if now - slot.updated_at < FEED_STALE_SEC:
+            return FRESH
+        for shard in self._shards:
+            if token_id in shard.token_ids:
+                if shard.ws is not None and now - shard.last_msg_at < FEED_STALE_SEC:
+                    return FRESH
+                break
+        return SILENT
+
+    def freshness_counts(self) -> dict[str, int]:
+        now = time.time()
+        counts = {FRESH: 0, SILENT: 0, STALE: 0}
+        for tid in self._token_ids:
+            counts[self.freshness(tid, now)] += 1
+        return counts
+
+    def _add_token_state(self, token_ids: list[str]):
+        for tid in token_ids:
+            self._token_ids.add(tid)
+            self._books[tid] = OrderBook(tid)
+            self._slots[tid] = TokenSlot(tid, self._books[tid])
+            self._fill_queues[tid] = asyncio.Queue()
+
+    def _drop_token_state(self, token_ids):
+        for tid in token_ids:
+            self._token_ids.discard(tid)
+            self._slots.pop(tid, None)
+            self._books.pop(tid, None)
+            self._fill_queues.pop(tid, None)
+
+    def _assign(self, token_ids: list[str]) -> dict[_MarketShard, list[str]]:
+        """Place tokens on the least-loaded shards under the cap. Returns shard -> new tokens."""
+        added: dict[_MarketShard, list[str]] = {}
+        for tid in token_ids:
+            shard = min(
+                (s for s in self._shards if len(s.token_ids) < self._max_per_conn),
+                key=lambda s: len(s.token_ids),
+                default=None,
+            )
+            if shard is None:
+                shard = _MarketShard(self._next_shard_id)
+                self._next_shard_id += 1
+                self._shards.append(shard)
+            shard.token_ids.add(tid)
+            added.setdefault(shard, []).append(tid)
+        return added
+
+    def _start_shard(self, shard: _MarketShard):
+        shard.task = asyncio.create_task(
+            self._market_ws_loop(shard), name=f"market_ws_{shard.shard_id}"
+        )
+
+    async def _retire_shard(self, shard: _MarketShard):
+        self._shards.remove(shard)
+        if shard.task:
+            shard.task.cancel()
+            await asyncio.gather(shard.task, return_exceptions=True)
+            shard.task = None
+        logger.info(f"Market WS[{shard.shard_id}] retired (no assets left)")
+
+    async def _send_market_op(self, shard: _MarketShard, token_ids: list[str], op: str):
         try:
-            await asyncio.wait_for(ev.wait(), timeout=timeout)
-            return True
-        except asyncio.TimeoutError:
-            return False
+            await shard.ws.send(json.dumps({"assets_ids": list(token_ids), "operation": op}))
+        except Exception as e:
+            # The reconnect path resubscribes from shard.token_ids
+            logger.warning(f"Market WS[{shard.shard_id}] {op} failed: {e}")
+
+    async def _send_user_op(self, condition_ids: list[str], op: str):
+        if self._user_ws is None:
+            return  # picked up by the next (re)connect
+        try:
+            await self._user_ws.send(json.dumps({"markets": list(condition_ids), "operation": op}))
+        except Exception as e:
+            logger.warning(f"User WS {op} failed: {e}")
+
+    async def _rebalance(self, shard: _MarketShard):
+        """
+        Even out load when `shard` (re)connects: pull tokens from shards above
+        the fair share, or hand this shard's excess to live shards with room.
+        Only runs before `shard` sends its own subscription, so moved tokens
+        never go unsubscribed.
+        """
+        total = sum(len(s.token_ids) for s in self._shards)
+        target = min(self._max_per_conn, -(-total // max(1, len(self._shards))))
+
+        for other in self._shards:
+            want = target - len(shard.token_ids)
+            if want <= 0:
+                break
+            if other is shard or len(other.token_ids) <= target:
+                continue
+            moved = [other.token_ids.pop() for _ in range(min(want, len(other.token_ids) - target))]
+            shard.token_ids.update(moved)
+            if other.ws is not None:
+                await self._send_market_op(other, moved, "unsubscribe")
+
+        for other in self._shards:
+            excess = len(shard.token_ids) - target
+            if excess <= 0:
+                break
+            if other is shard or other.ws is None or len(other.token_ids) >= target:
+                continue
+            moved = [shard.token_ids.pop() for _ in range(min(excess, target - len(other.token_ids)))]
+            other.token_ids.update(moved)
+            await self._send_market_op(other, moved, "subscribe")
+
+    async def wait_for_update(self, token_id: str, after_seq: int, timeout: float) -> int:
+        """
+        Block until the token's update sequence passes after_seq, or timeout.
+        Returns the current sequence (== after_seq on timeout).
+        """
+        slot = self._slots.get(token_id)
+        if slot is None:
+            await asyncio.sleep(timeout)
+            return after_seq
+        return await slot.wait(after_seq, timeout)
+
+    def get_slot(self, token_id: str) -> Optional[TokenSlot]:
+        """Latest conflated state for a token (seq, mid, book, last trade)."""
+        return self._slots.get(token_id)
 
     def get_mid(self, token_id: str) -> Optional[float]:
-        """Return latest cached midpoint, or None if never received."""
-        return self._mids.get(token_id)
+        """Return latest cached midpoint, or None unless the token is FRESH."""
+        slot = self._slots.get(token_id)
+        if slot is None or self.freshness(token_id) != FRESH:
+            return None
+        return slot.mid
+
+    def is_stale(self, token_id: str) -> bool:
+        slot = self._slots.get(token_id)
+        return slot is None or slot.stale
+
+    def get_book(self, token_id: str) -> Optional[OrderBook]:
+        """Return the local L2 book for a token (may be empty before the first snapshot)."""
+        return self._books.get(token_id)
 
     async def get_fills(self, token_id: str) -> list[FillUpdate]:
         """Drain and return all queued fills for a token."""
@@ -131,113 +469,258 @@ class MarketFeed:
 
     # ── Market WebSocket ─────────────────────────────────────────────────────
 
-    async def _market_ws_loop(self):
-        """Connect to market WS with auto-reconnect."""
+    async def _market_ws_loop(self, shard: _MarketShard):
+        """Connect one market shard with auto-reconnect."""
         backoff = RECONNECT_BASE
-        while self._running:
+        while self._running and shard in self._shards:
+            connects = shard.connects
+            started = time.monotonic()
             try:
-                await self._run_market_ws()
+                await self._run_market_ws(shard)
+                reason = "closed by server"
             except asyncio.CancelledError:
                 return
             except Exception as e:
-                if not self._running:
-                    return
-                logger.warning(f"Market WS error: {e} — reconnecting in {backoff:.0f}s")
-                await asyncio.sleep(backoff)
-                backoff = min(backoff * 2, RECONNECT_MAX)
+                reason = f"error: {e}"
+            finally:
+                shard.ws = None
+                self._mark_stale(shard.token_ids)
 
-    async def _run_market_ws(self):
+            if not self._running:
+                return
+            if shard.connects != connects and time.monotonic() - started > RECONNECT_MAX:
+                backoff = RECONNECT_BASE  # a session that held up; one closed on subscribe doesn't count
+            logger.warning(
+                f"Market WS[{shard.shard_id}] {reason} — {len(shard.token_ids)} tokens stale, "
+                f"reconnecting in {backoff:.0f}s"
+            )
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, RECONNECT_MAX)
+
+    async def _run_market_ws(self, shard: _MarketShard):
         async with websockets.connect(WS_URL, ping_interval=None) as ws:
-            # Subscribe to all token IDs
+            if shard.connects:
+                await self._rebalance(shard)
+            shard.connects += 1
+
+            # Publish the connection before snapshotting the token set, so a
+            # concurrent subscribe() either lands in `sub` or sends its own op
+            shard.ws = ws
             sub = {
-                "assets_ids": list(self._token_ids),
+                "assets_ids": list(shard.token_ids),
                 "type": "market",
                 "custom_feature_enabled": True,
             }
             await ws.send(json.dumps(sub))
-            logger.info(f"Market WS connected — subscribed to {len(self._token_ids)} assets")
-
-            # Reset backoff on successful connect
-            # (handled by outer loop resetting after yield)
+            logger.info(
+                f"Market WS[{shard.shard_id}] connected — subscribed to {len(sub['assets_ids'])} assets"
+            )
+            self._spawn_resync(sub["assets_ids"])
 
             # Keepalive + message loop
+            shard.last_msg_at = time.time()
+
             async def keepalive():
                 while self._running:
                     await asyncio.sleep(KEEPALIVE_SEC)
                     try:
-                        await ws.ping()
+                        pong = await ws.ping()
+                        if pong is not None:
+                            await asyncio.wait_for(pong, KEEPALIVE_SEC)
+                        shard.last_msg_at = time.time()
+                    except asyncio.TimeoutError:
+                        continue  # no pong: the connection ages toward SILENT
                     except Exception:
                         return
 
             ka_task = asyncio.create_task(keepalive())
             try:
+                rec = self._recorder
+                lat = self._latency
                 async for raw in ws:
+                    shard.last_msg_at = time.time()
+                    shard.msgs += 1
+                    if lat is not None:
+                        self._frame_recv_ns = time.perf_counter_ns()
+                    if rec is not None:
+                        rec.record("market", raw)
                     self._handle_market_msg(raw)
             finally:
                 ka_task.cancel()
 
-    def _handle_market_msg(self, raw: str):
+    def _handle_market_msg(self, raw):
+        lat = self._latency
+        recv_wall = 0.0
+        if lat is None:
+            events = self._decoder.decode_market(raw)
+        else:
+            if not self._frame_recv_ns:
+                self._frame_recv_ns = time.perf_counter_ns()
+            recv_wall = time.time()
+            events = self._decoder.decode_market(raw)
+            self._frame_decoded_ns = time.perf_counter_ns()
+            lat.record_ns(FEED, "recv_to_decode", self._frame_decoded_ns - self._frame_recv_ns)
         try:
-            msgs = json.loads(raw)
-        except json.JSONDecodeError:
-            return
+            self._dispatch_market_events(events, lat, recv_wall)
+        finally:
+            self._frame_recv_ns = 0
 
-        # Server sends a list of event objects
-        if not isinstance(msgs, list):
-            msgs = [msgs]
-
-        for msg in msgs:
-            event_type = msg.get("event_type", "")
-
-            if event_type == "price_change":
-                self._process_price_change(msg)
-            elif event_type == "last_trade_price":
-                self._process_last_trade(msg)
-
-    def _process_price_change(self, msg: dict):
-        """Extract best_bid/best_ask from price_change events."""
-        changes = msg.get("price_changes") or msg.get("changes") or []
-        if not isinstance(changes, list):
-            changes = [changes]
-        for change in changes:
-            asset_id = change.get("asset_id") or msg.get("asset_id")
-            if not asset_id or asset_id not in self._token_ids:
+    def _dispatch_market_events(self, events, lat, recv_wall: float):
+        for ev in events:
+            if ev.asset_id not in self._token_ids:
                 continue
-            best_bid = change.get("best_bid") or change.get("price")
-            best_ask = change.get("best_ask")
-            if best_bid is not None and best_ask is not None:
-                try:
-                    mid = (float(best_bid) + float(best_ask)) / 2.0
-                except (ValueError, TypeError):
-                    continue
-                self._update_mid(asset_id, mid)
-            elif best_bid is not None:
-                # Fallback: use best_bid as approximation
-                try:
-                    self._update_mid(asset_id, float(best_bid))
-                except (ValueError, TypeError):
-                    pass
-
-    def _process_last_trade(self, msg: dict):
-        """Use last_trade_price as mid approximation."""
-        asset_id = msg.get("asset_id")
-        price = msg.get("price") or msg.get("last_trade_price")
-        if not asset_id or asset_id not in self._token_ids or price is None:
+            if lat is not None and ev.timestamp:
+                lat.observe_exchange(ev.asset_id, ev.timestamp, recv_wall)
+            kind = type(ev)
+            if kind is PriceLevelChange:
+                self._process_price_change(ev)
+            elif kind is BookEvent:
+                self._process_book(ev)
+            elif kind is LastTradeEvent:
+                self._process_last_trade(ev)
+
+    def _process_book(self, ev: BookEvent):
+        """Full L2 snapshot: sent on subscribe and after every trade."""
+        book = self._books.get(ev.asset_id)
+        if book is None:
             return
-        try:
-            self._update_mid(asset_id, float(price))
-        except (ValueError, TypeError):
-            pass
+        book.apply_snapshot(ev.bids, ev.asks)
+        self._mark_synced(ev.asset_id)
+
+    def _process_price_change(self, ch: PriceLevelChange):
+        """Apply a level delta to the local book, then refresh the mid."""
+        slot = self._slots.get(ch.asset_id)
+        book = self._books.get(ch.asset_id)
+        if book is not None and ch.side and ch.price is not None and ch.size is not None:
+            book.apply_change(ch.side, ch.price, ch.size)
+            if slot is not None and not slot.stale and self._book_diverged(book, ch):
+                self._on_gap(ch.asset_id)
+                return
 
-    def _update_mid(self, token_id: str, new_mid: float):
-        """Update cached mid and signal waiters if change exceeds threshold."""
-        old_mid = self._mids.get(token_id)
-        self._mids[token_id] = new_mid
+        if ch.best_bid is not None and ch.best_ask is not None:
+            self._update_mid(ch.asset_id, (ch.best_bid + ch.best_ask) / 2.0)
+        elif book is not None and book.mid() is not None:
+            self._update_mid(ch.asset_id, book.mid())
+        elif ch.best_bid is not None or ch.price is not None:
+            # Fallback: one-sided book, use best_bid/price as approximation
+            self._update_mid(ch.asset_id, ch.best_bid if ch.best_bid is not None else ch.price)
+
+    def _process_last_trade(self, ev: LastTradeEvent):
+        """Record the trade and use its price as a mid approximation."""
+        slot = self._slots.get(ev.asset_id)
+        if slot is not None:
+            slot.last_trade_price = ev.price
+            slot.last_trade_size = ev.size
+            slot.last_trade_side = ev.side
+        self._update_mid(ev.asset_id, ev.price)
+
+    def _update_mid(self, token_id: str, new_mid: float, force: bool = False):
+        """Update the slot's mid; publish when it has moved mid_threshold since the last publish."""
+        slot = self._slots.get(token_id)
+        if slot is None:
+            return
+        slot.mid = new_mid
+        slot.updated_at = time.time()
+        if slot.stale:
+            return  # waiters are woken once the book is back in sync
+        last = slot.signalled_mid
+        if force or last is None or abs(new_mid - last) >= self._mid_threshold:
+            if self._latency is not None and self._frame_recv_ns:
+                slot.pub_ns = time.perf_counter_ns()
+                slot.pub_recv_ns = self._frame_recv_ns
+                self._latency.record_token_ns(
+                    token_id, "decode_to_pub", slot.pub_ns - self._frame_decoded_ns
+                )
+            else:
+                slot.pub_ns = slot.pub_recv_ns = 0  # REST resync or untracked
+            slot.publish()
+
+    # ── Staleness / resync ───────────────────────────────────────────────────
+
+    def _mark_stale(self, token_ids):
+        for tid in token_ids:
+            slot = self._slots.get(tid)
+            if slot is not None:
+                slot.stale = True
+
+    def _mark_synced(self, token_id: str):
+        """Book was just replaced by a snapshot: clear staleness and wake waiters."""
+        slot = self._slots.get(token_id)
+        if slot is None:
+            return
+        was_stale = slot.stale
+        slot.stale = False
+        self._gap_tokens.discard(token_id)
+        mid = slot.book.mid()
+        if mid is not None:
+            self._update_mid(token_id, mid, force=was_stale)
+        elif was_stale:
+            slot.mid = None  # one-sided book: don't resurrect the pre-outage mid
+
+    @staticmethod
+    def _book_diverged(book: OrderBook, ch: PriceLevelChange) -> bool:
+        """True if the exchange's top of book disagrees with ours after applying ch."""
+        if book.is_crossed():
+            return True
+        if ch.best_bid is None or ch.best_ask is None:
+            return False
+        bb, ba = book.best_bid(), book.best_ask()
+        return (
+            (bb is not None and abs(bb - ch.best_bid) > PRICE_EPS)
+            or (ba is not None and abs(ba - ch.best_ask) > PRICE_EPS)
+        )
 
-        if old_mid is None or abs(new_mid - old_mid) >= self._mid_threshold:
-            ev = self._mid_events.get(token_id)
-            if ev:
-                ev.set()
+    def _on_gap(self, token_id: str):
+        """Missed delta for one token: mark it stale and resync it alone."""
+        self.gaps_detected += 1
+        self._mark_stale((token_id,))
+        self._gap_tokens.add(token_id)
+        if not self._gap_resync_pending and self._running:
+            self._gap_resync_pending = True
+            self._track(asyncio.create_task(self._gap_resync()))
+
+    async def _gap_resync(self):
+        await asyncio.sleep(RESYNC_DEBOUNCE_SEC)
+        self._gap_resync_pending = False
+        tokens, self._gap_tokens = list(self._gap_tokens), set()
+        if tokens:
+            logger.warning(f"Book gap on {len(tokens)} tokens — resyncing from REST")
+            await self._resync(tokens)
+
+    def _spawn_resync(self, token_ids: list[str]):
+        if self._snapshot_fn is not None and token_ids:
+            self._track(asyncio.create_task(self._resync(token_ids)))
+
+    def _track(self, task: asyncio.Task):
+        self._resync_tasks.add(task)
+        task.add_done_callback(self._resync_tasks.discard)
+
+    async def _resync(self, token_ids: list[str]):
+        """Bulk-fetch REST books for tokens that are still stale and install them."""
+        if self._snapshot_fn is None:
+            return
+        for i in range(0, len(token_ids), SNAPSHOT_BATCH):
+            # Skip tokens the WS `book` dump already brought back in sync
+            chunk = [t for t in token_ids[i:i + SNAPSHOT_BATCH] if self.is_stale(t)]
+            if not chunk:
+                continue
+            try:
+                books = await asyncio.to_thread(self._snapshot_fn, chunk)
+            except Exception as e:
+                logger.warning(f"REST book resync failed for {len(chunk)} tokens: {e}")
+                continue
+            for snap in books or ():
+                self._apply_rest_snapshot(snap)
+
+    def _apply_rest_snapshot(self, snap):
+        get = snap.get if isinstance(snap, dict) else (lambda k, _s=snap: getattr(_s, k, None))
+        token_id = get("asset_id")
+        slot = self._slots.get(token_id)
+        if slot is None or not slot.stale:
+            return  # a WS snapshot landed first and is at least as fresh
+        slot.book.apply_snapshot(parse_levels(get("bids")), parse_levels(get("asks")))
+        self.snapshots_applied += 1
+        self._mark_synced(token_id)
 
     # ── User WebSocket (fills) ───────────────────────────────────────────────
 
@@ -245,26 +728,35 @@ class MarketFeed:
         """Connect to user WS with auto-reconnect."""
         backoff = RECONNECT_BASE
         while self._running:
+            connected = self._user_connects
+            started = time.monotonic()
             try:
                 await self._run_user_ws()
+                reason = "closed by server"  # e.g. rejected auth: back off like any error
             except asyncio.CancelledError:
                 return
             except Exception as e:
-                if not self._running:
-                    return
-                logger.warning(f"User WS error: {e} — reconnecting in {backoff:.0f}s")
-                await asyncio.sleep(backoff)
-                backoff = min(backoff * 2, RECONNECT_MAX)
+                reason = f"error: {e}"
+
+            if not self._running:
+                return
+            if self._user_connects != connected and time.monotonic() - started > RECONNECT_MAX:
+                backoff = RECONNECT_BASE  # a session that held up; one closed on subscribe doesn't count
+            logger.warning(f"User WS {reason} — reconnecting in {backoff:.0f}s")
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, RECONNECT_MAX)
 
     async def _run_user_ws(self):
         async with websockets.connect(WS_USER_URL, ping_interval=None) as ws:
+            self._user_ws = ws
+            self._user_connects += 1
             sub = {
                 "auth": {
                     "apiKey": self._api_creds["api_key"],
                     "secret": self._api_creds["api_secret"],
                     "passphrase": self._api_creds["api_passphrase"],
                 },
-                "markets": self._condition_ids,
+                "markets": list(self._condition_ids),
                 "type": "user",
             }
             await ws.send(json.dumps(sub))
@@ -282,55 +774,40 @@ class MarketFeed:
 
             ka_task = asyncio.create_task(keepalive())
             try:
+                rec = self._recorder
                 async for raw in ws:
+                    self.user_msgs += 1
+                    if rec is not None:
+                        rec.record("user", raw)
                     self._handle_user_msg(raw)
             finally:
                 ka_task.cancel()
+                self._user_ws = None
 
-    def _handle_user_msg(self, raw: str):
-        try:
-            msgs = json.loads(raw)
-        except json.JSONDecodeError:
-            return
-
-        if not isinstance(msgs, list):
-            msgs = [msgs]
+    def _handle_user_msg(self, raw):
+        for ev in self._decoder.decode_user(raw):
+            self._process_fill(ev)
 
-        for msg in msgs:
-            event_type = msg.get("event_type", "")
-            if event_type == "trade":
-                self._process_fill(msg)
-
-    def _process_fill(self, msg: dict):
-        """Extract fill info from user trade events."""
+    def _process_fill(self, ev: UserTradeEvent):
+        """Queue confirmed fills for the owning token."""
         # Only process confirmed fills
-        status = (msg.get("status") or "").upper()
-        if status not in ("MATCHED", "CONFIRMED", "MINED"):
+        if ev.status not in ("MATCHED", "CONFIRMED", "MINED"):
             return
-
-        asset_id = msg.get("asset_id")
-        if not asset_id or asset_id not in self._token_ids:
+        if ev.asset_id not in self._token_ids:
             return
 
-        trade_id = msg.get("id") or msg.get("tradeID") or ""
-        if not trade_id:
-            return
-
-        try:
-            fill = FillUpdate(
-                token_id=asset_id,
-                trade_id=trade_id,
-                side=msg.get("side", "").upper(),
-                price=float(msg.get("price", 0)),
-                size=float(msg.get("size", 0)),
-            )
-        except (ValueError, TypeError):
-            return
+        fill = FillUpdate(
+            token_id=ev.asset_id,
+            trade_id=ev.trade_id,
+            side=ev.side,
+            price=ev.price,
+            size=ev.size,
+        )
 
-        q = self._fill_queues.get(asset_id)
+        q = self._fill_queues.get(ev.asset_id)
         if q:
             q.put_nowait(fill)
             logger.info(
                 f"Fill (WS): {fill.side} {fill.size:.1f}@{fill.price:.3f} "
-                f"token={asset_id[:16]}..."
+                f"token={ev.asset_id[:16]}..."
             )